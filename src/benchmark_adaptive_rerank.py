@@ -0,0 +1,103 @@
+"""
+Latency saved against recall lost by the adaptive rerank policy.
+
+The reference is the full cross-encoder pass over the `retrieve_k` hybrid
+candidates: recall@k is the share of its top 'k' chunks that each policy keeps.
+Hybrid retrieval runs once per query, only the rerank stage is timed.
+
+Usage (from src/):
+    python benchmark_adaptive_rerank.py
+    python benchmark_adaptive_rerank.py --eval-file eval.jsonl --retrieve-k 25 --k 3
+    python benchmark_adaptive_rerank.py --skip-margins 0.05 0.1 0.2 --score-windows 0.1 0.2
+
+The evaluation file has one {"query": ..., "topic": ...} object per line,
+`topic` being a vector store topic (graduate, tuition_fee, regulation_info).
+"""
+import sys
+import json
+import time
+import argparse
+import itertools
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from genai_agent.nodes.router import TOPIC_EXAMPLES, RAG_STORE_TOPICS
+from genai_agent.vector_db.store_factory import create_vector_store
+from genai_agent.vector_db.adaptive_rerank import AdaptiveRerankPolicy
+from config import ADAPTIVE_RERANK
+
+
+def load_eval_set(path: Optional[str]) -> List[Tuple[str, str]]:
+    """(query, store topic) pairs, the router examples of the RAG topics by default"""
+    if path is None:
+        return [(query, store_topic) for route, store_topic in RAG_STORE_TOPICS.items() for query in TOPIC_EXAMPLES[route]]
+    with open(path, encoding="utf-8") as f:
+        return [(item["query"], item["topic"]) for item in map(json.loads, f) if item]
+
+
+def _copy(matches) -> List[Dict]:
+    # _rerank writes its scores into the matches
+    return [{"id": m['id'], "score": m['score'], "metadata": m['metadata']} for m in matches]
+
+
+def run_policy(store, candidates, k: int, policy: Optional[AdaptiveRerankPolicy]):
+    latencies, results = [], []
+    for query, matches in candidates:
+        matches = _copy(matches)
+        start = time.perf_counter()
+        final = store._rerank(query, matches, k, policy)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([m['metadata'].get('page_content') for m in final])
+    return latencies, results
+
+
+def recall(reference: List[List[str]], results: List[List[str]]) -> float:
+    scores = [len(set(ref) & set(res)) / len(ref) for ref, res in zip(reference, results) if ref]
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the adaptive rerank policy")
+    parser.add_argument("--eval-file", default=None)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--retrieve-k", type=int, default=25)
+    parser.add_argument("--skip-margins", type=float, nargs="+", default=[ADAPTIVE_RERANK['skip_margin']])
+    parser.add_argument("--score-windows", type=float, nargs="+", default=[ADAPTIVE_RERANK['score_window']])
+    parser.add_argument("--cascade-stage-sizes", type=int, nargs="+", default=[ADAPTIVE_RERANK['cascade_stage_size']])
+    args = parser.parse_args()
+
+    store = create_vector_store()
+    if not store.is_healthy() or store.reranker is None:
+        print("❌ Vector store is not available")
+        sys.exit(1)
+
+    eval_set = load_eval_set(args.eval_file)
+    candidates = []
+    for query, topic in eval_set:
+        dense_vector = store.embedding_model.embed_query(query)
+        matches = store._hybrid_retrieve(query, dense_vector, topic, args.retrieve_k)
+        if matches:
+            candidates.append((query, matches))
+    print(f"Evaluating {len(candidates)} queries, k={args.k}, retrieve_k={args.retrieve_k}")
+
+    # Warm the cross-encoder before timing
+    run_policy(store, candidates[:3], args.k, None)
+    full_latencies, reference = run_policy(store, candidates, args.k, None)
+    print(f"\n{'policy':<36} {'recall@k':>8} {'p50 ms':>8} {'p95 ms':>8} {'skip':>6} {'reranked':>9}")
+    print(f"{'full rerank':<36} {1.0:>8.3f} {np.percentile(full_latencies, 50):>8.1f} "
+          f"{np.percentile(full_latencies, 95):>8.1f} {0.0:>6.2f} {1.0:>9.2f}")
+
+    settings = {key: value for key, value in ADAPTIVE_RERANK.items() if key != "enabled"}
+    for margin, window, stage_size in itertools.product(args.skip_margins, args.score_windows, args.cascade_stage_sizes):
+        policy = AdaptiveRerankPolicy(**{**settings, "skip_margin": margin, "score_window": window,
+                                         "cascade_stage_size": stage_size})
+        latencies, results = run_policy(store, candidates, args.k, policy)
+        stats = policy.stats()
+        name = f"margin={margin} window={window} stage={stage_size}"
+        print(f"{name:<36} {recall(reference, results):>8.3f} {np.percentile(latencies, 50):>8.1f} "
+              f"{np.percentile(latencies, 95):>8.1f} {stats['skip_rate']:>6.2f} {stats['rerank_fraction']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Export the embedder and the cross-encoder to int8 ONNX, check that they agree
+with the PyTorch models and compare their CPU latency.
+
+Needs the optional dependency `optimum[onnxruntime]`.
+
+Usage (from src/):
+    python benchmark_inference_backends.py --export
+    python benchmark_inference_backends.py --quantization avx512_vnni --queries 50
+"""
+import os
+import sys
+import time
+import argparse
+import unicodedata
+from typing import List
+
+import numpy as np
+
+from genai_agent.nodes.router import TOPIC_EXAMPLES, RAG_STORE_TOPICS
+from genai_agent.vector_db.onnx_backend import (
+    export_quantized_model,
+    find_quantized_model,
+    is_onnx_available,
+    QUANTIZATION_CONFIGS
+)
+from genai_agent.vector_db.model_registry import (
+    load_embedding_model,
+    load_reranker,
+    EMBEDDING_MODEL_NAME,
+    RERANKER_MODEL_NAME
+)
+from config import INFERENCE_BACKEND
+
+KB_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "BKU_KB", "BKU_KB")
+PAIRS_PER_QUERY = 25
+
+
+def load_passages(kb_root: str, limit: int) -> List[str]:
+    """Paragraphs of the knowledge base, as a stand-in for retrieved chunks"""
+    import docx
+    passages = []
+    for root, _, files in os.walk(kb_root):
+        for name in sorted(files):
+            if not name.lower().endswith(".docx"):
+                continue
+            for paragraph in docx.Document(os.path.join(root, name)).paragraphs:
+                text = unicodedata.normalize("NFC", paragraph.text).strip()
+                if len(text) >= 40:
+                    passages.append(text)
+                    if len(passages) >= limit:
+                        return passages
+    return passages
+
+
+def _percentiles(latencies_ms: List[float]) -> str:
+    return f"p50={np.percentile(latencies_ms, 50):.1f} ms, p95={np.percentile(latencies_ms, 95):.1f} ms"
+
+
+def time_calls(fn, inputs, warmup: int = 3) -> List[float]:
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    return np.argsort(np.argsort(-scores))
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    ra, rb = _ranks(a).astype(float), _ranks(b).astype(float)
+    n = len(a)
+    return 1 - 6 * float(((ra - rb) ** 2).sum()) / (n * (n ** 2 - 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity check and latency benchmark of the int8 ONNX backend")
+    parser.add_argument("--export", action="store_true", help="Export and quantize both models first")
+    parser.add_argument("--quantization", default=INFERENCE_BACKEND['quantization'], choices=QUANTIZATION_CONFIGS)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--passages", type=int, default=500)
+    parser.add_argument("--kb-root", default=KB_ROOT)
+    parser.add_argument("--min-cosine", type=float, default=0.99,
+                        help="Minimum embedding cosine similarity between backends")
+    parser.add_argument("--min-top3-overlap", type=float, default=0.9,
+                        help="Minimum average overlap of the reranked top 3")
+    args = parser.parse_args()
+
+    if not is_onnx_available():
+        print("❌ ONNX backend needs `pip install optimum[onnxruntime]`")
+        sys.exit(1)
+
+    INFERENCE_BACKEND['quantization'] = args.quantization
+    if args.export:
+        for model_name, kind in ((EMBEDDING_MODEL_NAME, "embedding"), (RERANKER_MODEL_NAME, "reranker")):
+            print(f"Exporting {model_name} ({args.quantization})...")
+            print(f"✅ Saved to {export_quantized_model(model_name, kind, args.quantization)}")
+
+    # Questions about the RAG topics, as the vector stores receive them
+    queries = [q for topic in RAG_STORE_TOPICS for q in TOPIC_EXAMPLES[topic]]
+    queries = (queries * (args.queries // len(queries) + 1))[:args.queries]
+    passages = load_passages(args.kb_root, args.passages)
+    print(f"Loaded {len(queries)} queries and {len(passages)} passages")
+
+    for model_name in (EMBEDDING_MODEL_NAME, RERANKER_MODEL_NAME):
+        if find_quantized_model(model_name, args.quantization) is None:
+            print(f"❌ No int8 ONNX export of {model_name}, run with --export")
+            sys.exit(1)
+
+    torch_embedder = load_embedding_model(backend="torch")
+    onnx_embedder = load_embedding_model(backend="onnx")
+    torch_reranker = load_reranker(backend="torch")
+    onnx_reranker = load_reranker(backend="onnx")
+
+    # 1. Embedding parity and latency
+    torch_vectors = np.asarray([torch_embedder.embed_query(q) for q in queries])
+    onnx_vectors = np.asarray([onnx_embedder.embed_query(q) for q in queries])
+    cosines = (torch_vectors * onnx_vectors).sum(axis=1) / (
+        np.linalg.norm(torch_vectors, axis=1) * np.linalg.norm(onnx_vectors, axis=1)
+    )
+    print(f"\nEmbedding cosine torch vs onnx: min={cosines.min():.4f}, mean={cosines.mean():.4f}")
+    print(f"  torch: {_percentiles(time_calls(torch_embedder.embed_query, queries))}")
+    print(f"  onnx : {_percentiles(time_calls(onnx_embedder.embed_query, queries))}")
+
+    # 2. Reranking parity and latency on the 25 nearest passages of every query
+    passage_vectors = np.asarray(torch_embedder.embed_documents(passages))
+    batches = []
+    for vector, query in zip(torch_vectors, queries):
+        nearest = np.argsort(-(passage_vectors @ vector))[:PAIRS_PER_QUERY]
+        batches.append([(query, passages[i]) for i in nearest])
+
+    overlaps, correlations = [], []
+    for pairs in batches:
+        torch_scores = np.asarray(torch_reranker.predict(pairs))
+        onnx_scores = np.asarray(onnx_reranker.predict(pairs))
+        overlaps.append(len(set(np.argsort(-torch_scores)[:3]) & set(np.argsort(-onnx_scores)[:3])) / 3)
+        correlations.append(spearman(torch_scores, onnx_scores))
+    print(f"\nRerank top-3 overlap: mean={np.mean(overlaps):.3f}, Spearman: mean={np.mean(correlations):.3f}")
+    print(f"  torch ({PAIRS_PER_QUERY} pairs): {_percentiles(time_calls(torch_reranker.predict, batches))}")
+    print(f"  onnx  ({PAIRS_PER_QUERY} pairs): {_percentiles(time_calls(onnx_reranker.predict, batches))}")
+
+    passed = cosines.min() >= args.min_cosine and np.mean(overlaps) >= args.min_top3_overlap
+    print("\n✅ Parity check passed" if passed else "\n❌ Parity check failed")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Throughput of BaseVectorStore.query_batch against the sequential `query` loop.
+
+Every batch size runs the whole evaluation set, split into batches of that size.
+Results must match the loop: agreement is the share of queries whose top 'k'
+chunks are the same.
+
+Usage (from src/):
+    python benchmark_query_batch.py
+    python benchmark_query_batch.py --eval-file eval.jsonl --batch-sizes 4 16 64 --repeat 3
+
+The evaluation file has one {"query": ..., "topic": ...} object per line,
+`topic` being a vector store topic (graduate, tuition_fee, regulation_info).
+"""
+import sys
+import json
+import time
+import argparse
+from typing import List, Optional, Tuple
+
+from genai_agent.nodes.router import TOPIC_EXAMPLES, RAG_STORE_TOPICS
+from genai_agent.vector_db.store_factory import create_vector_store
+
+
+def load_eval_set(path: Optional[str]) -> List[Tuple[str, str]]:
+    """(query, store topic) pairs, the router examples of the RAG topics by default"""
+    if path is None:
+        return [(query, store_topic) for route, store_topic in RAG_STORE_TOPICS.items() for query in TOPIC_EXAMPLES[route]]
+    with open(path, encoding="utf-8") as f:
+        return [(item["query"], item["topic"]) for item in map(json.loads, f) if item]
+
+
+def run_sequential(store, eval_set, k: int, retrieve_k: int):
+    start = time.perf_counter()
+    results = [store.query(query, topic, k=k, retrieve_k=retrieve_k) for query, topic in eval_set]
+    return time.perf_counter() - start, results
+
+
+def run_batched(store, eval_set, batch_size: int, k: int, retrieve_k: int):
+    start = time.perf_counter()
+    results = []
+    for i in range(0, len(eval_set), batch_size):
+        batch = eval_set[i:i + batch_size]
+        results.extend(store.query_batch([q for q, _ in batch], [t for _, t in batch], k=k, retrieve_k=retrieve_k))
+    return time.perf_counter() - start, results
+
+
+def agreement(reference, results) -> float:
+    same = sum(
+        [m['content'] for m in ref] == [m['content'] for m in res]
+        for ref, res in zip(reference, results)
+    )
+    return same / len(reference) if reference else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the batch query API")
+    parser.add_argument("--eval-file", default=None)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--retrieve-k", type=int, default=25)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the evaluation set, the best one is kept")
+    args = parser.parse_args()
+
+    store = create_vector_store()
+    if not store.is_healthy() or store.reranker is None:
+        print("❌ Vector store is not available")
+        sys.exit(1)
+
+    eval_set = load_eval_set(args.eval_file)
+    print(f"Evaluating {len(eval_set)} queries on {type(store).__name__}, k={args.k}, retrieve_k={args.retrieve_k}")
+
+    # Warm the models before timing
+    store.query_batch([q for q, _ in eval_set[:4]], [t for _, t in eval_set[:4]], k=args.k)
+
+    elapsed, reference = min((run_sequential(store, eval_set, args.k, args.retrieve_k) for _ in range(args.repeat)),
+                             key=lambda run: run[0])
+    baseline_qps = len(eval_set) / elapsed
+    print(f"\n{'mode':<16} {'seconds':>8} {'queries/s':>10} {'speedup':>8} {'agreement':>10}")
+    print(f"{'sequential':<16} {elapsed:>8.2f} {baseline_qps:>10.1f} {1.0:>8.2f} {1.0:>10.2f}")
+
+    for batch_size in args.batch_sizes:
+        elapsed, results = min((run_batched(store, eval_set, batch_size, args.k, args.retrieve_k)
+                                for _ in range(args.repeat)), key=lambda run: run[0])
+        qps = len(eval_set) / elapsed
+        print(f"{f'batch={batch_size}':<16} {elapsed:>8.2f} {qps:>10.1f} {qps / baseline_qps:>8.2f} "
+              f"{agreement(reference, results):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
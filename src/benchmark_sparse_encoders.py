@@ -0,0 +1,138 @@
+"""
+Compare the sparse encoders of the hybrid search on the knowledge base:
+sparse-only recall, per-query latency, load time and size on disk.
+
+Queries are the questions of the curated FAQ documents with their headings,
+the relevant chunk is the one that contains the start of the answer. The same queries without diacritics show how the
+encoders cope with unaccented typing.
+
+Usage (from src/):
+    python benchmark_sparse_encoders.py
+    python benchmark_sparse_encoders.py --eval-file sparse_eval.jsonl --k 25
+
+The evaluation file has one {"query", "topic", "relevant_text"} object per line.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, List, Tuple
+
+import docx
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from genai_agent.vector_db.faq_index import extract_qa_pairs, is_faq_source, question_text
+from genai_agent.vector_db.sparse_encoder import BM25Encoder, normalize_vietnamese
+
+KB_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "BKU_KB", "BKU_KB")
+TOPICS = ["tuition_fee", "graduate", "regulation_info"]
+ANSWER_PREFIX_LENGTH = 60
+
+
+def _squash(text: str) -> str:
+    return re.sub(r"\s+", " ", normalize_vietnamese(text)).strip()
+
+
+def load_topic(topic: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Chunks split like upload_pinecone.py, and the FAQ (question, answer) pairs of the topic"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=512, chunk_overlap=50, length_function=len, separators=["\n\n", "\n", ".", "!", "?", ";"]
+    )
+    chunks, pairs = [], []
+    folder = os.path.join(KB_ROOT, topic)
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".docx"):
+            continue
+        path = os.path.join(folder, name)
+        text = "\n".join(p.text for p in docx.Document(path).paragraphs)
+        chunks.extend(splitter.split_text(text))
+        if is_faq_source(name):
+            pairs.extend((question_text(pair), pair["answer"]) for pair in extract_qa_pairs(path))
+    return chunks, pairs
+
+
+def relevant_chunks(chunks: List[str], relevant_text: str) -> set:
+    prefix = _squash(relevant_text)[:ANSWER_PREFIX_LENGTH]
+    return {i for i, chunk in enumerate(chunks) if prefix and prefix in _squash(chunk)}
+
+
+def build_encoders(texts: List[str], folder: str) -> Dict[str, dict]:
+    """Fit every encoder, save it and reload it like the app does"""
+    encoders = {}
+    tfidf = TfidfVectorizer()
+    matrix = tfidf.fit_transform(texts)
+    path = os.path.join(folder, "tfidf.joblib")
+    joblib.dump(tfidf, path)
+    start = time.perf_counter()
+    loaded = joblib.load(path)
+    encoders["tfidf"] = {"encoder": loaded, "matrix": matrix, "load_ms": (time.perf_counter() - start) * 1000,
+                         "bytes": os.path.getsize(path)}
+
+    for name, fold in (("bm25", False), ("bm25-fold", True)):
+        encoder = BM25Encoder(fold_diacritics=fold)
+        matrix = encoder.fit_transform(texts)
+        path = encoder.save(os.path.join(folder, name))
+        start = time.perf_counter()
+        loaded = BM25Encoder.load(path)
+        encoders[name] = {"encoder": loaded, "matrix": matrix, "load_ms": (time.perf_counter() - start) * 1000,
+                          "bytes": sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))}
+    return encoders
+
+
+def evaluate(encoder, matrix, queries: List[str], relevant: List[set], k: int):
+    recalls, latencies = [], []
+    for query, targets in zip(queries, relevant):
+        start = time.perf_counter()
+        scores = (matrix @ encoder.transform([query]).T).toarray().ravel()
+        top = set(np.argsort(-scores)[:k].tolist())
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(1.0 if top & targets else 0.0)
+    return float(np.mean(recalls)), float(np.percentile(latencies, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the sparse encoders")
+    parser.add_argument("--eval-file", default=None)
+    parser.add_argument("--k", type=int, default=25, help="Candidates kept for the reranker (retrieve_k)")
+    args = parser.parse_args()
+
+    extra = {}
+    if args.eval_file:
+        with open(args.eval_file, encoding="utf-8") as f:
+            for item in map(json.loads, filter(str.strip, f)):
+                extra.setdefault(item["topic"], []).append((item["query"], item["relevant_text"]))
+
+    folder = tempfile.mkdtemp()
+    try:
+        for topic in TOPICS:
+            chunks, pairs = load_topic(topic)
+            pairs += extra.get(topic, [])
+            eval_set = [(q, relevant_chunks(chunks, a)) for q, a in pairs]
+            eval_set = [(q, targets) for q, targets in eval_set if targets]
+            print(f"\n=== {topic}: {len(chunks)} chunks, {len(eval_set)} queries with a relevant chunk ===")
+            if not eval_set:
+                continue
+            queries = [q for q, _ in eval_set]
+            unaccented = [normalize_vietnamese(q, fold_diacritics=True) for q in queries]
+            relevant = [targets for _, targets in eval_set]
+
+            topic_folder = os.path.join(folder, topic)
+            os.makedirs(topic_folder)
+            print(f"{'encoder':<10} {'recall@k':>9} {'unaccented':>11} {'p50 ms':>8} {'load ms':>8} {'KB':>8}")
+            for name, item in build_encoders(chunks, topic_folder).items():
+                recall, p50 = evaluate(item["encoder"], item["matrix"], queries, relevant, args.k)
+                recall_unaccented, _ = evaluate(item["encoder"], item["matrix"], unaccented, relevant, args.k)
+                print(f"{name:<10} {recall:>9.3f} {recall_unaccented:>11.3f} {p50:>8.3f} "
+                      f"{item['load_ms']:>8.1f} {item['bytes'] / 1024:>8.0f}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Build the local chunk docstore from an index that still has the text in its
+metadata, then optionally slim the Pinecone records down to their topic.
+
+Every topic is read from the namespace it is served from (its alias with
+PINECONE_PARTITIONING=namespace, the default namespace otherwise).
+
+Usage (from src/):
+    python build_chunk_docstore.py
+    python build_chunk_docstore.py --slim   # then set CHUNK_DOCSTORE_ENABLED=true
+"""
+import os
+import argparse
+
+from pinecone import Pinecone
+from dotenv import load_dotenv, find_dotenv
+
+from genai_agent.vector_db.docstore import ChunkDocstore, DOCSTORE_PATH
+from genai_agent.vector_db.partitioning import read_aliases
+from migrate_pinecone_namespaces import list_topic_ids, to_record, TOPICS, SOURCE_NAMESPACE, FETCH_BATCH_SIZE
+
+
+def export_topic(index, docstore: ChunkDocstore, topic: str, namespace: str, slim: bool):
+    ids = list_topic_ids(index, topic, namespace)
+    print(f"\n--- {topic}: {len(ids)} vectors in namespace '{namespace}' ---")
+    stored, slimmed = 0, 0
+    for i in range(0, len(ids), FETCH_BATCH_SIZE):
+        vectors = index.fetch(ids=ids[i:i + FETCH_BATCH_SIZE], namespace=namespace).vectors
+        # Records already slimmed have no text left, the docstore keeps what it has for them
+        records = [to_record(v) for v in vectors.values() if v.metadata and "page_content" in v.metadata]
+        docstore.put_many(records)
+        stored += len(records)
+        if slim and records:
+            index.upsert(vectors=[{**r, "metadata": {"topic": topic}} for r in records], namespace=namespace)
+            slimmed += len(records)
+    print(f"✅ Stored {stored} chunks" + (f", slimmed {slimmed} Pinecone records" if slim else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export chunk text from Pinecone metadata to the local docstore")
+    parser.add_argument("--topics", nargs="+", default=TOPICS, choices=TOPICS)
+    parser.add_argument("--slim", action="store_true", help="Remove the text from the Pinecone metadata afterwards")
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv())
+    index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(os.getenv("PINECONE_INDEX_NAME"))
+    docstore = ChunkDocstore(os.getenv("CHUNK_DOCSTORE_PATH") or DOCSTORE_PATH)
+    aliases = read_aliases(index) if os.getenv("PINECONE_PARTITIONING", "metadata") == "namespace" else {}
+
+    for topic in args.topics:
+        export_topic(index, docstore, topic, aliases.get(topic, SOURCE_NAMESPACE), args.slim)
+    print(f"\nDocstore {docstore.path} holds {len(docstore)} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Calibrate the per-topic thresholds of the retrieval confidence gate.
+
+For every knowledge base topic, the best reranked score of questions the topic
+can answer (positives) is compared with the best score of questions it cannot
+(negatives). The threshold keeps `--target-recall` of the positives and the
+report shows how many negatives the gate would answer with the fallback.
+
+Positives default to the router examples of the topic, negatives to the examples
+of the routes that have no knowledge base (greeting, off topic...). An evaluation
+file adds labeled questions, one {"query", "topic", "relevant": bool} per line.
+
+Usage (from src/):
+    python calibrate_retrieval_gate.py
+    python calibrate_retrieval_gate.py --eval-file gate_eval.jsonl --target-recall 0.9
+    python calibrate_retrieval_gate.py --log ../logs/retrieval_gate.jsonl*  # summarize production decisions (RETRIEVAL_GATE_LOG)
+"""
+import sys
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from genai_agent.nodes.router import TOPIC_EXAMPLES, RAG_STORE_TOPICS
+from genai_agent.vector_db.store_factory import create_vector_store
+from genai_agent.utils.retrieval_gate import THRESHOLDS_PATH
+from config import RETRIEVAL_GATE
+
+
+def load_eval_set(path: Optional[str]) -> Dict[str, Dict[str, List[str]]]:
+    """{topic: {"positives": [...], "negatives": [...]}}"""
+    negatives = [q for route, queries in TOPIC_EXAMPLES.items() if route not in RAG_STORE_TOPICS for q in queries]
+    eval_set = {
+        topic: {"positives": list(TOPIC_EXAMPLES[route]), "negatives": list(negatives)}
+        for route, topic in RAG_STORE_TOPICS.items()
+    }
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for item in map(json.loads, filter(str.strip, f)):
+                eval_set[item["topic"]]["positives" if item["relevant"] else "negatives"].append(item["query"])
+    return eval_set
+
+
+def top_scores(store, topic: str, queries: List[str]) -> List[float]:
+    scores = []
+    for query in queries:
+        matches = store.query(query_text=query, topic=topic, k=1)
+        scores.append(float(matches[0]['score']) if matches else float("-inf"))
+    return scores
+
+
+def summarize_log(paths: List[str]):
+    """Decisions of the current log file and its rotated backups"""
+    by_topic = defaultdict(list)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for record in map(json.loads, filter(str.strip, f)):
+                by_topic[record["topic"]].append(record)
+    for topic, records in sorted(by_topic.items()):
+        scores = [r["top_score"] for r in records if r["top_score"] is not None]
+        closed = sum(1 for r in records if not r["passed"])
+        print(f"\n{topic}: {len(records)} decisions, {closed} fallbacks ({closed / len(records):.1%})")
+        if scores:
+            p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+            print(f"  top score p10={p10:.3f} p50={p50:.3f} p90={p90:.3f}")
+        for reason in sorted({r["reason"] for r in records}):
+            print(f"  {reason}: {sum(1 for r in records if r['reason'] == reason)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the retrieval confidence gate")
+    parser.add_argument("--eval-file", default=None)
+    parser.add_argument("--target-recall", type=float, default=0.95,
+                        help="Share of answerable questions that must pass the gate")
+    parser.add_argument("--log", nargs="+", default=None, help="Summarize gate decision logs instead of calibrating")
+    parser.add_argument("--dry-run", action="store_true", help="Do not save the thresholds")
+    args = parser.parse_args()
+
+    if args.log:
+        summarize_log(args.log)
+        return
+
+    store = create_vector_store()
+    if not store.is_healthy():
+        print("❌ Vector store is not available")
+        sys.exit(1)
+    # Thresholds apply to cross-encoder scores, always rerank
+    store.rerank_policy = None
+
+    thresholds = {}
+    for topic, queries in load_eval_set(args.eval_file).items():
+        positives = top_scores(store, topic, queries["positives"])
+        negatives = top_scores(store, topic, queries["negatives"])
+        threshold = float(np.quantile(positives, 1 - args.target_recall))
+        blocked = np.mean([score < threshold for score in negatives]) if negatives else 0.0
+        passed = np.mean([score >= threshold for score in positives])
+        thresholds[topic] = round(threshold, 4)
+        print(f"{topic}: threshold={threshold:.3f} | positives passed {passed:.1%} of {len(positives)} "
+              f"| negatives sent to fallback {blocked:.1%} of {len(negatives)}")
+
+    if RETRIEVAL_GATE['thresholds']:
+        print(f"Note: RETRIEVAL_GATE_THRESHOLDS overrides {sorted(RETRIEVAL_GATE['thresholds'])}")
+    if not args.dry_run:
+        with open(THRESHOLDS_PATH, "w", encoding="utf-8") as f:
+            json.dump(thresholds, f, indent=2, ensure_ascii=False)
+        print(f"✅ Saved thresholds to {THRESHOLDS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
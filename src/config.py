@@ -35,5 +35,215 @@ LLM_MODELS = {
     },
     "wanna_exit_subgraph":{
         "wanna_exit_node": os.getenv('GROQ_LLM_MODEL_LLAMA_70B')
+    },
+    "conversation_summary": {
+        "summarizer": os.getenv('CONVERSATION_SUMMARY_MODEL', os.getenv('GROQ_LLM_MODEL_LLAMA_70B'))
     }
-}
\ No newline at end of file
+}
+
+# FAQ fast path: curated answers from the KB's Q&A documents
+# Off by default: curated answers are served verbatim, calibrate the threshold on held-out paraphrases first
+FAQ_INDEX = {
+    "enabled": os.getenv('FAQ_INDEX_ENABLED', 'false').lower() == 'true',
+    "match_threshold": float(os.getenv('FAQ_MATCH_THRESHOLD', '0.85')),
+    "rephrase_with_llm": os.getenv('FAQ_REPHRASE_WITH_LLM', 'false').lower() == 'true',
+}
+
+# Structured lookups over tabular KB content (tuition fees, academic calendar)
+STRUCTURED_LOOKUP = {
+    "enabled": os.getenv('STRUCTURED_LOOKUP_ENABLED', 'true').lower() == 'true',
+    "min_score": float(os.getenv('STRUCTURED_LOOKUP_MIN_SCORE', '0.6')),
+}
+
+# Pre-generated reply pools for greeting, wanna_exit and off_topic flows
+RESPONSE_POOL = {
+    "enabled": os.getenv('RESPONSE_POOL_ENABLED', 'false').lower() == 'true',
+    "pool_size": int(os.getenv('RESPONSE_POOL_SIZE', '8')),
+    "refresh_seconds": int(os.getenv('RESPONSE_POOL_REFRESH_SECONDS', '21600')),
+    "max_template_words": int(os.getenv('RESPONSE_POOL_MAX_TEMPLATE_WORDS', '3')),
+}
+
+# Inference backend of the embedder and the cross-encoder
+INFERENCE_BACKEND = {
+    "backend": os.getenv('INFERENCE_BACKEND', 'torch'),  # torch | onnx (int8, needs optimum[onnxruntime])
+    "quantization": os.getenv('ONNX_QUANTIZATION', 'avx2'),  # avx2 | avx512 | avx512_vnni | arm64
+}
+
+# Cross-encoder micro-batching across concurrent requests
+RERANK_BATCHING = {
+    "enabled": os.getenv('RERANK_BATCHING_ENABLED', 'true').lower() == 'true',
+    "max_batch_size": int(os.getenv('RERANK_BATCHING_MAX_BATCH_SIZE', '128')),
+    "max_wait_ms": float(os.getenv('RERANK_BATCHING_MAX_WAIT_MS', '5')),
+    # Pairs per cross-encoder forward pass within a merged batch, unless a caller asks for a batch_size
+    "forward_batch_size": int(os.getenv('RERANK_BATCHING_FORWARD_BATCH_SIZE', '32')),
+    "timeout_seconds": float(os.getenv('RERANK_BATCHING_TIMEOUT_SECONDS', '30')),
+}
+
+# BaseVectorStore.query_batch (evaluation runs, cache warming): concurrent retrievals per batch
+# and cross-encoder batch size for the merged (query, chunk) pairs, also honored by the
+# reranking batcher (the smallest size asked in a merged batch wins) and the inference server
+QUERY_BATCH = {
+    "max_concurrency": int(os.getenv('QUERY_BATCH_MAX_CONCURRENCY', '8')),
+    "rerank_batch_size": int(os.getenv('QUERY_BATCH_RERANK_BATCH_SIZE', '64')),
+}
+
+# Where the chunks are searched: pinecone (hosted) | local (memory-mapped index built by upload_pinecone.py --backend local)
+VECTOR_BACKEND = {
+    "backend": os.getenv('VECTOR_BACKEND', 'pinecone'),
+}
+
+# Skip or shrink the cross-encoder pass when the hybrid scores are decisive
+# (tune with benchmark_adaptive_rerank.py on your index before enabling)
+ADAPTIVE_RERANK = {
+    "enabled": os.getenv('ADAPTIVE_RERANK_ENABLED', 'false').lower() == 'true',
+    "skip_margin": float(os.getenv('ADAPTIVE_RERANK_SKIP_MARGIN', '0.15')),
+    "score_window": float(os.getenv('ADAPTIVE_RERANK_SCORE_WINDOW', '0.2')),
+    "min_candidates": int(os.getenv('ADAPTIVE_RERANK_MIN_CANDIDATES', '8')),
+    "short_query_tokens": int(os.getenv('ADAPTIVE_RERANK_SHORT_QUERY_TOKENS', '3')),
+    "short_query_candidates": int(os.getenv('ADAPTIVE_RERANK_SHORT_QUERY_CANDIDATES', '10')),
+    "cascade_stage_size": int(os.getenv('ADAPTIVE_RERANK_CASCADE_STAGE_SIZE', '8')),  # 0: one pass
+}
+
+# How topics are separated in the Pinecone index: metadata (one namespace + topic filter) |
+# namespace (one namespace per topic, run migrate_pinecone_namespaces.py on existing indexes first)
+PINECONE_PARTITIONING = {
+    "strategy": os.getenv('PINECONE_PARTITIONING', 'metadata'),
+    "alias_ttl_seconds": float(os.getenv('PINECONE_ALIAS_TTL_SECONDS', '60')),
+}
+
+# Chunk text in a local SQLite docstore, Pinecone only returns ids and scores
+# (index with upload_pinecone.py --slim, or build_chunk_docstore.py for an existing index)
+CHUNK_DOCSTORE = {
+    "enabled": os.getenv('CHUNK_DOCSTORE_ENABLED', 'false').lower() == 'true',
+    "path": os.getenv('CHUNK_DOCSTORE_PATH', ''),  # empty: vector_db/docstore/chunks.sqlite3
+}
+
+# Sparse half of the hybrid search: tfidf | bm25 (Vietnamese syllable n-grams).
+# Must match the encoder the index was built with (upload_pinecone.py --sparse-encoder)
+SPARSE_ENCODER = {
+    "encoder": os.getenv('SPARSE_ENCODER', 'tfidf'),
+    # bm25 only: drop the diacritics of chunks and questions, so unaccented questions still match.
+    # Read by upload_pinecone.py, queries use the value saved with the encoder
+    "fold_diacritics": os.getenv('SPARSE_ENCODER_FOLD_DIACRITICS', 'false').lower() == 'true',
+}
+
+# Embedding and reranking in a separate pool of worker processes (inference_server.py)
+INFERENCE_WORKERS = {
+    "mode": os.getenv('INFERENCE_MODE', 'local'),  # local (in the web process) | remote (inference server)
+    "address": os.getenv('INFERENCE_ADDRESS', os.path.join(APP_ROOT_PATH, "run", "inference.sock")),  # unix socket path or host:port
+    # Shared secret of the server and the web processes, no default: the protocol unpickles what it receives
+    "authkey": os.getenv('INFERENCE_AUTHKEY', '').encode() or None,
+    "workers": int(os.getenv('INFERENCE_WORKERS', '2')),
+    "threads_per_worker": int(os.getenv('INFERENCE_THREADS_PER_WORKER', '1')),
+    "timeout_seconds": float(os.getenv('INFERENCE_TIMEOUT_SECONDS', '30')),
+}
+
+# Local embedding classifier in front of the LLM router
+INTENT_CLASSIFIER = {
+    "enabled": os.getenv('INTENT_CLASSIFIER_ENABLED', 'true').lower() == 'true',
+    # Empty: use the threshold calibrated at training time
+    "min_confidence": float(os.getenv('INTENT_CLASSIFIER_MIN_CONFIDENCE')) if os.getenv('INTENT_CLASSIFIER_MIN_CONFIDENCE') else None,
+}
+
+# Retrieval started while the router LLM call is in flight
+SPECULATIVE_RETRIEVAL = {
+    "enabled": os.getenv('SPECULATIVE_RETRIEVAL_ENABLED', 'true').lower() == 'true',
+    "max_topics": int(os.getenv('SPECULATIVE_RETRIEVAL_MAX_TOPICS', '2')),
+    "min_probability": float(os.getenv('SPECULATIVE_RETRIEVAL_MIN_PROBABILITY', '0.2')),
+    "max_workers": int(os.getenv('SPECULATIVE_RETRIEVAL_MAX_WORKERS', '4')),
+    "max_in_flight": int(os.getenv('SPECULATIVE_RETRIEVAL_MAX_IN_FLIGHT', '8')),
+    "ttl_seconds": float(os.getenv('SPECULATIVE_RETRIEVAL_TTL_SECONDS', '60')),
+}
+
+# Templated fallback instead of an LLM call when the best reranked match is below the topic threshold.
+# Thresholds come from calibrate_retrieval_gate.py, RETRIEVAL_GATE_THRESHOLDS overrides them
+# ("tuition_fee=-4.5,graduate=-6"). Topics without a threshold always pass.
+RETRIEVAL_GATE = {
+    "enabled": os.getenv('RETRIEVAL_GATE_ENABLED', 'true').lower() == 'true',
+    "thresholds": {
+        topic.strip(): float(value)
+        for topic, _, value in (item.partition("=") for item in os.getenv('RETRIEVAL_GATE_THRESHOLDS', '').split(",") if "=" in item)
+    },
+    # Decision log for calibrate_retrieval_gate.py --log, off unless a path is set (e.g. logs/retrieval_gate.jsonl).
+    # Rotated at log_max_bytes, questions are only written when RETRIEVAL_GATE_LOG_QUERIES=true
+    "log_path": os.getenv('RETRIEVAL_GATE_LOG', ''),
+    "log_max_bytes": int(os.getenv('RETRIEVAL_GATE_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+    "log_backup_count": int(os.getenv('RETRIEVAL_GATE_LOG_BACKUP_COUNT', '3')),
+    "log_queries": os.getenv('RETRIEVAL_GATE_LOG_QUERIES', 'false').lower() == 'true',
+}
+
+# Search several topics at once when the router is unsure
+MULTI_TOPIC_RETRIEVAL = {
+    "enabled": os.getenv('MULTI_TOPIC_RETRIEVAL_ENABLED', 'true').lower() == 'true',
+    "confidence_threshold": float(os.getenv('MULTI_TOPIC_CONFIDENCE_THRESHOLD', '0.75')),
+    "min_probability": float(os.getenv('MULTI_TOPIC_MIN_PROBABILITY', '0.2')),
+    "max_topics": int(os.getenv('MULTI_TOPIC_MAX_TOPICS', '3')),
+}
+
+# Warm-up and /readyz dependency checks
+HEALTH_CHECK = {
+    # One 1-token completion at warm-up and on every re-check
+    "llm_check": os.getenv('HEALTH_CHECK_LLM', 'true').lower() == 'true',
+    "recheck_seconds": float(os.getenv('HEALTH_CHECK_RECHECK_SECONDS', '60')),
+    "timeout_seconds": float(os.getenv('HEALTH_CHECK_TIMEOUT_SECONDS', '5')),
+}
+
+# Text-to-speech for /speak
+TTS = {
+    "provider": os.getenv('TTS_PROVIDER', 'openai'),  # openai | fake
+    "model": os.getenv('TTS_MODEL', 'tts-1'),
+    "voice": os.getenv('TTS_VOICE', 'alloy'),
+    "cache_dir": os.getenv('TTS_CACHE_DIR', os.path.join(APP_ROOT_PATH, "cache", "tts")),
+    "cache_max_bytes": int(os.getenv('TTS_CACHE_MAX_MB', '200')) * 1024 * 1024,
+    "pipelined": os.getenv('TTS_PIPELINED', 'false').lower() == 'true',
+    "pipeline_parallelism": int(os.getenv('TTS_PIPELINE_PARALLELISM', '3')),
+}
+
+# Admin-only debug endpoints (/admin/..., /chat/metrics, /models/memory), disabled while the token is empty.
+# Clients send the token in the X-Admin-Token header
+ADMIN_API = {
+    "token": os.getenv('ADMIN_API_TOKEN', ''),
+}
+
+# Token budget of the retrieved context in RAG prompts (RAGResponseFormatter). Chunks are packed in
+# rerank order, overlapping chunks of the same source merged, and cut at sentence boundaries.
+# Per-model budgets: CONTEXT_PACKING_MODEL_TOKENS="groq/llama-3.3-70b-versatile=1500,..."
+CONTEXT_PACKING = {
+    "enabled": os.getenv('CONTEXT_PACKING_ENABLED', 'true').lower() == 'true',
+    "context_tokens": int(os.getenv('CONTEXT_PACKING_TOKENS', '800')),
+    "model_context_tokens": {
+        model.strip(): int(value)
+        for model, _, value in (item.rpartition("=") for item in os.getenv('CONTEXT_PACKING_MODEL_TOKENS', '').split(",") if "=" in item)
+    },
+    # Whole prompt cap, the model's own input limit applies when lower
+    "max_prompt_tokens": int(os.getenv('CONTEXT_PACKING_MAX_PROMPT_TOKENS', '6000')),
+    "reserved_output_tokens": int(os.getenv('CONTEXT_PACKING_RESERVED_OUTPUT_TOKENS', '1024')),
+    # Shortest shared text between two chunks treated as splitter overlap (chunk_overlap is 50)
+    "min_overlap_chars": int(os.getenv('CONTEXT_PACKING_MIN_OVERLAP_CHARS', '20')),
+}
+
+# Extractive compression of the retrieved chunks before the prompt: only the sentences the
+# scorer (reranker: cross-encoder | embedder: cosine) ranks highest, with their neighbours.
+# Measure with evaluate_context_compression.py before enabling
+CONTEXT_COMPRESSION = {
+    "enabled": os.getenv('CONTEXT_COMPRESSION_ENABLED', 'false').lower() == 'true',
+    "scorer": os.getenv('CONTEXT_COMPRESSION_SCORER', 'reranker'),
+    "keep_ratio": float(os.getenv('CONTEXT_COMPRESSION_KEEP_RATIO', '0.3')),
+    "min_sentences": int(os.getenv('CONTEXT_COMPRESSION_MIN_SENTENCES', '2')),
+    "max_sentences": int(os.getenv('CONTEXT_COMPRESSION_MAX_SENTENCES', '8')),
+    "neighbours": int(os.getenv('CONTEXT_COMPRESSION_NEIGHBOURS', '1')),
+    # Shorter contexts go to the prompt as they are
+    "min_context_chars": int(os.getenv('CONTEXT_COMPRESSION_MIN_CONTEXT_CHARS', '600')),
+}
+
+# Chat history in prompts: the last `recent_turns` turns verbatim and a rolling summary of the
+# older ones, refreshed after the response is sent (a turn is one user message and its reply)
+CONVERSATION_HISTORY = {
+    "enabled": os.getenv('CONVERSATION_HISTORY_ENABLED', 'true').lower() == 'true',
+    "recent_turns": int(os.getenv('CONVERSATION_HISTORY_RECENT_TURNS', '4')),
+    # The router only needs the latest turns to resolve follow-up questions
+    "router_recent_turns": int(os.getenv('CONVERSATION_HISTORY_ROUTER_RECENT_TURNS', '2')),
+    # Summarize once this many turns have left the window, not after every message
+    "summarize_every_turns": int(os.getenv('CONVERSATION_HISTORY_SUMMARIZE_EVERY_TURNS', '2')),
+    "summary_max_words": int(os.getenv('CONVERSATION_HISTORY_SUMMARY_MAX_WORDS', '150')),
+}
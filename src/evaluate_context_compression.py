@@ -0,0 +1,152 @@
+"""
+Compression ratio and answer-quality impact of the extractive context compression.
+
+Every question of the curated FAQ pairs (or of --eval-file) is retrieved like the
+RAG nodes do, then compressed with each keep ratio. Quality is measured two ways:
+- answer support: share of the reference answer's syllables still present in the
+  context sent to the LLM (no LLM call),
+- with --generate, the answer of the generation model from the full and from the
+  compressed prompt, scored by token F1 against the reference answer.
+
+Usage (from src/):
+    python evaluate_context_compression.py
+    python evaluate_context_compression.py --keep-ratios 0.2 0.3 0.5 --scorer embedder
+    python evaluate_context_compression.py --generate --limit 30
+
+The evaluation file has one {"query", "topic", "answer"} object per line,
+`topic` being a vector store topic (graduate, tuition_fee, regulation_info).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+from litellm import completion
+from dotenv import load_dotenv, find_dotenv
+
+from genai_agent.nodes.router import RAG_STORE_TOPICS
+from genai_agent.vector_db.store_factory import create_vector_store
+from genai_agent.vector_db.faq_index import FAQIndex
+from genai_agent.vector_db.sparse_encoder import syllable_ngrams
+from genai_agent.utils.context_compressor import ContextCompressor
+from genai_agent.utils.rag_formatter import RAGResponseFormatter
+from genai_agent.utils.helpers import remove_think_tag
+from genai_agent.utils.const_prompts import CONST_ASSISTANT_ROLE, CONST_ASSISTANT_TONE, CONST_FORM_ADDRESS_IN_VN
+from config import CONTEXT_COMPRESSION, LLM_MODELS
+
+SYSTEM_PROMPTS = {
+    "ROLE": CONST_ASSISTANT_ROLE,
+    "TONE": CONST_ASSISTANT_TONE,
+    "CONSTRAINTS": f"- Keep the answers concise and under 200 words.\n{CONST_FORM_ADDRESS_IN_VN}",
+}
+
+
+def load_eval_set(path: Optional[str]) -> List[Tuple[str, str, str]]:
+    """(query, store topic, reference answer), the curated FAQ pairs by default"""
+    if path is None:
+        eval_set = []
+        for topic in sorted(set(RAG_STORE_TOPICS.values())):
+            faq_index = FAQIndex.load(topic)
+            if faq_index is not None:
+                eval_set.extend((pair["question"], topic, pair["answer"]) for pair in faq_index.pairs)
+        return eval_set
+    with open(path, encoding="utf-8") as f:
+        return [(item["query"], item["topic"], item["answer"]) for item in map(json.loads, filter(str.strip, f))]
+
+
+def _syllables(text: str) -> List[str]:
+    return syllable_ngrams(text, ngram=1)
+
+
+def answer_support(context: str, answer: str) -> float:
+    """Share of the reference answer's syllables found in the context"""
+    answer_terms = set(_syllables(answer))
+    return len(answer_terms & set(_syllables(context))) / len(answer_terms) if answer_terms else 0.0
+
+
+def token_f1(prediction: str, reference: str) -> float:
+    predicted, expected = Counter(_syllables(prediction)), Counter(_syllables(reference))
+    common = sum((predicted & expected).values())
+    if not common:
+        return 0.0
+    precision, recall = common / sum(predicted.values()), common / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def generate(query: str, matches: List[Dict], model: str) -> Tuple[str, int]:
+    prompt, usage = RAGResponseFormatter.format_prompt_with_usage(
+        query, "\n\n".join(m['content'] for m in matches), "", SYSTEM_PROMPTS, matches=matches, model=model
+    )
+    response = completion(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0
+    )
+    return remove_think_tag(response.choices[0].message.content), usage["total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluation of the extractive context compression")
+    parser.add_argument("--eval-file", default=None)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--keep-ratios", type=float, nargs="+", default=[0.2, CONTEXT_COMPRESSION['keep_ratio'], 0.5])
+    parser.add_argument("--scorer", choices=["reranker", "embedder"], default=CONTEXT_COMPRESSION['scorer'])
+    parser.add_argument("--generate", action="store_true", help="Also compare the LLM answers (one call per query and mode)")
+    parser.add_argument("--model", default=LLM_MODELS['regulation_info_subgraph']['regulation_info_node'])
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv())
+    store = create_vector_store()
+    if not store.is_healthy() or store.reranker is None:
+        print("❌ Vector store is not available")
+        sys.exit(1)
+
+    eval_set = load_eval_set(args.eval_file)[:args.limit]
+    retrieved = []
+    for query, topic, answer in eval_set:
+        matches = store.query(query, topic, k=args.k)
+        if matches:
+            retrieved.append((query, answer, matches))
+    print(f"Evaluating {len(retrieved)} queries, k={args.k}, scorer={args.scorer}"
+          + (f", generation with {args.model}" if args.generate else ""))
+
+    settings = {key: value for key, value in CONTEXT_COMPRESSION.items() if key not in ("enabled", "scorer")}
+    modes = [("full", None)] + [
+        (f"keep_ratio={ratio}", ContextCompressor(**{**settings, "scorer": args.scorer, "keep_ratio": ratio}))
+        for ratio in args.keep_ratios
+    ]
+
+    print(f"\n{'mode':<16} {'ratio':>6} {'support':>8} {'p50 ms':>7}" + (f" {'tokens':>7} {'F1':>6}" if args.generate else ""))
+    for name, compressor in modes:
+        original, compressed, supports, latencies, tokens, f1s = 0, 0, [], [], [], []
+        for query, answer, matches in retrieved:
+            start = time.perf_counter()
+            kept = compressor.compress(query, matches, store)[0] if compressor else matches
+            latencies.append((time.perf_counter() - start) * 1000)
+            original += sum(len(m['content']) for m in matches)
+            compressed += sum(len(m['content']) for m in kept)
+            supports.append(answer_support(" ".join(m['content'] for m in kept), answer))
+            if args.generate:
+                try:
+                    prediction, prompt_tokens = generate(query, kept, args.model)
+                except Exception as e:
+                    print(f"❌ Generation failed for '{query}': {e}")
+                    continue
+                tokens.append(prompt_tokens)
+                f1s.append(token_f1(prediction, answer))
+
+        row = (f"{name:<16} {compressed / max(original, 1):>6.2f} {np.mean(supports):>8.3f} "
+               f"{np.percentile(latencies, 50):>7.1f}")
+        if args.generate and f1s:
+            row += f" {np.mean(tokens):>7.0f} {np.mean(f1s):>6.3f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
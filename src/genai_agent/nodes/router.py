@@ -1,16 +1,24 @@
 import os
+import re
 import json
+import time
+import unicodedata
 from dotenv import load_dotenv, find_dotenv
 from litellm import completion
 from ..schemas.topic import TopicSchema
 from pydantic.tools import parse_obj_as
 from ..states.agent_state import AgentState
-from ..utils.helpers import parsing_messages_to_history, remove_think_tag
+from ..utils.helpers import remove_think_tag, merge_rendered_history
+from ..utils.history_manager import build_chat_history, render_history_update
 from logger import logger
-from config import LLM_MODELS
+from config import LLM_MODELS, INTENT_CLASSIFIER, SPECULATIVE_RETRIEVAL, MULTI_TOPIC_RETRIEVAL
+from ..utils.intent_classifier import IntentClassifier
+from ..utils.speculative_retrieval import speculative_retriever
 
 load_dotenv(find_dotenv())
 
+intent_classifier = IntentClassifier.load() if INTENT_CLASSIFIER['enabled'] else None
+
 TOPIC = {
     "greeting": "greeting",
     "off_topic": "off_topic",
@@ -22,14 +30,92 @@ TOPIC = {
     "wanna_exit": "wanna_exit"
 }
 
-def router_node(state: AgentState):
-    user_input = state['messages'][-1].content
-    chat_history = parsing_messages_to_history(state.get('messages', ''))
+# Topics answered from the vector store, and their topic filter in the index
+RAG_STORE_TOPICS = {
+    "graduate_info": "graduate",
+    "tuition_fee_info": "tuition_fee",
+    "regulation_info": "regulation_info",
+}
+
+# Words of the router prompt that point to a RAG topic, the prior of speculative retrieval
+# when the local intent classifier is not trained or not sure
+ROUTE_KEYWORDS = {
+    "graduate_info": ["thạc sĩ", "cao học", "tiến sĩ", "sau đại học", "nghiên cứu sinh", "luận văn", "luận án"],
+    "tuition_fee_info": ["học phí", "lệ phí", "học bổng", "miễn giảm", "đóng tiền", "bao nhiêu tiền"],
+    "regulation_info": ["quy định", "quy chế", "học vụ", "bảo lưu", "nghỉ học", "thi", "rút môn",
+                        "đăng ký môn", "tốt nghiệp", "điểm"],
+}
+
+# Labeled examples shown to the LLM router, also the seed training set of the local intent classifier
+TOPIC_EXAMPLES = {
+    "greeting": [
+        "Xin chào",
+        "Hello",
+        "Chào bạn",
+        "Em ơi",
+        "Có ai không",
+        "Anh/Chị muốn hỏi chút",
+        "Cho em hỏi tí nha",
+    ],
+    "university_info": [
+        "Trường Bách Khoa ở đâu vậy?",
+        "Cho em hỏi địa chỉ trường Bách Khoa.",
+        "Trường mình có mấy cơ sở?",
+        "Giới thiệu về trường Bách Khoa giúp em.",
+        "Trường Bách Khoa trực thuộc đại học nào?",
+        "Sứ mệnh của trường là gì?",
+        "Trường có bao nhiêu khoa?",
+    ],
+    "undergraduate_info": [
+        "Cho em hỏi ngành Khoa học máy tính của Bách Khoa.",
+        "Ngành Cơ khí học mấy năm vậy ạ?",
+        "Bách Khoa có đào tạo chương trình chất lượng cao không?",
+        "Điểm chuẩn ngành Công nghệ thông tin năm ngoái bao nhiêu?",
+        "Tuyển sinh đại học năm nay thế nào?",
+    ],
+    "graduate_info": [
+        "Bách Khoa có đào tạo thạc sĩ không?",
+        "Điều kiện để học cao học là gì?",
+        "Học tiến sĩ tại Bách Khoa mất bao lâu?",
+        "Có chương trình cao học quốc tế không?",
+    ],
+    "tuition_fee_info": [
+        "Học phí ngành Điện tử của Bách Khoa là bao nhiêu?",
+        "Chương trình tiên tiến học phí có cao không?",
+        "Bách Khoa có học bổng dành cho sinh viên giỏi không?",
+        "Có chính sách miễn giảm học phí cho sinh viên khó khăn không?",
+    ],
+    "regulation_info": [
+        "Quy định về bảo lưu học tập của Bách Khoa là gì?",
+        "Khi nào bị cảnh báo học vụ?",
+        "Nếu bị điểm F thì xử lý như thế nào?",
+        "Quy chế thi lại của trường ra sao?",
+    ],
+    "off_topic": [
+        "Viết thơ đi.",
+        "Nói chuyện vui chút đi.",
+        "Hôm nay thời tiết thế nào?",
+        "Code Python giúp tôi với.",
+    ],
+    "wanna_exit": [
+        "Cảm ơn, em biết rồi.",
+        "Không hỏi nữa nha.",
+        "Thôi để sau hỏi tiếp.",
+        "Bye nhé.",
+    ],
+}
 
+
+def _format_examples(topic: str) -> str:
+    return "\n".join(f"            - {example}" for example in TOPIC_EXAMPLES[topic])
+
+
+def classify_with_llm(user_input: str, chat_history: str) -> TopicSchema:
     json_example = {
         "name": f"Một trong các giá trị sau: {', '.join(TOPIC.values())}",
         "confidence": "Float Score between 0 and 1",
-        "context": "User's input"
+        "context": "User's input",
+        "alternatives": "Danh sách các topic khác cũng có thể phù hợp nếu Assistant không chắc chắn, có thể rỗng"
     }
 
 
@@ -58,73 +144,42 @@ def router_node(state: AgentState):
     1. Greeting:
         - Nếu người dùng chào hỏi Assistant. Return "{TOPIC.get("greeting")}"
         - Example:
-            - Xin chào
-            - Hello
-            - Chào bạn
-            - Em ơi
-            - Có ai không
-            - Anh/Chị muốn hỏi chút
-            - Cho em hỏi tí nha
+{_format_examples("greeting")}
 
     2. Thông tin chung về Trường Đại học Bách Khoa:
         - Nếu người dùng hỏi về các thông tin tổng quan của trường như: lịch sử, địa chỉ, cơ sở, liên hệ, tầm nhìn, sứ mệnh, thành tích. Return "{TOPIC.get("university_info")}"
         - Example:
-            - Trường Bách Khoa ở đâu vậy?
-            - Cho em hỏi địa chỉ trường Bách Khoa.
-            - Trường mình có mấy cơ sở?
-            - Giới thiệu về trường Bách Khoa giúp em.
-            - Trường Bách Khoa trực thuộc đại học nào?
-            - Sứ mệnh của trường là gì?
-            - Trường có bao nhiêu khoa?
+{_format_examples("university_info")}
 
     3. Thông tin chương trình Đại học (Undergraduate):
         - Nếu người dùng hỏi về ngành học, tuyển sinh, điểm chuẩn, chương trình đào tạo, thời gian học, điều kiện xét tuyển ở bậc đại học. Return "{TOPIC.get("undergraduate_info")}"
         - Example:
-            - Cho em hỏi ngành Khoa học máy tính của Bách Khoa.
-            - Ngành Cơ khí học mấy năm vậy ạ?
-            - Bách Khoa có đào tạo chương trình chất lượng cao không?
-            - Điểm chuẩn ngành Công nghệ thông tin năm ngoái bao nhiêu?
-            - Tuyển sinh đại học năm nay thế nào?
+{_format_examples("undergraduate_info")}
 
     4. Thông tin chương trình Sau đại học (Graduate):
         - Nếu người dùng hỏi về chương trình cao học, thạc sĩ, tiến sĩ, hoặc điều kiện xét tuyển sau đại học. Return "{TOPIC.get("graduate_info")}"
         - Example:
-            - Bách Khoa có đào tạo thạc sĩ không?
-            - Điều kiện để học cao học là gì?
-            - Học tiến sĩ tại Bách Khoa mất bao lâu?
-            - Có chương trình cao học quốc tế không?
+{_format_examples("graduate_info")}
 
     5. Thông tin học phí và học bổng:
-        - Nếu người dùng hỏi về học phí và học bổng, các từ "học phí", "lệ phí", "học bổng", hoặc "chính sách miễn giảm học phí",.... Return "{TOPIC.get("tuition_info")}"
+        - Nếu người dùng hỏi về học phí và học bổng, các từ "học phí", "lệ phí", "học bổng", hoặc "chính sách miễn giảm học phí",.... Return "{TOPIC.get("tuition_fee_info")}"
         - Example:
-            - Học phí ngành Điện tử của Bách Khoa là bao nhiêu?
-            - Chương trình tiên tiến học phí có cao không?
-            - Bách Khoa có học bổng dành cho sinh viên giỏi không?
-            - Có chính sách miễn giảm học phí cho sinh viên khó khăn không?
+{_format_examples("tuition_fee_info")}
 
     6. Thông tin quy định và quy chế học tập:
         - Nếu người dùng hỏi về quy định học tập, thi cử, bảo lưu, nghỉ học, cảnh báo học vụ, hoặc các quy chế sinh viên. Return "{TOPIC.get("regulation_info")}"
         - Example:
-            - Quy định về bảo lưu học tập của Bách Khoa là gì?
-            - Khi nào bị cảnh báo học vụ?
-            - Nếu bị điểm F thì xử lý như thế nào?
-            - Quy chế thi lại của trường ra sao?
+{_format_examples("regulation_info")}
 
     7. Off Topic:
         - Nếu câu hỏi không liên quan đến các chủ đề trên. Return "{TOPIC.get("off_topic")}"
         - Example:
-            - Viết thơ đi.
-            - Nói chuyện vui chút đi.
-            - Hôm nay thời tiết thế nào?
-            - Code Python giúp tôi với.
+{_format_examples("off_topic")}
 
     8. Wanna Exit:
         - Nếu người dùng có ý định kết thúc trò chuyện hoặc không muốn hỏi thêm. Return "{TOPIC.get("wanna_exit")}"
         - Example:
-            - Cảm ơn, em biết rồi.
-            - Không hỏi nữa nha.
-            - Thôi để sau hỏi tiếp.
-            - Bye nhé.
+{_format_examples("wanna_exit")}
 
     # Ouput
     - Assistant MUST trả lời bằng JSON format với các field như sau:
@@ -136,6 +191,7 @@ def router_node(state: AgentState):
     - Assistant MUST reply by JSON format ONLY như trong mục Output. No need explaination.
     - Assistant MUST return exactly one of the following topics: {', '.join(TOPIC.values())}.
     - Trong trường hợp Assistant không thể xác định được topic, Assistant DO NOT attempt to guess the topic, just return "{TOPIC.get("off_topic")}".
+    - Nếu câu hỏi có thể thuộc nhiều topic (ví dụ: quy định luận văn thạc sĩ có thể là "{TOPIC.get("graduate_info")}" hoặc "{TOPIC.get("regulation_info")}"), Assistant MUST chọn topic phù hợp nhất cho "name" và liệt kê các topic còn lại trong "alternatives".
     """
 
     response = completion(
@@ -154,24 +210,110 @@ def router_node(state: AgentState):
     new_topic = parse_obj_as(TopicSchema, json.loads(remove_think_tag(response.choices[0].message.content)))
     new_topic.name = new_topic.name.lower()
 
+    if isinstance(new_topic.confidence, str):
+        new_topic.confidence = 0.0
+    new_topic.alternatives = [name.lower() for name in new_topic.alternatives if name.lower() in TOPIC]
+    return new_topic
+
+
+def _keyword_routes(user_input: str) -> list:
+    """RAG routes whose keywords appear in the input, most hits first"""
+    text = unicodedata.normalize("NFC", user_input).lower()
+    hits = {
+        route: sum(1 for keyword in keywords if re.search(rf"(?<!\w){re.escape(keyword)}(?!\w)", text))
+        for route, keywords in ROUTE_KEYWORDS.items()
+    }
+    return [route for route, count in sorted(hits.items(), key=lambda x: x[1], reverse=True) if count]
+
+
+def _speculation_candidates(state, user_input: str, ranking) -> list:
+    """
+    Topics worth prefetching while the LLM router runs: the RAG topic of the previous
+    turn (follow-up questions stay on it), the likely topics of the local classifier,
+    and the topics named by keywords when there is no classifier.
+    """
+    candidates = []
+    if state.get('selected_flow') in RAG_STORE_TOPICS:
+        candidates.append(state['selected_flow'])
+    candidates += [name for name, probability in ranking if probability >= SPECULATIVE_RETRIEVAL['min_probability']]
+    candidates += _keyword_routes(user_input)
+    return list(dict.fromkeys(candidates))
+
+
+def _candidate_topics(new_topic: TopicSchema, ranking) -> list:
+    """Vector store topics to search together when the router is unsure between RAG topics"""
+    if not MULTI_TOPIC_RETRIEVAL['enabled'] or new_topic.name not in RAG_STORE_TOPICS:
+        return []
+    if new_topic.confidence >= MULTI_TOPIC_RETRIEVAL['confidence_threshold']:
+        return []
+
+    routes = [new_topic.name] + new_topic.alternatives + [
+        name for name, probability in ranking if probability >= MULTI_TOPIC_RETRIEVAL['min_probability']
+    ]
+    store_topics = []
+    for route in routes:
+        store_topic = RAG_STORE_TOPICS.get(route)
+        if store_topic and store_topic not in store_topics:
+            store_topics.append(store_topic)
+    store_topics = store_topics[:MULTI_TOPIC_RETRIEVAL['max_topics']]
+    return store_topics if len(store_topics) > 1 else []
+
+
+def router_node(state: AgentState):
+    user_input = state['messages'][-1].content
+    message_id = state['messages'][-1].id
     topic = state.get('topic', None)
+    # Render only this turn's new messages, the state keeps the older ones rendered
+    history_update = render_history_update(state)
+    history_state = {**state, "rendered_history": merge_rendered_history(state.get('rendered_history'), history_update)}
+
+    # 1. Local classifier, decides in milliseconds when confident
+    new_topic, routed_by, ranking = None, "llm", []
+    if intent_classifier is not None:
+        start = time.perf_counter()
+        ranking = intent_classifier.rank(user_input)
+        new_topic = intent_classifier.classify(user_input, INTENT_CLASSIFIER['min_confidence'], ranking=ranking)
+        logger.debug(f"Intent classifier took {(time.perf_counter() - start) * 1000:.1f} ms")
+        if new_topic is not None:
+            routed_by = "local"
+
+    # 2. LLM router for uncertain inputs, with retrieval for the likely topics running meanwhile
+    if new_topic is None:
+        speculative_retriever.speculate(message_id, user_input, _speculation_candidates(state, user_input, ranking))
+        chat_history = build_chat_history(history_state, view="router")
+        new_topic = classify_with_llm(user_input, chat_history)
+
     logger.info(f"Topic: {topic}")
 
-    if isinstance(new_topic.confidence, str):
-        new_topic.confidence = 0.0
     if topic is None:
-        if new_topic.name != TOPIC.get('off_topic') and new_topic.confidence < 0.5:
+        # Unsure between RAG topics: search them all instead of falling back to off_topic
+        candidate_topics = _candidate_topics(new_topic, ranking)
+        if new_topic.name != TOPIC.get('off_topic') and new_topic.confidence < 0.5 and not candidate_topics:
             new_topic.name = TOPIC.get('off_topic')
+        if candidate_topics:
+            logger.info(f"Low confidence route, searching topics: {candidate_topics}")
+
+        # Speculation covers a single topic, multi-topic retrieval runs its own queries
+        speculative_retriever.settle(message_id, None if candidate_topics else new_topic.name)
 
-        logger.info(f"New Topic: {new_topic}")
+        # "New Topic:" lines are LLM labels, the classifier training data (see train_intent_classifier.py)
+        if routed_by == "local":
+            logger.info(f"New Topic (local): {new_topic}")
+        else:
+            logger.info(f"New Topic: {new_topic}")
         return {
             "topic": new_topic,
+            "candidate_topics": candidate_topics,
             "human_input": user_input,
+            "rendered_history": history_update,
             "ai_reply": None
         }
 
+    speculative_retriever.settle(message_id, topic.name)
     return {
+        "candidate_topics": [],
         "human_input": user_input,
+        "rendered_history": history_update,
         "ai_reply": None
     }
     
\ No newline at end of file
@@ -5,7 +5,9 @@ from langchain_core.messages import AIMessage
 from ...states.agent_state import AgentState
 from litellm import completion
 from logger import logger
-from ...utils.helpers import parsing_messages_to_history, remove_think_tag
+from ...utils.helpers import remove_think_tag
+from ...utils.history_manager import build_chat_history
+from ...utils.response_pool import response_pool
 from ...utils.const_prompts import (
     CONST_ASSISTANT_NAME,
     CONST_UNIVERSITY_NAME,
@@ -24,8 +26,20 @@ load_dotenv(find_dotenv())
 
 def off_topic_node(state: AgentState):
     logger.info("off_topic_node called.")
+
+    pooled_reply = response_pool.pick("off_topic", state['messages'])
+    if pooled_reply:
+        ai_message = AIMessage(
+            content=pooled_reply,
+            additional_kwargs={"current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        )
+        return {
+            "messages": ai_message,
+            "ai_reply": ai_message
+        }
+
     user_input = state['messages'][-1].content
-    chat_history = parsing_messages_to_history(state.get('messages', ''))
+    chat_history = build_chat_history(state)
     
     prompt = f"""
     # Role
@@ -6,7 +6,8 @@ from ...states.agent_state import AgentState
 from litellm import completion
 import openai
 from logger import logger
-from ...utils.helpers import parsing_messages_to_history, remove_think_tag
+from ...utils.helpers import remove_think_tag
+from ...utils.history_manager import build_chat_history
 from ...utils.const_prompts import (
     CONST_ASSISTANT_NAME,
     CONST_UNIVERSITY_NAME,
@@ -20,8 +21,13 @@ from ...utils.const_prompts import (
     CONST_ASSISTANT_PRIME_JOB
 )
 from config import LLM_MODELS
-from ...vector_db.pinecone_store import PineconeStore  
-from ...utils.rag_formatter import RAGResponseFormatter 
+from ...vector_db.store_factory import create_vector_store
+from ...utils.rag_formatter import RAGResponseFormatter
+from ...utils.faq_responder import faq_reply
+from ...vector_db.faq_index import FAQIndex
+from ...utils.speculative_retrieval import speculative_retriever
+from ...utils.retrieval_gate import retrieval_gate, fallback_answer
+from ...utils.context_compressor import context_compressor
 
 
 
@@ -30,11 +36,14 @@ load_dotenv(find_dotenv())
 
 # --- Initialize vector store connection once ---
 try:
-    vector_store = PineconeStore()
+    vector_store = create_vector_store()
 except Exception as e:
     logger.error(f"❌ Error initializing vector store: {e}")
     vector_store = None
 
+faq_index = FAQIndex.load("regulation_info")
+speculative_retriever.register("regulation_info", "regulation_info", vector_store)
+
 
 load_dotenv(find_dotenv())
 
@@ -52,19 +61,38 @@ def regulation_info_node(state: AgentState):
         }
     
     user_input = state['messages'][-1].content
-    chat_history = parsing_messages_to_history(state.get('messages', ''))
+    chat_history = build_chat_history(state)
+
+    # 0. FAQ Fast Path
+    faq_update = faq_reply(
+        user_input=user_input,
+        faq_index=faq_index,
+        embedding_model=vector_store.embedding_model,
+        model=LLM_MODELS['regulation_info_subgraph']['regulation_info_node']
+    )
+    if faq_update:
+        return faq_update
 
      # --- 1. RAG Retrieval Step (This is now clean) ---
     logger.info("Retrieving context from vector store...")
     context = "Không tìm thấy thông tin liên quan." # Default context
     matches = [] # Default matches
+    retrieval_failed = False
 
     try:
-        matches = vector_store.query(
-            query_text=user_input,
-            topic="regulation_info",
-            k=3
-        )
+        candidate_topics = state.get('candidate_topics') or []
+        if len(candidate_topics) > 1:
+            # Router was unsure: search every candidate topic and rerank them together
+            matches = vector_store.query_multi(query_text=user_input, topics=candidate_topics, k=3)
+        else:
+            # Prefetched while the router was running, if any
+            matches = speculative_retriever.take(state['messages'][-1].id, "regulation_info", user_input, k=3)
+        if matches is None:
+            matches = vector_store.query(
+                query_text=user_input,
+                topic="regulation_info",
+                k=3
+            )
         
         if not matches:
             logger.warning("No relevant context found")
@@ -79,8 +107,30 @@ def regulation_info_node(state: AgentState):
 
     except Exception as e:
         logger.error(f"❌ Error during RAG query: {e}")
+        retrieval_failed = True
         context = "Lỗi: Không thể truy xuất thông tin về các quy định."
+
+    # 1b. Retrieval Confidence Gate (templated answer, no LLM call)
+    # A failed query is not an empty one: it keeps the error context instead of the "not found" template
+    if retrieval_gate is not None and not retrieval_failed and not retrieval_gate.check(user_input, "regulation_info", matches):
+        ai_message = AIMessage(
+            content=fallback_answer("regulation_info"),
+            additional_kwargs={
+                "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "sources": ""
+            }
+        )
+        return {
+            "messages": ai_message,
+            "ai_reply": ai_message
+        }
     
+    # 1c. Extractive Context Compression (only the sentences relevant to the question go to the LLM)
+    prompt_matches = matches
+    if context_compressor is not None and matches:
+        prompt_matches, _ = context_compressor.compress(user_input, matches, vector_store)
+        context = "\n\n".join(m['content'] for m in prompt_matches)
+
     system_prompts = {
         "ROLE": CONST_ASSISTANT_ROLE,
         "SKILLS": CONST_ASSISTANT_SKILLS,
@@ -106,7 +156,9 @@ def regulation_info_node(state: AgentState):
         user_input=user_input,
         retrieved_context=context,
         chat_history=chat_history,
-        system_prompts=system_prompts
+        system_prompts=system_prompts,
+        matches=prompt_matches,
+        model=LLM_MODELS['regulation_info_subgraph']['regulation_info_node']
     )
     
     # (Optional) Format the sources to pass to the UI
@@ -5,10 +5,17 @@ from litellm import completion
 from langchain_core.messages import AIMessage
 from logger import logger
 from ...states.agent_state import AgentState
-from ...utils.helpers import parsing_messages_to_history, remove_think_tag
-from config import LLM_MODELS
-from ...vector_db.pinecone_store import PineconeStore  
-from ...utils.rag_formatter import RAGResponseFormatter 
+from ...utils.helpers import remove_think_tag
+from ...utils.history_manager import build_chat_history
+from config import LLM_MODELS, STRUCTURED_LOOKUP
+from ...vector_db.store_factory import create_vector_store
+from ...utils.rag_formatter import RAGResponseFormatter
+from ...utils.faq_responder import faq_reply
+from ...vector_db.faq_index import FAQIndex
+from ...utils.speculative_retrieval import speculative_retriever
+from ...utils.retrieval_gate import retrieval_gate, fallback_answer
+from ...utils.context_compressor import context_compressor
+from ...vector_db.table_store import TableStore, format_rows_answer
 
 from ...utils.const_prompts import (
     CONST_ASSISTANT_NAME,
@@ -30,11 +37,21 @@ load_dotenv(find_dotenv())
 
 # Initialize vector store connection 
 try:
-    vector_store = PineconeStore()
+    vector_store = create_vector_store()
 except Exception as e:
     logger.error(f"❌ Error initializing vector store: {e}")
     vector_store = None
 
+faq_index = FAQIndex.load("tuition_fee")
+speculative_retriever.register("tuition_fee_info", "tuition_fee", vector_store)
+
+# Fee and calendar rows from every topic (the academic calendar lives in regulation_info)
+try:
+    table_store = TableStore.load()
+except Exception as e:
+    logger.error(f"❌ Error loading structured table store: {e}")
+    table_store = None
+
 
 def tuition_fee_node(state: AgentState):
     logger.info("tuition_fee_node called.")
@@ -48,19 +65,55 @@ def tuition_fee_node(state: AgentState):
         }
 
     user_input = state['messages'][-1].content
-    chat_history = parsing_messages_to_history(state.get('messages', ''))
+    chat_history = build_chat_history(state)
+
+    # 0. FAQ Fast Path
+    faq_update = faq_reply(
+        user_input=user_input,
+        faq_index=faq_index,
+        embedding_model=vector_store.embedding_model,
+        model=LLM_MODELS['tuition_fee_subgraph']['tuition_fee_node']
+    )
+    if faq_update:
+        return faq_update
+
+    # 0b. Structured Lookup (exact fees and dates)
+    if STRUCTURED_LOOKUP['enabled'] and table_store is not None:
+        rows = table_store.lookup(user_input, min_score=STRUCTURED_LOOKUP['min_score'])
+        if rows:
+            logger.info(f"Structured lookup hit: {len(rows)} rows with score {rows[0]['score']:.3f}")
+            ai_message = AIMessage(
+                content=format_rows_answer(rows),
+                additional_kwargs={
+                    "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "sources": f"- {rows[0]['source']} (table lookup: {rows[0]['score']:.2f})"
+                }
+            )
+            return {
+                "messages": ai_message,
+                "ai_reply": ai_message
+            }
 
     # 1. Retrieval Step
     logger.info("Retrieving context from vector store...")
     context = "Không tìm thấy thông tin liên quan." # Default context
     matches = [] # Default matches
+    retrieval_failed = False
     
     try:
-        matches = vector_store.query(
-            query_text=user_input,
-            topic="tuition_fee",
-            k=3
-        )
+        candidate_topics = state.get('candidate_topics') or []
+        if len(candidate_topics) > 1:
+            # Router was unsure: search every candidate topic and rerank them together
+            matches = vector_store.query_multi(query_text=user_input, topics=candidate_topics, k=3)
+        else:
+            # Prefetched while the router was running, if any
+            matches = speculative_retriever.take(state['messages'][-1].id, "tuition_fee", user_input, k=3)
+        if matches is None:
+            matches = vector_store.query(
+                query_text=user_input,
+                topic="tuition_fee",
+                k=3
+            )
         
         if not matches:
             logger.warning("No relevant context found")
@@ -75,8 +128,30 @@ def tuition_fee_node(state: AgentState):
             
     except Exception as e:
         logger.error(f"❌ Error during RAG query: {e}")
+        retrieval_failed = True
         context = "Lỗi: Không thể truy xuất thông tin học phí."
 
+    # 1b. Retrieval Confidence Gate (templated answer, no LLM call)
+    # A failed query is not an empty one: it keeps the error context instead of the "not found" template
+    if retrieval_gate is not None and not retrieval_failed and not retrieval_gate.check(user_input, "tuition_fee", matches):
+        ai_message = AIMessage(
+            content=fallback_answer("tuition_fee"),
+            additional_kwargs={
+                "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "sources": ""
+            }
+        )
+        return {
+            "messages": ai_message,
+            "ai_reply": ai_message
+        }
+
+    # 1c. Extractive Context Compression (only the sentences relevant to the question go to the LLM)
+    prompt_matches = matches
+    if context_compressor is not None and matches:
+        prompt_matches, _ = context_compressor.compress(user_input, matches, vector_store)
+        context = "\n\n".join(m['content'] for m in prompt_matches)
+
     # 2. Prompt Formatting Step 
     
 
@@ -109,7 +184,9 @@ def tuition_fee_node(state: AgentState):
         user_input=user_input,
         retrieved_context=context,
         chat_history=chat_history,
-        system_prompts=system_prompts
+        system_prompts=system_prompts,
+        matches=prompt_matches,
+        model=LLM_MODELS['tuition_fee_subgraph']['tuition_fee_node']
     )
     
     source_info = RAGResponseFormatter.format_sources(matches)
@@ -5,7 +5,8 @@ from langchain_core.messages import AIMessage
 from ...states.agent_state import AgentState
 import openai
 from logger import logger
-from ...utils.helpers import parsing_messages_to_history, remove_think_tag
+from ...utils.helpers import remove_think_tag
+from ...utils.history_manager import build_chat_history
 from ...utils.const_prompts import (
     CONST_ASSISTANT_NAME,
     CONST_UNIVERSITY_NAME,
@@ -27,7 +28,7 @@ openai.api_key = os.environ["OPENAI_API_KEY"]
 def undergraduate_node(state: AgentState):
     logger.info("undergraduate_node called.")
     user_input = state['messages'][-1].content
-    chat_history = parsing_messages_to_history(state.get('messages', ''))
+    chat_history = build_chat_history(state)
 
     prompt = f"""
     # Role
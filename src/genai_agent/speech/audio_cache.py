@@ -0,0 +1,122 @@
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import AsyncIterator, Optional
+from logger import logger
+
+READ_CHUNK_SIZE = 64 * 1024
+AUDIO_EXTENSION = ".audio"
+
+
+class AudioCache:
+    """
+    On-disk, size-bounded LRU cache of synthesized audio.
+    Files are content-addressed by a hash of (text, voice, model, format).
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "bytes_served": 0, "bytes_written": 0, "evictions": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(AUDIO_EXTENSION):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(AUDIO_EXTENSION)], stat.st_size))
+            elif name.endswith(".part"):
+                # Leftovers of interrupted writes
+                os.remove(path)
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def make_key(text: str, voice: str, model: str, response_format: str) -> str:
+        payload = json.dumps([text, voice, model, response_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + AUDIO_EXTENSION)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the cached file path and mark it as recently used, None on miss"""
+        with self._lock:
+            if key not in self._entries or not os.path.exists(self._path(key)):
+                self._entries.pop(key, None)
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+        os.utime(self._path(key))
+        return self._path(key)
+
+    async def read(self, path: str) -> AsyncIterator[bytes]:
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                with self._lock:
+                    self.metrics["bytes_served"] += len(chunk)
+                yield chunk
+
+    @contextmanager
+    def writer(self, key: str):
+        """
+        Write a new entry through a temp file. The entry is only published
+        when the block completes, so interrupted streams never leave partial audio.
+        """
+        tmp_path = os.path.join(self.cache_dir, f"{key}.{uuid.uuid4().hex}.part")
+        f = open(tmp_path, "wb")
+        try:
+            yield f
+            f.close()
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(key))
+            with self._lock:
+                self._total_bytes += size - self._entries.pop(key, 0)
+                self._entries[key] = size
+                self.metrics["bytes_written"] += size
+                self._evict()
+        except BaseException:
+            f.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.metrics["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted cached audio {key}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                **self.metrics,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
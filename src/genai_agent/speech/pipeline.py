@@ -0,0 +1,135 @@
+import re
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterable, AsyncIterator, List, Union
+from logger import logger
+
+_SENTENCE_END = re.compile(r"(?<=[\.\!\?…:;])\s+|\n+")
+
+
+class SentenceSplitter:
+    """
+    Incrementally cut text into sentences as it arrives, so synthesis can
+    start before the whole answer exists. Very short sentences are merged
+    with the next one to avoid choppy audio and extra provider calls.
+    """
+    def __init__(self, min_chars: int = 40, max_chars: int = 300):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._pending = ""
+
+    def _emit(self, sentence: str) -> List[str]:
+        sentence = sentence.strip()
+        if not sentence:
+            return []
+        self._pending = f"{self._pending} {sentence}".strip()
+        if len(self._pending) < self.min_chars:
+            return []
+        out, self._pending = self._pending, ""
+        return self._split_long(out)
+
+    def _split_long(self, sentence: str) -> List[str]:
+        parts = []
+        while len(sentence) > self.max_chars:
+            cut = sentence.rfind(",", 0, self.max_chars)
+            if cut <= 0:
+                cut = sentence.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            parts.append(sentence[:cut + 1].strip())
+            sentence = sentence[cut + 1:]
+        if sentence.strip():
+            parts.append(sentence.strip())
+        return parts
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        pieces = _SENTENCE_END.split(self._buffer)
+        # The last piece may still be growing
+        self._buffer = pieces.pop()
+        sentences = []
+        for piece in pieces:
+            sentences.extend(self._emit(piece))
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest = f"{self._pending} {self._buffer}".strip()
+        self._buffer, self._pending = "", ""
+        return self._split_long(rest) if rest else []
+
+
+async def _as_text_stream(text: Union[str, AsyncIterable[str]]) -> AsyncIterator[str]:
+    if isinstance(text, str):
+        yield text
+    else:
+        async for delta in text:
+            yield delta
+
+
+async def synthesize_pipelined(tts_service,
+                               text: Union[str, AsyncIterable[str]],
+                               max_parallel: int = 3) -> AsyncIterator[bytes]:
+    """
+    Synthesize sentence by sentence with at most `max_parallel` provider calls
+    in flight, and yield the audio segments in order. The first segment is
+    streamed as it arrives, so playback starts after the first sentence.
+    `text` may be a full answer or an async stream of deltas still being generated.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+    segments: asyncio.Queue = asyncio.Queue()
+    tasks = []
+    end = object()
+
+    async def synthesize(sentence: str, chunks: asyncio.Queue):
+        try:
+            # Acquired in the task: one cancelled before it ran never held a slot
+            async with semaphore:
+                # Closed on cancellation too, so an abandoned sentence leaves no partial cache entry
+                async with aclosing(tts_service.stream(sentence)) as audio:
+                    async for chunk in audio:
+                        await chunks.put(chunk)
+            await chunks.put(end)
+        except Exception as e:
+            await chunks.put(e)
+
+    async def produce():
+        splitter = SentenceSplitter()
+        try:
+            async for delta in _as_text_stream(text):
+                for sentence in splitter.feed(delta):
+                    await start(sentence)
+            for sentence in splitter.flush():
+                await start(sentence)
+        except Exception as e:
+            await segments.put(e)
+        finally:
+            await segments.put(end)
+
+    async def start(sentence: str):
+        chunks: asyncio.Queue = asyncio.Queue()
+        tasks.append(asyncio.create_task(synthesize(sentence, chunks)))
+        await segments.put(chunks)
+
+    producer = asyncio.create_task(produce())
+    segment_count = 0
+    try:
+        while True:
+            chunks = await segments.get()
+            if chunks is end:
+                break
+            if isinstance(chunks, Exception):
+                raise chunks
+            segment_count += 1
+            while True:
+                chunk = await chunks.get()
+                if chunk is end:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        logger.info(f"Pipelined TTS streamed {segment_count} segments")
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,103 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator
+from logger import logger
+from .audio_cache import AudioCache
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), about 26 ms of audio
+_SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+
+
+class OpenAITTSProvider:
+    def __init__(self, client, model: str = "tts-1", voice: str = "alloy", response_format: str = "mp3"):
+        self.client = client
+        self.model = model
+        self.voice = voice
+        self.response_format = response_format
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        """Yield audio bytes as the provider sends them"""
+        async with self.client.audio.speech.with_streaming_response.create(
+            model=self.model,
+            voice=self.voice,  # (alloy, echo, fable, onyx, nova, shimmer)
+            input=text,
+            response_format=self.response_format
+        ) as response:
+            async for chunk in response.iter_bytes(STREAM_CHUNK_SIZE):
+                yield chunk
+
+
+class FakeTTSProvider:
+    """
+    Local provider for tests and offline development: no network, emits
+    playable silent MP3 whose length grows with the text.
+    """
+    def __init__(self, model: str = "fake-tts", voice: str = "silent", response_format: str = "mp3",
+                 chunk_delay: float = 0.0):
+        self.model = model
+        self.voice = voice
+        self.response_format = response_format
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        self.calls += 1
+        # Roughly 15 characters per second of speech
+        frame_count = max(1, len(text) * 38 // 15)
+        frames_per_chunk = max(1, STREAM_CHUNK_SIZE // len(_SILENT_MP3_FRAME))
+        for start in range(0, frame_count, frames_per_chunk):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield _SILENT_MP3_FRAME * min(frames_per_chunk, frame_count - start)
+
+
+class TTSService:
+    def __init__(self, provider, cache: AudioCache):
+        self.provider = provider
+        self.cache = cache
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Serve audio from the cache, or stream it from the provider while
+        filling the cache on a miss. Closing this stream early closes the
+        provider stream and discards the partial cache entry.
+        """
+        key = self.cache.make_key(text, self.provider.voice, self.provider.model, self.provider.response_format)
+        path = self.cache.lookup(key)
+        if path:
+            logger.info(f"TTS cache hit: {key[:12]}")
+            async with aclosing(self.cache.read(path)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        logger.info(f"TTS cache miss: {key[:12]}, streaming from provider")
+        with self.cache.writer(key) as sink:
+            async with aclosing(self.provider.stream(text)) as chunks:
+                async for chunk in chunks:
+                    sink.write(chunk)
+                    yield chunk
+
+
+async def prime_stream(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Pull the first chunk before the response starts, so that provider errors
+    still surface as a proper HTTP error instead of a truncated 200.
+    """
+    try:
+        first_chunk = await stream.__anext__()
+    except StopAsyncIteration:
+        first_chunk = b""
+
+    async def chained():
+        # The response only closes this generator when the client disconnects
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    return chained()
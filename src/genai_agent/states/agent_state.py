@@ -2,10 +2,17 @@ from typing import TypedDict, Annotated
 from langgraph.graph.message import AnyMessage, add_messages    
 from langchain_core.messages import AIMessage
 from ..schemas.topic import TopicSchema
+from ..utils.helpers import merge_rendered_history
 
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages] = None
     human_input: str = "" 
     topic: TopicSchema = None
     selected_flow: str = None
+    candidate_topics: list[str] = None
+    # Rolling summary of the turns older than the recent window (utils/history_manager.py)
+    conversation_summary: str = ""
+    summarized_count: int = 0
+    # Rendered history line of every message, extended with the new messages only
+    rendered_history: Annotated[list[str], merge_rendered_history] = None
     ai_reply: AIMessage = None
\ No newline at end of file
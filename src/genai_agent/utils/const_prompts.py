@@ -60,3 +60,10 @@ CONST_FORM_ADDRESS_IN_VN = f"""
     - Nếu User không cung cấp thông tin gì về giới tính hoặc độ tuổi, Assistant nên sử dụng cách xưng hô chung chung và lịch sự như "Anh/Chị" để tránh gây hiểu lầm.
 """
 
+
+# Office in charge of each knowledge base topic, for answers that redirect the User
+CONST_TOPIC_OFFICES = {
+    "tuition_fee": "Phòng Kế hoạch – Tài chính",
+    "graduate": "Phòng Đào tạo Sau đại học",
+    "regulation_info": "Phòng Đào tạo",
+}
@@ -0,0 +1,112 @@
+import math
+from dataclasses import dataclass
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+from logger import logger
+from config import CONTEXT_COMPRESSION
+from .context_packer import split_sentences
+
+# Between two kept runs of sentences of the same chunk
+GAP_MARKER = " … "
+
+
+@dataclass
+class CompressionStats:
+    original_chars: int = 0
+    compressed_chars: int = 0
+    sentences: int = 0
+    kept_sentences: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size over original size, 1.0 when nothing was removed"""
+        return self.compressed_chars / self.original_chars if self.original_chars else 1.0
+
+
+class ContextCompressor:
+    """
+    Extractive compression of the reranked matches: every sentence is scored against
+    the query in one batch (cross-encoder pairs or embedding cosine), the best ones are
+    kept with `neighbours` sentences on each side, in their original order.
+    Matches keep their metadata, so sources and the confidence gate are unaffected.
+    """
+    def __init__(self,
+                 scorer: str = "reranker",
+                 keep_ratio: float = 0.3,
+                 min_sentences: int = 2,
+                 max_sentences: int = 8,
+                 neighbours: int = 1,
+                 min_context_chars: int = 600):
+        self.scorer = scorer
+        self.keep_ratio = keep_ratio
+        self.min_sentences = min_sentences
+        self.max_sentences = max_sentences
+        self.neighbours = neighbours
+        self.min_context_chars = min_context_chars
+
+    @classmethod
+    def from_config(cls) -> "ContextCompressor":
+        return cls(**{key: value for key, value in CONTEXT_COMPRESSION.items() if key != "enabled"})
+
+    def score(self, query_text: str, sentences: List[str], vector_store) -> np.ndarray:
+        """Relevance of every sentence to the query, with the models already loaded by the store"""
+        if self.scorer == "embedder":
+            model = vector_store.embedding_model
+            query_vector = np.asarray(model.embed_query(query_text), dtype=np.float32)
+            sentence_vectors = np.asarray(model.embed_documents(sentences), dtype=np.float32)
+            norms = np.linalg.norm(sentence_vectors, axis=1) * np.linalg.norm(query_vector)
+            return sentence_vectors @ query_vector / np.maximum(norms, 1e-12)
+        if vector_store.reranker is None:
+            raise RuntimeError("Cross-encoder not loaded")
+        return np.asarray(vector_store.reranker.predict([(query_text, sentence) for sentence in sentences]))
+
+    def compress(self,
+                 query_text: str,
+                 matches: List[Dict[str, Any]],
+                 vector_store) -> Tuple[List[Dict[str, Any]], CompressionStats]:
+        """Matches with only their relevant sentences as 'content', and what was saved"""
+        stats = CompressionStats(original_chars=sum(len(m['content']) for m in matches))
+        chunks = [split_sentences(match['content']) for match in matches]
+        positions = [(i, j) for i, sentences in enumerate(chunks) for j in range(len(sentences))]
+        stats.sentences = len(positions)
+        if stats.original_chars < self.min_context_chars or len(positions) <= self.min_sentences:
+            stats.compressed_chars = stats.original_chars
+            return matches, stats
+
+        try:
+            scores = self.score(query_text, [chunks[i][j] for i, j in positions], vector_store)
+        except Exception as e:
+            logger.error(f"❌ Error scoring sentences for context compression: {e}")
+            stats.compressed_chars = stats.original_chars
+            return matches, stats
+
+        keep_count = min(self.max_sentences, max(self.min_sentences, math.ceil(self.keep_ratio * len(positions))))
+        kept = set()
+        for index in np.argsort(-scores)[:keep_count]:
+            i, j = positions[index]
+            for neighbour in range(max(0, j - self.neighbours), min(len(chunks[i]), j + self.neighbours + 1)):
+                kept.add((i, neighbour))
+        stats.kept_sentences = len(kept)
+
+        compressed = []
+        for i, match in enumerate(matches):
+            runs, run = [], []
+            for j, sentence in enumerate(chunks[i]):
+                if (i, j) in kept:
+                    run.append(sentence)
+                elif run:
+                    runs.append(" ".join(run))
+                    run = []
+            if run:
+                runs.append(" ".join(run))
+            if runs:
+                compressed.append({**match, 'content': GAP_MARKER.join(runs)})
+
+        stats.compressed_chars = sum(len(m['content']) for m in compressed)
+        logger.info(f"Context compression: kept {stats.kept_sentences}/{stats.sentences} sentences, "
+                    f"{stats.compressed_chars}/{stats.original_chars} chars (ratio {stats.ratio:.2f})")
+        return compressed, stats
+
+
+context_compressor = ContextCompressor.from_config() if CONTEXT_COMPRESSION['enabled'] else None
@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+
+import litellm
+from logger import logger
+from config import CONTEXT_PACKING
+
+# Fallback when the model's tokenizer is unavailable (Vietnamese is ~3 characters per token)
+CHARS_PER_TOKEN = 3
+# Chunks are split with chunk_overlap=50, longer shared text is not splitter overlap
+MAX_OVERLAP_CHARS = 200
+SEPARATOR = "\n\n"
+# A cut block shorter than this is noise ("3.", a lone heading), it is dropped instead
+MIN_FRAGMENT_TOKENS = 16
+
+# Not after a digit: "1. Tình hình học Anh văn" is a numbered heading, not a sentence end
+_SENTENCE_END = re.compile(r"(?<=[^\d\s][.!?;:])\s+|\n+")
+# Titles and abbreviations ("PGS. TS. Trần Thiên Phúc", "Tp. HCM") do not end a sentence
+_ABBREVIATION = re.compile(r"(?:^|\s)[A-ZĐ]\w{0,3}\.$")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Prompt tokens of `text` for the generation model"""
+    if not text:
+        return 0
+    try:
+        return litellm.token_counter(model=model or "", text=text)
+    except Exception:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=None)
+def max_input_tokens(model: Optional[str]) -> int:
+    """Prompt limit of the model, capped by CONTEXT_PACKING['max_prompt_tokens']"""
+    limit = CONTEXT_PACKING['max_prompt_tokens']
+    try:
+        model_limit = litellm.get_model_info(model)['max_input_tokens'] if model else None
+    except Exception:
+        model_limit = None
+    return min(limit, model_limit) if model_limit else limit
+
+
+def context_budget(model: Optional[str], other_tokens: int) -> int:
+    """Tokens left for the context once the other prompt sections and the answer are accounted for"""
+    budget = CONTEXT_PACKING['model_context_tokens'].get(model, CONTEXT_PACKING['context_tokens'])
+    room = max_input_tokens(model) - CONTEXT_PACKING['reserved_output_tokens'] - other_tokens
+    return max(0, min(budget, room))
+
+
+def merge_text(first: str, second: str, min_overlap: int) -> Optional[str]:
+    """One text out of two chunks that contain or overlap each other, None when they don't"""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for head, tail in ((first, second), (second, first)):
+        for size in range(min(len(head), len(tail), MAX_OVERLAP_CHARS), min_overlap - 1, -1):
+            if head.endswith(tail[:size]):
+                return head + tail[size:]
+    return None
+
+
+@dataclass
+class ContextBlock:
+    source: str
+    text: str
+    rank: int
+    chunks: int = 1
+
+
+def merge_blocks(matches: List[Dict[str, Any]], min_overlap: int) -> List[ContextBlock]:
+    """Adjacent or overlapping chunks of the same source as one block, ranked by their best chunk"""
+    blocks: List[ContextBlock] = []
+    for rank, match in enumerate(matches):
+        block = ContextBlock(match['metadata'].get('source', ''), match['content'].strip(), rank)
+        # A chunk may bridge two blocks, keep merging until nothing overlaps
+        merged = True
+        while merged:
+            merged = False
+            for other in blocks:
+                if other.source != block.source:
+                    continue
+                text = merge_text(other.text, block.text, min_overlap)
+                if text is not None:
+                    blocks.remove(other)
+                    block = ContextBlock(block.source, text, min(rank, other.rank, block.rank),
+                                         other.chunks + block.chunks)
+                    merged = True
+                    break
+        blocks.append(block)
+    return sorted(blocks, key=lambda b: b.rank)
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for line in text.split("\n"):
+        for sentence in filter(None, (s.strip() for s in _SENTENCE_END.split(line))):
+            if sentences and sentences[-1][1] and _ABBREVIATION.search(sentences[-1][0]):
+                sentences[-1][0] += " " + sentence
+            else:
+                sentences.append([sentence, True])
+        if sentences:
+            # Line breaks always end a sentence
+            sentences[-1][1] = False
+    return [sentence for sentence, _ in sentences]
+
+
+def fit_sentences(text: str, budget: int, model: Optional[str]) -> str:
+    """Longest run of whole sentences from the start of `text` that fits in `budget` tokens"""
+    kept, used = [], 0
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence, model) + 1
+        if used + tokens > budget:
+            break
+        kept.append(sentence)
+        used += tokens
+    return " ".join(kept)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int = 0
+    budget: int = 0
+    chunks: int = 0
+    blocks: int = 0
+    truncated: int = 0
+    dropped: int = 0
+    sources: List[str] = field(default_factory=list)
+
+
+def pack_context(matches: List[Dict[str, Any]], budget: int, model: Optional[str] = None) -> PackedContext:
+    """
+    Fill `budget` tokens with the reranked matches, best first. A block that does not fit
+    is cut after its last whole sentence that does, never in the middle of one.
+    """
+    blocks = merge_blocks(matches, CONTEXT_PACKING['min_overlap_chars'])
+    packed = PackedContext(text="", budget=budget, chunks=len(matches))
+    separator_tokens = count_tokens(SEPARATOR, model)
+    parts = []
+    for block in blocks:
+        room = budget - packed.tokens - (separator_tokens if parts else 0)
+        text = block.text
+        tokens = count_tokens(text, model)
+        if tokens > room:
+            text = fit_sentences(text, room, model)
+            tokens = count_tokens(text, model)
+            if tokens < MIN_FRAGMENT_TOKENS or tokens > room:
+                packed.dropped += 1
+                continue
+            packed.truncated += 1
+        parts.append(text)
+        packed.tokens += tokens + (separator_tokens if len(parts) > 1 else 0)
+        packed.sources.append(block.source)
+    packed.text = SEPARATOR.join(parts)
+    packed.blocks = len(parts)
+    if packed.truncated or packed.dropped:
+        logger.info(f"Context packing: {packed.truncated} blocks cut at a sentence, {packed.dropped} dropped "
+                    f"({packed.tokens}/{budget} tokens)")
+    return packed
@@ -0,0 +1,91 @@
+import os
+from datetime import datetime
+from typing import Optional
+from litellm import completion
+from langchain_core.messages import AIMessage
+from logger import logger
+from config import FAQ_INDEX
+from .helpers import remove_think_tag
+from ..vector_db.faq_index import question_text
+from .const_prompts import CONST_ASSISTANT_ROLE, CONST_FORM_ADDRESS_IN_VN
+
+
+def _rephrase_answer(user_input: str, faq_match: dict, model: str) -> str:
+    prompt = f"""
+    # Role
+    {CONST_ASSISTANT_ROLE}
+
+    # Tasks
+    - Rephrase the Curated Answer so that it directly answers the User's input.
+    - DO NOT add, remove or change any facts, numbers, dates or links of the Curated Answer.
+    - Assistant MUST use the same language as the User's language to reply.
+    {CONST_FORM_ADDRESS_IN_VN}
+
+    Curated Question: {question_text(faq_match)}
+    Curated Answer:
+    ```
+    {faq_match['answer']}
+    ```
+
+    User's input: {user_input}
+    Answer:
+    """
+
+    response = completion(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3
+    )
+    return remove_think_tag(response.choices[0].message.content)
+
+
+def respond_from_faq(user_input: str, faq_index, embedding_model, model: str) -> Optional[dict]:
+    """
+    Answer from the curated FAQ index when the question is a known one.
+    Returns None when there is no confident match, so the caller falls back to RAG.
+    """
+    if not FAQ_INDEX['enabled'] or faq_index is None:
+        return None
+
+    try:
+        faq_match = faq_index.match(user_input, embedding_model, FAQ_INDEX['match_threshold'])
+    except Exception as e:
+        logger.error(f"❌ Error matching FAQ index: {e}")
+        return None
+
+    if faq_match is None:
+        return None
+
+    logger.info(f"FAQ hit ({faq_match['score']:.3f}): {faq_match['question']}")
+
+    content = f"Dạ, {faq_match['answer']}"
+    if FAQ_INDEX['rephrase_with_llm']:
+        try:
+            content = _rephrase_answer(user_input, faq_match, model)
+        except Exception as e:
+            logger.error(f"❌ Error rephrasing FAQ answer, serving curated answer: {e}")
+
+    return {
+        "content": content,
+        "sources": f"- {faq_match['source']} (faq: {faq_match['score']:.2f})"
+    }
+
+
+def faq_reply(user_input: str, faq_index, embedding_model, model: str) -> Optional[dict]:
+    """FAQ fast path of the RAG nodes: their state update, or None to go on with retrieval"""
+    faq_answer = respond_from_faq(user_input, faq_index, embedding_model, model)
+    if not faq_answer:
+        return None
+
+    ai_message = AIMessage(
+        content=faq_answer['content'],
+        additional_kwargs={
+            "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "sources": faq_answer['sources']
+        }
+    )
+    return {
+        "messages": ai_message,
+        "ai_reply": ai_message
+    }
@@ -1,18 +1,31 @@
 from langchain_core.messages import AIMessage, HumanMessage
+from typing import List, Tuple, Union
 import re
 
+def render_message(message) -> str:
+    """History line of one message, empty for the message types the prompts leave out"""
+    if isinstance(message, HumanMessage):
+        return f"UserMessage: {message.content} | Time: {message.additional_kwargs['current_time']}\n"
+    elif isinstance(message, AIMessage):
+        return f"AIMessage: {message.content} | Time: {message.additional_kwargs['current_time']}\n\n"
+    return ""
+
 def parsing_messages_to_history(messages):
     if isinstance(messages, str) and messages == '':
         return ''    
 
-    history = []
-    for message in messages:
-        if isinstance(message, HumanMessage):
-            history.append(f"UserMessage: {message.content} | Time: {message.additional_kwargs['current_time']}\n")
-        elif isinstance(message, AIMessage):
-            history.append(f"AIMessage: {message.content} | Time: {message.additional_kwargs['current_time']}\n\n")    
-    
-    return "".join(history)
+    return "".join(render_message(message) for message in messages)
+
+def merge_rendered_history(current: List[str], update: Union[Tuple[int, List[str]], List[str]]) -> List[str]:
+    """
+    Reducer of AgentState.rendered_history, one rendered line per message.
+    A (start, lines) update replaces the lines from `start` on (usually an append),
+    a list is the full history returned by a subgraph.
+    """
+    if isinstance(update, tuple):
+        start, lines = update
+        return (current or [])[:start] + list(lines)
+    return list(update or [])
 
 def remove_think_tag(content):
   pattern = r"<think>(.|\s)*?<\/think>"
@@ -0,0 +1,158 @@
+import os
+import asyncio
+import weakref
+from typing import List, Dict, Any, Tuple
+from litellm import acompletion
+from logger import logger
+from config import CONVERSATION_HISTORY, LLM_MODELS
+from .helpers import render_message, remove_think_tag
+
+# One user message and its reply
+MESSAGES_PER_TURN = 2
+
+_thread_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def thread_lock(thread_id: str) -> asyncio.Lock:
+    """
+    Serializes the writes to one thread's checkpoint: a /chat turn and the summary
+    update must not both branch from the same checkpoint, one of them would be lost.
+    """
+    lock = _thread_locks.get(thread_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _thread_locks[thread_id] = lock
+    return lock
+
+
+# Turns of verbatim history each consumer gets
+VIEW_TURNS = {
+    "answer": CONVERSATION_HISTORY['recent_turns'],
+    "router": CONVERSATION_HISTORY['router_recent_turns'],
+}
+
+
+def _window_size(view: str = "answer") -> int:
+    return VIEW_TURNS[view] * MESSAGES_PER_TURN
+
+
+def render_history_update(state: Dict[str, Any]) -> Tuple[int, List[str]]:
+    """
+    `rendered_history` update for the messages the cache does not cover yet, usually
+    the previous reply and the new user message. Returned by router_node every turn.
+    """
+    rendered = state.get('rendered_history') or []
+    messages = state.get('messages') or []
+    start = min(len(rendered), len(messages))
+    return start, [render_message(message) for message in messages[start:]]
+
+
+def rendered_lines(state: Dict[str, Any]) -> List[str]:
+    """Rendered line of every message, only the ones missing from the cache are rendered"""
+    rendered = state.get('rendered_history') or []
+    if len(rendered) == len(state.get('messages') or []):
+        return rendered
+    start, lines = render_history_update(state)
+    return rendered[:start] + lines
+
+
+def build_chat_history(state: Dict[str, Any], view: str = "answer") -> str:
+    """
+    Chat history for prompts, joined from the cached rendered lines: the rolling summary
+    of older turns and the last turns verbatim, so its size no longer grows with the
+    length of the thread. The router view keeps fewer turns than the answer view.
+    """
+    lines = rendered_lines(state)
+    if not CONVERSATION_HISTORY['enabled']:
+        return "".join(lines)
+
+    start = max(0, len(lines) - _window_size(view))
+    if view == "answer":
+        # Turns that left the window but are not summarized yet (the refresh runs every few turns)
+        # stay verbatim, within the same bound
+        lag = CONVERSATION_HISTORY['summarize_every_turns'] * MESSAGES_PER_TURN
+        start = max(0, min(state.get('summarized_count') or 0, start), start - lag)
+    recent = "".join(lines[start:])
+    summary = state.get('conversation_summary')
+    if not summary:
+        return recent
+    return f"Summary of the earlier conversation: {summary}\n\n{recent}"
+
+
+class ConversationSummarizer:
+    """
+    Folds the turns that left the recent window into `conversation_summary`, after the
+    response is sent (FastAPI BackgroundTasks). `summarized_count` is the number of
+    messages already in the summary, so every message is summarized once.
+    """
+    def __init__(self, model: str, summary_max_words: int, summarize_every_turns: int):
+        self.model = model
+        self.summary_max_words = summary_max_words
+        self.summarize_every_turns = summarize_every_turns
+
+    def pending(self, state: Dict[str, Any]) -> List[str]:
+        """Rendered messages older than the window and not yet in the summary, once there are enough of them"""
+        lines = rendered_lines(state)
+        start = state.get('summarized_count') or 0
+        end = len(lines) - _window_size()
+        if end - start < self.summarize_every_turns * MESSAGES_PER_TURN:
+            return []
+        return lines[start:end]
+
+    async def summarize(self, summary: str, lines: List[str]) -> str:
+        prompt = f"""
+        # Task
+        Update the summary of a conversation between a student and the university assistant
+        with the new messages below. Keep the student's goals, the facts, numbers and dates
+        already given, and the questions still open. Drop greetings and small talk.
+        Write at most {self.summary_max_words} words, in the language of the conversation.
+        Reply with the summary only.
+
+        # Current summary
+        {summary or "(empty)"}
+
+        # New messages
+        {"".join(lines)}
+
+        Summary:
+        """
+        response = await acompletion(
+            api_key=os.getenv("GROQ_API_KEY"),
+            model=self.model,
+            messages=[{"role": "user", "content": prompt.strip()}],
+            temperature=0
+        )
+        return remove_think_tag(response.choices[0].message.content)
+
+    async def refresh(self, agent_graph, config: Dict[str, Any]):
+        """Summarize the turns that left the window and store the result in the thread's state"""
+        thread_id = config["configurable"]["thread_id"]
+        try:
+            snapshot = await agent_graph.aget_state(config)
+            state = snapshot.values
+            pending = self.pending(state)
+            if not pending:
+                return
+            summarized_count = state.get('summarized_count') or 0
+            summary = await self.summarize(state.get('conversation_summary') or "", pending)
+
+            async with thread_lock(thread_id):
+                # A concurrent refresh already covered these messages
+                latest = (await agent_graph.aget_state(config)).values
+                if (latest.get('summarized_count') or 0) != summarized_count:
+                    return
+                await agent_graph.aupdate_state(config, {
+                    "conversation_summary": summary,
+                    "summarized_count": summarized_count + len(pending),
+                })
+            logger.info(f"Conversation summary of thread '{thread_id}' now covers "
+                        f"{summarized_count + len(pending)} messages")
+        except Exception as e:
+            logger.error(f"❌ Error refreshing conversation summary of thread '{thread_id}': {e}")
+
+
+conversation_summarizer = ConversationSummarizer(
+    LLM_MODELS['conversation_summary']['summarizer'],
+    CONVERSATION_HISTORY['summary_max_words'],
+    CONVERSATION_HISTORY['summarize_every_turns'],
+) if CONVERSATION_HISTORY['enabled'] else None
@@ -0,0 +1,112 @@
+import os
+import unicodedata
+from typing import List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from logger import logger
+from ..schemas.topic import TopicSchema
+from ..vector_db.model_registry import acquire_embedding_model, EMBEDDING_MODEL_NAME
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INTENT_MODEL_PATH = os.path.join(SCRIPT_DIR, "..", "vector_db", "intent_models", "intent_classifier.joblib")
+
+# Softmax temperature over cosine similarities. MiniLM cosines of related
+# sentences sit in a narrow band, so a small temperature is needed to spread them.
+SOFTMAX_TEMPERATURE = 0.05
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _clean(text: str) -> str:
+    return unicodedata.normalize("NFC", text or "").strip()
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid topic classifier over sentence embeddings.
+    The confidence is the softmax probability of the closest centroid,
+    so it is comparable with the LLM router's confidence.
+    """
+    def __init__(self, labels: List[str], centroids: np.ndarray, min_confidence: float,
+                 model_name: str = EMBEDDING_MODEL_NAME, embedding_model=None):
+        self.labels = labels
+        self.centroids = _normalize(np.asarray(centroids, dtype=np.float32))
+        self.min_confidence = min_confidence
+        self.model_name = model_name
+        self._embedding_model = embedding_model
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            # Same instance as the vector stores when the model names match
+            self._embedding_model = acquire_embedding_model(self.model_name)
+        return self._embedding_model
+
+    @staticmethod
+    def embed_examples(texts: List[str], embedding_model) -> np.ndarray:
+        return _normalize(np.asarray(embedding_model.embed_documents([_clean(t) for t in texts]), dtype=np.float32))
+
+    @staticmethod
+    def centroids_from_vectors(topics: List[str], vectors: np.ndarray) -> tuple:
+        """Average the normalized example embeddings of every topic"""
+        labels = sorted(set(topics))
+        topics = np.asarray(topics)
+        centroids = np.vstack([vectors[topics == label].mean(axis=0) for label in labels])
+        return labels, centroids
+
+    def probabilities(self, vectors: np.ndarray) -> np.ndarray:
+        similarities = _normalize(np.atleast_2d(vectors)) @ self.centroids.T
+        logits = similarities / SOFTMAX_TEMPERATURE
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def rank(self, user_input: str) -> List[Tuple[str, float]]:
+        """All topics with their probability, most likely first"""
+        vector = np.asarray(self.embedding_model.embed_query(_clean(user_input)), dtype=np.float32)
+        probs = self.probabilities(vector)[0]
+        return sorted(zip(self.labels, probs.tolist()), key=lambda x: x[1], reverse=True)
+
+    def predict(self, user_input: str) -> TopicSchema:
+        name, confidence = self.rank(user_input)[0]
+        return TopicSchema(name=name, confidence=confidence, context=user_input)
+
+    def classify(self, user_input: str, min_confidence: Optional[float] = None,
+                 ranking: Optional[List[Tuple[str, float]]] = None) -> Optional[TopicSchema]:
+        """Return the topic when confident enough, None to defer to the LLM router"""
+        threshold = self.min_confidence if min_confidence is None else min_confidence
+        name, confidence = (ranking or self.rank(user_input))[0]
+        if confidence < threshold:
+            return None
+        return TopicSchema(name=name, confidence=confidence, context=user_input)
+
+    def save(self, path: str = INTENT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump({
+            "labels": self.labels,
+            "centroids": self.centroids,
+            "min_confidence": self.min_confidence,
+            "model_name": self.model_name,
+        }, path)
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH, embedding_model=None) -> Optional["IntentClassifier"]:
+        """Load a trained classifier, None if it was never trained"""
+        if not os.path.exists(path):
+            logger.warning(f"Intent classifier not found at {path}, routing with the LLM only")
+            return None
+        data = joblib.load(path)
+        logger.info(f"Loaded intent classifier with {len(data['labels'])} topics")
+        return cls(
+            labels=data["labels"],
+            centroids=data["centroids"],
+            min_confidence=data["min_confidence"],
+            model_name=data["model_name"],
+            embedding_model=embedding_model
+        )
@@ -1,5 +1,8 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from logger import logger
+from config import CONTEXT_PACKING
+from .context_packer import count_tokens, context_budget, pack_context
 
 class RAGResponseFormatter:
     @staticmethod
@@ -8,15 +11,62 @@ class RAGResponseFormatter:
         retrieved_context: str,
         chat_history: str,
         system_prompts: Dict[str, str],
-        max_context_length: int = 2000
+        max_context_length: int = 2000,
+        matches: Optional[List[Dict[str, Any]]] = None,
+        model: Optional[str] = None
     ) -> str:
         """
-        Format the RAG prompt with context management and prompt engineering
+        Format the RAG prompt with context management and prompt engineering.
+        With the reranked `matches` and the generation `model`, the context is packed
+        into the model's token budget instead of cut at `max_context_length` characters.
         """
-        # Truncate context if too long while preserving meaning
-        if len(retrieved_context) > max_context_length:
-            retrieved_context = retrieved_context[:max_context_length] + "..."
-            
+        prompt, _ = RAGResponseFormatter.format_prompt_with_usage(
+            user_input, retrieved_context, chat_history, system_prompts, max_context_length, matches, model
+        )
+        return prompt
+
+    @staticmethod
+    def format_prompt_with_usage(
+        user_input: str,
+        retrieved_context: str,
+        chat_history: str,
+        system_prompts: Dict[str, str],
+        max_context_length: int = 2000,
+        matches: Optional[List[Dict[str, Any]]] = None,
+        model: Optional[str] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """Same as `format_prompt`, with the prompt tokens of every section"""
+        if not (CONTEXT_PACKING['enabled'] and matches):
+            # Truncate context if too long while preserving meaning
+            if len(retrieved_context) > max_context_length:
+                retrieved_context = retrieved_context[:max_context_length] + "..."
+            prompt = RAGResponseFormatter._render(user_input, retrieved_context, chat_history, system_prompts)
+            return prompt, {"total": count_tokens(prompt, model)}
+
+        usage = {
+            "system": count_tokens("\n".join(system_prompts.values()), model),
+            "history": count_tokens(chat_history, model),
+            "question": count_tokens(user_input, model),
+            # Headings and instructions of the template
+            "template": count_tokens(RAGResponseFormatter._render("", "", "", {}), model),
+        }
+        packed = pack_context(matches, context_budget(model, sum(usage.values())), model)
+        usage["context"] = packed.tokens
+        usage["context_budget"] = packed.budget
+        usage["total"] = usage["system"] + usage["history"] + usage["question"] + usage["template"] + packed.tokens
+        logger.info("Prompt tokens: " + ", ".join(f"{name}={tokens}" for name, tokens in usage.items()) +
+                    f" ({packed.chunks} chunks packed into {packed.blocks} blocks)")
+
+        prompt = RAGResponseFormatter._render(user_input, packed.text, chat_history, system_prompts)
+        return prompt, usage
+
+    @staticmethod
+    def _render(
+        user_input: str,
+        retrieved_context: str,
+        chat_history: str,
+        system_prompts: Dict[str, str]
+    ) -> str:
         # Structure the prompt
         prompt = f"""
         # Role
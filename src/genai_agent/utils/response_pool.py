@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+from langchain_core.messages import HumanMessage
+from litellm import completion
+from logger import logger
+from config import LLM_MODELS, RESPONSE_POOL
+from .helpers import remove_think_tag
+from .const_prompts import (
+    CONST_ASSISTANT_NAME,
+    CONST_UNIVERSITY_NAME,
+    CONST_UNIVERSITY_HOTLINE,
+    CONST_ASSISTANT_SCOPE_OF_WORK,
+    CONST_FORM_ADDRESS_IN_VN
+)
+
+# Placeholders filled at serving time according to CONST_FORM_ADDRESS_IN_VN:
+#   {Self}/{self}: how the Assistant calls itself ("Em", "Con")
+#   {user}: how the Assistant calls the User ("Anh", "Chị", "Anh/Chị", "Cô", ...)
+SEED_VARIANTS = {
+    "greeting": {
+        "vi": [
+            "Dạ, {Self} chào {user}! {Self} là {assistant_name}, trợ lý ảo của {university}.\n"
+            "{Self} có thể hỗ trợ {user}:\n{scope}\n{user} cần {self} hỗ trợ thông tin gì ạ?",
+            "Dạ, {Self} xin chào {user} ạ! {Self} là {assistant_name} của {university}.\n"
+            "{Self} có thể giúp {user} về:\n{scope}\n{user} muốn tìm hiểu về tuyển sinh, chương trình học, học phí hay học bổng ạ?",
+        ],
+        "en": [
+            "Hello! I am {assistant_name}, the virtual assistant of {university}.\n"
+            "I can help you with:\n{scope}\nWhat would you like to know?",
+            "Hi there! This is {assistant_name} from {university}.\n"
+            "I can support you with:\n{scope}\nHow can I help you today?",
+        ],
+    },
+    "wanna_exit": {
+        "vi": [
+            "Dạ, {Self} cảm ơn {user} đã trò chuyện ạ. Chúc {user} một ngày tốt lành và học tập thật tốt!",
+            "Dạ, tạm biệt {user} ạ! Khi cần thêm thông tin về trường, {user} cứ quay lại hỏi {self} nhé.",
+        ],
+        "en": [
+            "Thank you for chatting with me. Have a great day and good luck with your studies!",
+            "Goodbye! Feel free to come back whenever you need information about the university.",
+        ],
+    },
+    "off_topic": {
+        "vi": [
+            "Dạ, {Self} xin lỗi {user}, {self} chỉ hỗ trợ thông tin về {university}:\n{scope}\n"
+            "Nếu cần hỗ trợ thêm, {user} có thể liên hệ hotline {hotline} ạ.",
+            "Dạ, nội dung này nằm ngoài phạm vi hỗ trợ của {self} ạ. {Self} có thể giúp {user} về:\n{scope}\n"
+            "{user} có câu hỏi nào về trường không ạ?",
+        ],
+        "en": [
+            "Sorry, I can only help with information about {university}:\n{scope}\n"
+            "For other requests, please contact the hotline {hotline}.",
+            "That is outside what I can help with. I can support you with:\n{scope}\n"
+            "Do you have any questions about the university?",
+        ],
+    },
+}
+
+# Words that make up a pure greeting / goodbye. Anything else is "real content".
+_TEMPLATE_WORDS = {
+    "greeting": {
+        "xin", "chao", "hello", "hi", "hey", "alo", "ban", "em", "oi", "co", "ai", "khong", "anh", "chi",
+        "muon", "hoi", "chut", "cho", "ti", "xiu", "nha", "nhe", "a", "ad", "admin", "good", "morning",
+        "afternoon", "evening", "there", "bot", "sticker", "emoji", "icon", "minh", "toi", "con",
+        "chu", "bac", "di",
+    },
+    "wanna_exit": {
+        "cam", "on", "thanks", "thank", "you", "bye", "goodbye", "tam", "biet", "khong", "hoi", "nua",
+        "nha", "nhe", "thoi", "de", "sau", "tiep", "em", "biet", "roi", "ok", "oke", "okay", "vang", "da",
+        "a", "nhieu", "ban", "hen", "gap", "lai", "see", "later", "minh", "toi", "anh", "chi", "con",
+    },
+    "off_topic": set(),
+}
+
+_FLOW_MODELS = {
+    "greeting": ("greeting_subgraph", "greeting_node"),
+    "wanna_exit": ("wanna_exit_subgraph", "wanna_exit_node"),
+    "off_topic": ("off_topic_subgraph", "off_topic_node"),
+}
+
+_FLOW_TASKS = {
+    "greeting": f"Greet the User back, introduce yourself and what you can support:\n{CONST_ASSISTANT_SCOPE_OF_WORK}",
+    "wanna_exit": "Politely say goodbye to the User and wish them a good day or success in their studies (under 50 words).",
+    "off_topic": f"Politely refuse a request that is not related to {CONST_UNIVERSITY_NAME}, remind the User of what you can support:\n{CONST_ASSISTANT_SCOPE_OF_WORK}\nand mention the hotline {CONST_UNIVERSITY_HOTLINE}.",
+}
+
+_VIETNAMESE_CHARS = re.compile(r"[ăâđêôơưáàảãạấầẩẫậắằẳẵặéèẻẽẹếềểễệíìỉĩịóòỏõọốồổỗộớờởỡợúùủũụứừửữựýỳỷỹỵ]", re.IGNORECASE)
+_VIETNAMESE_WORDS = {"chao", "xin", "cam", "on", "tam", "biet", "khong", "em", "anh", "chi", "oi", "nha", "hoi", "thoi"}
+
+_ADDRESS_PATTERN = re.compile(
+    r"\b(?:(?:tôi|mình) là|(?:cho|giúp|với)) (anh|chị|cô|dì|chú|bác)\b|^(anh|chị|cô|dì|chú|bác) (?:muốn|cần|hỏi|là)\b",
+    re.IGNORECASE
+)
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+
+def detect_language(text: str) -> str:
+    if _VIETNAMESE_CHARS.search(text):
+        return "vi"
+    words = set(re.findall(r"\w+", _fold(text)))
+    return "vi" if words & _VIETNAMESE_WORDS else "en"
+
+
+def detect_form_of_address(messages) -> Dict[str, str]:
+    """Pick how to address the User from what they said about themselves (CONST_FORM_ADDRESS_IN_VN)"""
+    user = "Anh/Chị"
+    for message in messages:
+        if not isinstance(message, HumanMessage):
+            continue
+        found = _ADDRESS_PATTERN.search(unicodedata.normalize("NFC", message.content).strip())
+        if found:
+            user = (found.group(1) or found.group(2)).capitalize()
+
+    self_name = "Con" if user in ("Cô", "Dì", "Chú", "Bác") else "Em"
+    return {"user": user, "Self": self_name, "self": self_name.lower()}
+
+
+def carries_real_content(flow: str, text: str) -> bool:
+    """True when the input says more than a greeting / goodbye / short off-topic remark"""
+    words = re.findall(r"\w+", _fold(text))
+    content_words = [w for w in words if w not in _TEMPLATE_WORDS.get(flow, set())]
+    return len(content_words) > RESPONSE_POOL['max_template_words']
+
+
+class ResponsePool:
+    def __init__(self):
+        self.variants: Dict[str, Dict[str, List[str]]] = {
+            flow: {lang: list(texts) for lang, texts in by_lang.items()}
+            for flow, by_lang in SEED_VARIANTS.items()
+        }
+        self.refreshed_at: Dict[str, float] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _generate_variants(self, flow: str, language: str) -> List[str]:
+        subgraph, node = _FLOW_MODELS[flow]
+        language_name = "Vietnamese" if language == "vi" else "English"
+        prompt = f"""
+        # Role
+        - Assistant is {CONST_ASSISTANT_NAME}, the virtual assistant of {CONST_UNIVERSITY_NAME}.
+
+        # Tasks
+        - Write {RESPONSE_POOL['pool_size']} different replies in {language_name} for this situation:
+            {_FLOW_TASKS[flow]}
+        - Form of address rules:
+            {CONST_FORM_ADDRESS_IN_VN}
+        - DO NOT write the actual form of address, use these placeholders instead:
+            "{{Self}}" / "{{self}}" for how Assistant calls itself (capitalized / lowercase), "{{user}}" for how Assistant calls the User.
+
+        # Output
+        - Reply with a JSON list of strings ONLY. No explanation.
+        """
+
+        response = completion(
+            api_key=os.getenv("GROQ_API_KEY"),
+            model=LLM_MODELS[subgraph][node],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.9
+        )
+        content = remove_think_tag(response.choices[0].message.content)
+        content = content[content.find("["): content.rfind("]") + 1]
+        variants = [v for v in json.loads(content) if isinstance(v, str) and v.strip()]
+        # Drop variants with broken placeholders rather than serving them
+        return [v for v in variants if self._render(v, {"user": "", "Self": "", "self": ""}) is not None]
+
+    def _refresh(self, flow: str):
+        try:
+            for language in ("vi", "en"):
+                variants = self._generate_variants(flow, language)
+                if variants:
+                    with self._lock:
+                        self.variants[flow][language] = SEED_VARIANTS[flow][language] + variants
+            logger.info(f"Refreshed response pool for flow: {flow}")
+        except Exception as e:
+            logger.error(f"❌ Error refreshing response pool for flow '{flow}': {e}")
+        finally:
+            with self._lock:
+                self.refreshed_at[flow] = time.time()
+                self._refreshing.discard(flow)
+
+    def _maybe_refresh(self, flow: str):
+        with self._lock:
+            age = time.time() - self.refreshed_at.get(flow, 0)
+            if flow in self._refreshing or age < RESPONSE_POOL['refresh_seconds']:
+                return
+            self._refreshing.add(flow)
+        threading.Thread(target=self._refresh, args=(flow,), daemon=True).start()
+
+    @staticmethod
+    def _render(variant: str, address: Dict[str, str]) -> Optional[str]:
+        try:
+            return variant.format(
+                assistant_name=CONST_ASSISTANT_NAME,
+                university=CONST_UNIVERSITY_NAME,
+                hotline=CONST_UNIVERSITY_HOTLINE,
+                scope=CONST_ASSISTANT_SCOPE_OF_WORK.strip(),
+                **address
+            )
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    def pick(self, flow: str, messages) -> Optional[str]:
+        """
+        Serve a pooled reply for templated inputs.
+        Returns None when pools are disabled or the input carries real content.
+        """
+        if not RESPONSE_POOL['enabled'] or flow not in self.variants:
+            return None
+
+        user_input = messages[-1].content
+        if carries_real_content(flow, user_input):
+            return None
+
+        self._maybe_refresh(flow)
+
+        language = detect_language(user_input)
+        with self._lock:
+            variants = list(self.variants[flow][language])
+
+        reply = self._render(random.choice(variants), detect_form_of_address(messages))
+        if reply:
+            logger.info(f"Serving pooled reply for flow '{flow}' ({language})")
+        return reply
+
+
+response_pool = ResponsePool()
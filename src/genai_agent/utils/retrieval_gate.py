@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import logging
+from logging.handlers import RotatingFileHandler
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from logger import logger
+from config import RETRIEVAL_GATE
+from .const_prompts import CONST_UNIVERSITY_HOTLINE, CONST_TOPIC_OFFICES
+
+THRESHOLDS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vector_db", "retrieval_gate_thresholds.json"
+)
+
+
+class RetrievalGate:
+    """
+    Decide from the reranked scores whether the retrieved context can answer the
+    question. With a `log_path`, every decision is appended to a size-capped JSONL
+    log so thresholds can be tuned (calibrate_retrieval_gate.py --log). Questions are
+    logged as a hash and a length unless `log_queries` is set.
+    """
+    def __init__(self,
+                 thresholds: Dict[str, float],
+                 log_path: Optional[str] = None,
+                 log_max_bytes: int = 10 * 1024 * 1024,
+                 log_backup_count: int = 3,
+                 log_queries: bool = False):
+        self.thresholds = thresholds
+        self.log_path = log_path
+        self.log_queries = log_queries
+        self._decisions = None
+        if log_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+                handler = RotatingFileHandler(log_path, maxBytes=log_max_bytes,
+                                              backupCount=log_backup_count, encoding="utf-8")
+                self._decisions = logging.getLogger(f"retrieval_gate.{os.path.abspath(log_path)}")
+                self._decisions.handlers = [handler]
+                self._decisions.propagate = False
+                self._decisions.setLevel(logging.INFO)
+            except OSError as e:
+                logger.error(f"❌ Error opening retrieval gate log, decisions are not logged: {e}")
+
+    @classmethod
+    def load(cls, path: str = THRESHOLDS_PATH) -> "RetrievalGate":
+        """Calibrated thresholds, overridden by RETRIEVAL_GATE['thresholds']"""
+        thresholds = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                thresholds = json.load(f)
+        thresholds.update(RETRIEVAL_GATE['thresholds'])
+        logger.info(f"Retrieval gate thresholds: {thresholds or 'none (log only)'}")
+        return cls(
+            thresholds,
+            RETRIEVAL_GATE['log_path'],
+            RETRIEVAL_GATE['log_max_bytes'],
+            RETRIEVAL_GATE['log_backup_count'],
+            RETRIEVAL_GATE['log_queries']
+        )
+
+    def check(self, user_input: str, topic: str, matches: List[Dict[str, Any]]) -> bool:
+        """True when the matches are relevant enough to generate an answer from"""
+        threshold, top_score = None, None
+        if not matches:
+            passed, reason = False, "no matches"
+        elif not all(m.get('reranked', True) for m in matches):
+            # Hybrid scores (adaptive rerank skipped the cross-encoder) are on another scale
+            passed, reason = True, "not reranked"
+        else:
+            best = max(matches, key=lambda m: m['score'])
+            # Multi-topic queries: the best chunk's own topic
+            topic = best['metadata'].get('topic', topic)
+            top_score = float(best['score'])
+            threshold = self.thresholds.get(topic)
+            if threshold is None:
+                passed, reason = True, "no threshold"
+            else:
+                passed = top_score >= threshold
+                reason = "above threshold" if passed else "below threshold"
+
+        if not passed:
+            logger.info(f"Retrieval gate closed for topic '{topic}': {reason} (top score {top_score}, threshold {threshold})")
+        self._log(user_input, {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "topic": topic,
+            "top_score": top_score,
+            "scores": [float(m['score']) for m in matches],
+            "threshold": threshold,
+            "passed": passed,
+            "reason": reason,
+        })
+        return passed
+
+    def _log(self, user_input: str, record: Dict[str, Any]):
+        if self._decisions is None:
+            return
+        if self.log_queries:
+            record["query"] = user_input
+        else:
+            # Enough to spot repeated questions without keeping what users wrote
+            record["query_sha256"] = hashlib.sha256(user_input.encode("utf-8")).hexdigest()[:16]
+            record["query_chars"] = len(user_input)
+        self._decisions.info(json.dumps(record, ensure_ascii=False))
+
+
+def fallback_answer(topic: str) -> str:
+    """Answer without an LLM call when nothing relevant was found"""
+    office = CONST_TOPIC_OFFICES.get(topic, "Phòng Đào tạo")
+    return (
+        "Dạ, hiện em chưa tìm thấy thông tin này trong tài liệu của trường. "
+        f"Anh/Chị vui lòng liên hệ {office} hoặc hotline {CONST_UNIVERSITY_HOTLINE} "
+        "để được hỗ trợ chính xác nhất ạ."
+    )
+
+
+retrieval_gate = RetrievalGate.load() if RETRIEVAL_GATE['enabled'] else None
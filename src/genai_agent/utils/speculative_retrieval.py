@@ -0,0 +1,145 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Optional, Any, Tuple
+from logger import logger
+from config import SPECULATIVE_RETRIEVAL
+
+
+class _Speculation:
+    def __init__(self, query_text: str, k: int):
+        self.query_text = query_text
+        self.k = k
+        self.future: Optional[Future] = None
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+
+class SpeculativeRetriever:
+    """
+    Start retrieval for the likely RAG topics while the router LLM call is in flight.
+    Speculations are keyed by the id of the human message, the RAG node of the
+    chosen topic takes its result instead of querying again.
+
+    Waste is bounded by the worker pool size, the number of topics per turn and
+    the number of speculations in flight, and is measured in `metrics`.
+    """
+    def __init__(self, max_workers: int, max_topics: int, max_in_flight: int, ttl_seconds: float):
+        self.max_topics = max_topics
+        self.max_in_flight = max_in_flight
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-retrieval")
+        self._stores: Dict[str, Tuple[str, Any]] = {}
+        self._pending: Dict[Tuple[str, str], _Speculation] = {}
+        self._lock = threading.Lock()
+        self.metrics = {
+            "launched": 0, "hits": 0, "misses": 0, "wasted": 0, "cancelled": 0, "skipped": 0,
+            "saved_seconds": 0.0, "wasted_seconds": 0.0,
+        }
+
+    def register(self, route_topic: str, store_topic: str, vector_store):
+        """Called by the RAG node modules: route topic -> (vector store topic, vector store)"""
+        if vector_store is not None:
+            self._stores[route_topic] = (store_topic, vector_store)
+
+    @staticmethod
+    def _run(speculation: _Speculation, vector_store, store_topic: str):
+        try:
+            return vector_store.query(query_text=speculation.query_text, topic=store_topic, k=speculation.k)
+        finally:
+            speculation.finished_at = time.perf_counter()
+
+    def _drop(self, entry_key: Tuple[str, str], speculation: _Speculation):
+        """Forget a speculation that will not be used. Caller holds the lock."""
+        self._pending.pop(entry_key, None)
+        if speculation.future.cancel():
+            self.metrics["cancelled"] += 1
+            return
+        self.metrics["wasted"] += 1
+        end = speculation.finished_at or time.perf_counter()
+        self.metrics["wasted_seconds"] += end - speculation.started_at
+
+    def _purge_expired(self):
+        now = time.perf_counter()
+        for entry_key, speculation in list(self._pending.items()):
+            if now - speculation.started_at > self.ttl_seconds:
+                self._drop(entry_key, speculation)
+
+    def speculate(self, message_id: str, query_text: str, route_topics: List[str], k: int = 3):
+        """Start retrieval for the given route topics, skipping non-RAG ones"""
+        if not SPECULATIVE_RETRIEVAL['enabled'] or not message_id:
+            return
+
+        with self._lock:
+            self._purge_expired()
+            for route_topic in [t for t in route_topics if t in self._stores][:self.max_topics]:
+                store_topic, vector_store = self._stores[route_topic]
+                entry_key = (message_id, store_topic)
+                if entry_key in self._pending:
+                    continue
+                if len(self._pending) >= self.max_in_flight:
+                    self.metrics["skipped"] += 1
+                    continue
+
+                speculation = _Speculation(query_text, k)
+                speculation.future = self._executor.submit(self._run, speculation, vector_store, store_topic)
+                self._pending[entry_key] = speculation
+                self.metrics["launched"] += 1
+                logger.info(f"Speculative retrieval started for topic '{store_topic}'")
+
+    def settle(self, message_id: str, route_topic: Optional[str]):
+        """The router decided: drop the speculations of every other topic"""
+        keep = self._stores.get(route_topic, (None, None))[0]
+        with self._lock:
+            for entry_key, speculation in list(self._pending.items()):
+                if entry_key[0] == message_id and entry_key[1] != keep:
+                    self._drop(entry_key, speculation)
+
+    def take(self, message_id: str, store_topic: str, query_text: str, k: int = 3) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the prefetched matches for this turn, waiting for them if still running.
+        None when nothing usable was prefetched, the caller then queries as usual.
+        """
+        entry_key = (message_id, store_topic)
+        with self._lock:
+            speculation = self._pending.get(entry_key)
+            if speculation is None or speculation.query_text != query_text or speculation.k != k:
+                if speculation is not None:
+                    self._drop(entry_key, speculation)
+                self.metrics["misses"] += 1
+                return None
+            self._pending.pop(entry_key)
+
+        wait_started = time.perf_counter()
+        try:
+            matches = speculation.future.result()
+        except Exception as e:
+            logger.error(f"❌ Speculative retrieval failed for topic '{store_topic}': {e}")
+            with self._lock:
+                self.metrics["misses"] += 1
+            return None
+
+        # Retrieval time that ran in parallel with the router instead of after it
+        saved = max(0.0, min(speculation.finished_at, wait_started) - speculation.started_at)
+        with self._lock:
+            self.metrics["hits"] += 1
+            self.metrics["saved_seconds"] += saved
+        logger.info(f"Using speculative retrieval for topic '{store_topic}', saved {saved * 1000:.0f} ms")
+        return matches
+
+    def stats(self) -> dict:
+        with self._lock:
+            settled = self.metrics["hits"] + self.metrics["wasted"] + self.metrics["cancelled"]
+            return {
+                **self.metrics,
+                "in_flight": len(self._pending),
+                "hit_rate": self.metrics["hits"] / settled if settled else 0.0,
+            }
+
+
+speculative_retriever = SpeculativeRetriever(
+    max_workers=SPECULATIVE_RETRIEVAL['max_workers'],
+    max_topics=SPECULATIVE_RETRIEVAL['max_topics'],
+    max_in_flight=SPECULATIVE_RETRIEVAL['max_in_flight'],
+    ttl_seconds=SPECULATIVE_RETRIEVAL['ttl_seconds']
+)
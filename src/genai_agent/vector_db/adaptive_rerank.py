@@ -0,0 +1,87 @@
+import threading
+from dataclasses import dataclass
+from typing import List
+from config import ADAPTIVE_RERANK
+
+
+@dataclass
+class RerankPlan:
+    skip: bool
+    candidates: int
+    reason: str
+
+
+class AdaptiveRerankPolicy:
+    """
+    Decide how much cross-encoder work a query needs from its hybrid scores.
+
+    - skip: the top 'k' hybrid scores are at least `skip_margin` above the next
+      candidate, reranking could only reorder chunks that are all kept anyway
+    - shrink: only the candidates within `score_window` of the best hybrid score
+      are reranked (at least `min_candidates`), fewer for short keyword queries
+    - cascade: candidates are reranked in stages of `cascade_stage_size` in hybrid
+      order, stopping when a stage does not change the top 'k'
+    """
+    def __init__(self,
+                 skip_margin: float = 0.15,
+                 score_window: float = 0.2,
+                 min_candidates: int = 8,
+                 short_query_tokens: int = 3,
+                 short_query_candidates: int = 10,
+                 cascade_stage_size: int = 8):
+        self.skip_margin = skip_margin
+        self.score_window = score_window
+        self.min_candidates = min_candidates
+        self.short_query_tokens = short_query_tokens
+        self.short_query_candidates = short_query_candidates
+        self.cascade_stage_size = cascade_stage_size
+        self._lock = threading.Lock()
+        self.metrics = {"queries": 0, "skipped": 0, "candidates": 0, "reranked": 0, "early_exits": 0}
+
+    @classmethod
+    def from_config(cls) -> "AdaptiveRerankPolicy":
+        return cls(**{key: value for key, value in ADAPTIVE_RERANK.items() if key != "enabled"})
+
+    def plan(self, query_text: str, hybrid_scores: List[float], k: int) -> RerankPlan:
+        """`hybrid_scores` sorted from best to worst"""
+        n = len(hybrid_scores)
+        if n <= k:
+            return RerankPlan(False, n, "all")
+
+        if hybrid_scores[k - 1] - hybrid_scores[k] >= self.skip_margin:
+            return RerankPlan(True, k, "decisive margin")
+
+        best = hybrid_scores[0]
+        candidates = sum(1 for score in hybrid_scores if score >= best - self.score_window)
+        candidates = max(candidates, self.min_candidates, k)
+        reason = "score window"
+        if len(query_text.split()) <= self.short_query_tokens and candidates > self.short_query_candidates:
+            candidates, reason = max(self.short_query_candidates, k), "short query"
+        return RerankPlan(False, min(candidates, n), reason)
+
+    def stages(self, candidates: int) -> List[int]:
+        """End offsets of the cascade stages"""
+        size = self.cascade_stage_size
+        if size <= 0 or size >= candidates:
+            return [candidates]
+        return list(range(size, candidates, size)) + [candidates]
+
+    def record(self, candidates: int, plan: RerankPlan, reranked: int, early_exit: bool):
+        with self._lock:
+            self.metrics["queries"] += 1
+            self.metrics["skipped"] += int(plan.skip)
+            self.metrics["candidates"] += candidates
+            self.metrics["reranked"] += reranked
+            self.metrics["early_exits"] += int(early_exit)
+
+    def stats(self) -> dict:
+        with self._lock:
+            queries, candidates = self.metrics["queries"], self.metrics["candidates"]
+            return {
+                **self.metrics,
+                "skip_rate": self.metrics["skipped"] / queries if queries else 0.0,
+                "rerank_fraction": self.metrics["reranked"] / candidates if candidates else 0.0,
+            }
+
+
+adaptive_rerank_policy = AdaptiveRerankPolicy.from_config()
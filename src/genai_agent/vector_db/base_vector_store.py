@@ -1,22 +1,315 @@
-from typing import List, Optional, Dict, Any
+import joblib
+from typing import List, Optional, Dict, Any, Union
 from abc import ABC, abstractmethod
-from langchain_huggingface import HuggingFaceEmbeddings
+from logger import logger
+from config import RERANK_BATCHING, ADAPTIVE_RERANK, SPARSE_ENCODER, QUERY_BATCH
+from .model_registry import (
+    model_registry,
+    load_embedding_model,
+    embedding_model_key,
+    load_reranker,
+    reranker_key,
+    load_batching_reranker,
+    batching_reranker_key,
+    EMBEDDING_MODEL_NAME,
+    RERANKER_MODEL_NAME
+)
+from .adaptive_rerank import AdaptiveRerankPolicy, adaptive_rerank_policy
+from .sparse_encoder import BM25Encoder, bm25_model_path, tfidf_model_path
+from .retrieval_trace import RetrievalTrace
+
+ALL_TOPICS = ["tuition_fee", "graduate", "regulation_info"]
+
 
 class BaseVectorStore(ABC):
     def __init__(self):
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+        # Models are shared with every other store of the process (see model_registry)
+        # and only loaded on first use or by the warm-up
+        self._model_keys = []
+        self._embedding_model = None
+        self.reranker = None
+        self.vectorizers = {}
+        self.rerank_policy = adaptive_rerank_policy if ADAPTIVE_RERANK['enabled'] else None
+
+    def _acquire(self, key: str, factory):
+        """Take a shared model from the registry, holding at most one reference per key"""
+        instance = model_registry.acquire(key, factory)
+        if key in self._model_keys:
+            model_registry.release(key)
+        else:
+            self._model_keys.append(key)
+        return instance
+
+    def load(self):
+        """Load the models needed to query"""
+        if self._embedding_model is None:
+            self._embedding_model = self._acquire(
+                embedding_model_key(EMBEDDING_MODEL_NAME),
+                lambda: load_embedding_model(EMBEDDING_MODEL_NAME)
+            )
+
+    def _release(self, key: str):
+        """Give back one shared model before the store is closed"""
+        if key in self._model_keys:
+            self._model_keys.remove(key)
+            model_registry.release(key)
+
+    def _sparse_encoder_key(self, name: str) -> str:
+        return f"{SPARSE_ENCODER['encoder']}:{name}"
+
+    def _load_vectorizer(self, name: str):
+        """Sparse encoder (TF-IDF or BM25) saved under `name`, a topic or a namespace. None when missing."""
+        if name in self.vectorizers:
+            return self.vectorizers[name]
+        encoder = SPARSE_ENCODER['encoder']
+        if encoder == "bm25":
+            path = bm25_model_path(name)
+            factory = lambda: BM25Encoder.load(path)
+        else:
+            path = tfidf_model_path(name)
+            factory = lambda: joblib.load(path)
+        try:
+            self.vectorizers[name] = self._acquire(self._sparse_encoder_key(name), factory)
+            logger.info(f"Loaded {encoder} sparse encoder: {name}")
+        except FileNotFoundError:
+            logger.warning(f"No {encoder} sparse encoder found at {path}")
+        except Exception as e:
+            logger.error(f"Error loading {path}: {e}")
+        return self.vectorizers.get(name)
+
+    def _load_vectorizers(self):
+        """Sparse encoder of every topic, for the sparse half of the hybrid search"""
+        for topic in ALL_TOPICS:
+            self._load_vectorizer(topic)
+
+    def _load_reranker(self):
+        """Cross-encoder for the second retrieval stage, shared like the embedder"""
+        if self.reranker is not None:
+            return
+        try:
+            # Batched across concurrent requests, same predict() interface
+            if RERANK_BATCHING['enabled']:
+                key, factory = batching_reranker_key(RERANKER_MODEL_NAME), load_batching_reranker
+            else:
+                key, factory = reranker_key(RERANKER_MODEL_NAME), load_reranker
+            self.reranker = self._acquire(key, lambda: factory(RERANKER_MODEL_NAME))
+            logger.info("✅ Loaded cross-encoder reranking model.")
+        except Exception as e:
+            logger.error(f"❌ Error loading cross-encoder model: {e}")
+
+    def _rerank(self,
+                query_text: str,
+                matches: List[Dict[str, Any]],
+                k: int,
+                policy: Optional[AdaptiveRerankPolicy] = None) -> List[Dict[str, Any]]:
+        """STAGE 2: RERANKING (Precise Re-ordering) and STAGE 3: Format Output"""
+        reranked = True
+        if policy is not None:
+            matches, reranked = self._adaptive_rerank(query_text, matches, k, policy)
+        else:
+            logger.info(f"Reranking {len(matches)} documents...")
+
+            # 2a. Create pairs of [query, document_text]
+            pairs = []
+            for match in matches:
+                pairs.append( (query_text, match['metadata']['page_content']) )
+
+            # 2b. Run all pairs through the reranker model
+            scores = self.reranker.predict(pairs)
+
+            # 2c. Add the new (better) scores back to the original matches
+            for i, match in enumerate(matches):
+                match['rerank_score'] = scores[i]
+
+        return self._top_k(matches, k, reranked)
+
+    def _top_k(self, matches: List[Dict[str, Any]], k: int, reranked: bool) -> List[Dict[str, Any]]:
+        # 2d. Sort all matches by the new rerank_score
+        sorted_matches = sorted(matches, key=lambda x: x['rerank_score'], reverse=True)
+
+        # 2e. Get the final top 'k' (e.g., 3)
+        final_top_k = sorted_matches[:k]
+
+        final_matches = []
+        for match in final_top_k:
+            final_matches.append({
+                'content': match['metadata']['page_content'],
+                'score': match['rerank_score'],
+                'metadata': match['metadata'],
+                # False: the score is the hybrid score, the cross-encoder was skipped
+                'reranked': reranked
+            })
+
+        return final_matches
+
+    def _adaptive_rerank(self,
+                         query_text: str,
+                         matches: List[Dict[str, Any]],
+                         k: int,
+                         policy: AdaptiveRerankPolicy):
+        """Rerank only what the policy asks for. Returns the scored matches and whether the cross-encoder ran."""
+        matches = sorted(matches, key=lambda m: m['score'], reverse=True)
+        plan = policy.plan(query_text, [m['score'] for m in matches], k)
+
+        if plan.skip:
+            logger.info(f"Skipping rerank of {len(matches)} documents ({plan.reason})")
+            for match in matches[:k]:
+                match['rerank_score'] = match['score']
+            policy.record(len(matches), plan, 0, False)
+            return matches[:k], False
+
+        logger.info(f"Reranking {plan.candidates}/{len(matches)} documents ({plan.reason})...")
+        candidates = matches[:plan.candidates]
+        start, early_exit = 0, False
+        for end in policy.stages(len(candidates)):
+            stage = candidates[start:end]
+            scores = self.reranker.predict([(query_text, m['metadata']['page_content']) for m in stage])
+            for match, score in zip(stage, scores):
+                match['rerank_score'] = score
+
+            # Early exit: later stages have lower hybrid scores, stop once a stage brings nothing into the top 'k'
+            top_ids = {m['id'] for m in sorted(candidates[:end], key=lambda x: x['rerank_score'], reverse=True)[:k]}
+            if start >= k and not top_ids & {m['id'] for m in stage} and end < len(candidates):
+                start, early_exit = end, True
+                break
+            start = end
+
+        policy.record(len(matches), plan, start, early_exit)
+        return candidates[:start], True
+
+    @property
+    def embedding_model(self):
+        self.load()
+        return self._embedding_model
+
+    def close(self):
+        """Release the shared models held by this store"""
+        for key in self._model_keys:
+            model_registry.release(key)
+        self._model_keys = []
     
     @abstractmethod
     def query(self, 
              query_text: str, 
              topic: str, 
              k: int = 3) -> List[Dict[str, Any]]:
-        """Query the vector store"""
+        """Query the vector store. Raises when it fails, an empty list means nothing was found."""
         pass
     
+    def explain(self,
+                query_text: str,
+                topic: str,
+                k: int = 3,
+                retrieve_k: int = 25) -> Dict[str, Any]:
+        """
+        Run `query` step by step and report what happened: wall time of every stage
+        (dense embedding, sparse transform, vector search, rerank), the hybrid candidates
+        with their hybrid and rerank scores and rank changes, and the final results.
+        """
+        trace = RetrievalTrace(query_text, topic)
+        if not self.is_healthy():
+            raise ConnectionError("Vector store not healthy")
+
+        with trace.stage("dense_embedding"):
+            dense_vector = self._embedding_model.embed_query(query_text)
+
+        matches = self._hybrid_retrieve(query_text, dense_vector, topic, retrieve_k, trace)
+        # Plain dicts, _rerank writes its scores into them
+        candidates = [{"id": m['id'], "score": m['score'], "metadata": m['metadata']} for m in matches]
+
+        results = []
+        if candidates:
+            with trace.stage("rerank"):
+                results = self._rerank(query_text, candidates, k, self.rerank_policy)
+        return trace.report(candidates, results)
+
+    def query_multi(self,
+                    query_text: str,
+                    topics: List[str],
+                    k: int = 3) -> List[Dict[str, Any]]:
+        """Query several topics and keep the best 'k' matches overall"""
+        matches = []
+        for topic in topics:
+            matches.extend(self.query(query_text, topic, k=k))
+        return sorted(matches, key=lambda m: m['score'], reverse=True)[:k]
+
+    def query_batch(self,
+                    query_texts: List[str],
+                    topics: Union[str, List[str]],
+                    k: int = 3,
+                    retrieve_k: int = 25) -> List[List[Dict[str, Any]]]:
+        """
+        Same results as calling `query` for every (query, topic) pair, for evaluation runs
+        and cache warming: the queries are embedded in one forward pass, retrieved
+        concurrently, and their (query, chunk) pairs reranked together in large batches.
+        `topics` is one topic per query, or a single topic for all of them.
+        """
+        if isinstance(topics, str):
+            topics = [topics] * len(query_texts)
+        if len(topics) != len(query_texts):
+            raise ValueError(f"Got {len(query_texts)} queries but {len(topics)} topics")
+        if not query_texts:
+            return []
+
+        try:
+            if not self.is_healthy():
+                raise ConnectionError("Vector store not healthy")
+
+            dense_vectors = self._embedding_model.embed_documents(list(query_texts))
+            candidates = self._retrieve_batch(query_texts, dense_vectors, topics, retrieve_k)
+            return self._rerank_batch(query_texts, candidates, k)
+
+        except Exception as e:
+            logger.error(f"❌ Error querying a batch of {len(query_texts)} queries: {e}")
+            raise
+
+    def _retrieve_batch(self,
+                        query_texts: List[str],
+                        dense_vectors: List[List[float]],
+                        topics: List[str],
+                        retrieve_k: int) -> List[List[Dict[str, Any]]]:
+        """STAGE 1 for every query, in order. Stores with a network round trip run them concurrently."""
+        return [
+            self._hybrid_retrieve(query_text, dense_vector, topic, retrieve_k)
+            for query_text, dense_vector, topic in zip(query_texts, dense_vectors, topics)
+        ]
+
+    def _rerank_batch(self,
+                      query_texts: List[str],
+                      candidates: List[List[Dict[str, Any]]],
+                      k: int) -> List[List[Dict[str, Any]]]:
+        """STAGE 2 for every query: one cross-encoder call over all the pairs"""
+        if self.rerank_policy is not None:
+            # The adaptive cascade decides per query how much to rerank
+            return [
+                self._rerank(query_text, matches, k, self.rerank_policy) if matches else []
+                for query_text, matches in zip(query_texts, candidates)
+            ]
+
+        pairs = [
+            (query_text, match['metadata']['page_content'])
+            for query_text, matches in zip(query_texts, candidates)
+            for match in matches
+        ]
+        if not pairs:
+            return [[] for _ in query_texts]
+
+        logger.info(f"Reranking {len(pairs)} documents for {len(query_texts)} queries...")
+        scores = self.reranker.predict(pairs, batch_size=QUERY_BATCH['rerank_batch_size'])
+
+        results, offset = [], 0
+        for matches in candidates:
+            for match, score in zip(matches, scores[offset:offset + len(matches)]):
+                match['rerank_score'] = score
+            offset += len(matches)
+            results.append(self._top_k(matches, k, True) if matches else [])
+        return results
+
     @abstractmethod
     def is_healthy(self) -> bool:
         """Check if vector store connection is healthy"""
-        pass
\ No newline at end of file
+        pass
+
+    def check_connection(self) -> bool:
+        """Round trip to the backend, for readiness probes"""
+        return self.is_healthy()
\ No newline at end of file
@@ -0,0 +1,144 @@
+import time
+import queue
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from logger import logger
+
+
+class _RerankRequest:
+    def __init__(self, pairs: List[Tuple[str, str]], batch_size: Optional[int] = None):
+        self.pairs = pairs
+        self.batch_size = batch_size
+        self.scores: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class BatchingReranker:
+    """
+    Cross-encoder wrapper with the same `predict(pairs)` interface that merges the
+    pairs of concurrent requests into one forward pass.
+
+    A batch is dispatched as soon as no other caller is waiting, so a lone request
+    is not delayed. Under load, the worker waits up to `max_wait_ms` or until
+    `max_batch_size` pairs are collected, then scatters the scores back.
+    The merged pairs go through the model `forward_batch_size` at a time, or the
+    smallest `batch_size` asked by the callers of the batch.
+    A caller waits at most `timeout_seconds` for its scores.
+    """
+    def __init__(self,
+                 model,
+                 max_batch_size: int = 128,
+                 max_wait_ms: float = 5.0,
+                 forward_batch_size: int = 32,
+                 timeout_seconds: float = 30.0,
+                 on_close=None):
+        self._model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.forward_batch_size = forward_batch_size
+        self.timeout_seconds = timeout_seconds
+        self._on_close = on_close
+        self._queue: "queue.Queue[Optional[_RerankRequest]]" = queue.Queue()
+        self._callers = 0
+        self._carry: Optional[_RerankRequest] = None
+        self._lock = threading.Lock()
+        self.metrics = {"requests": 0, "batches": 0, "pairs": 0, "max_batch_pairs": 0}
+        self._worker = threading.Thread(target=self._loop, name="rerank-batcher", daemon=True)
+        self._worker.start()
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: Optional[int] = None) -> np.ndarray:
+        if not pairs:
+            return np.asarray([])
+        if not self._worker.is_alive():
+            raise RuntimeError("The reranking batcher is not running")
+        request = _RerankRequest(list(pairs), batch_size)
+        with self._lock:
+            self._callers += 1
+        try:
+            self._queue.put(request)
+            deadline = time.monotonic() + self.timeout_seconds
+            # Short waits, a worker that died does not hold the caller until the deadline
+            while not request.done.wait(timeout=min(0.5, max(0.0, deadline - time.monotonic()))):
+                if not self._worker.is_alive():
+                    raise RuntimeError("The reranking batcher stopped before scoring the request")
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Reranking {len(pairs)} pairs took more than {self.timeout_seconds}s")
+        finally:
+            with self._lock:
+                self._callers -= 1
+        if request.error is not None:
+            raise request.error
+        return request.scores
+
+    def _others_waiting(self, batch_size: int) -> bool:
+        with self._lock:
+            return self._callers > batch_size
+
+    def _collect(self, first: _RerankRequest) -> List[_RerankRequest]:
+        batch, size = [first], len(first.pairs)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size and self._others_waiting(len(batch)):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Closing: put the sentinel back for the main loop
+                self._queue.put(None)
+                break
+            if size + len(request.pairs) > self.max_batch_size:
+                # Starts the next batch
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.pairs)
+        return batch
+
+    def _loop(self):
+        while True:
+            first, self._carry = self._carry or self._queue.get(), None
+            if first is None:
+                return
+            batch = self._collect(first)
+            pairs = [pair for request in batch for pair in request.pairs]
+            batch_size = min([request.batch_size for request in batch if request.batch_size] or [self.forward_batch_size])
+            try:
+                scores = np.asarray(self._model.predict(pairs, batch_size=batch_size))
+                offset = 0
+                for request in batch:
+                    request.scores = scores[offset: offset + len(request.pairs)]
+                    offset += len(request.pairs)
+            except Exception as e:
+                logger.error(f"❌ Error in batched reranking of {len(pairs)} pairs: {e}")
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+            with self._lock:
+                self.metrics["requests"] += len(batch)
+                self.metrics["batches"] += 1
+                self.metrics["pairs"] += len(pairs)
+                self.metrics["max_batch_pairs"] = max(self.metrics["max_batch_pairs"], len(pairs))
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+        if self._on_close:
+            self._on_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches = self.metrics["batches"]
+            return {
+                **self.metrics,
+                "avg_requests_per_batch": self.metrics["requests"] / batches if batches else 0.0,
+                "avg_pairs_per_batch": self.metrics["pairs"] / batches if batches else 0.0,
+            }
@@ -0,0 +1,84 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterable
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DOCSTORE_PATH = os.path.join(SCRIPT_DIR, "docstore", "chunks.sqlite3")
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+
+class ChunkDocstore:
+    """
+    Chunk text and metadata keyed by vector id, so Pinecone only has to return
+    ids and scores. Readers get one connection per thread.
+    """
+    def __init__(self, path: str = DOCSTORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id TEXT PRIMARY KEY, topic TEXT NOT NULL, page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS chunks_topic ON chunks (topic)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def put_many(self, records: Iterable[Dict[str, Any]]):
+        """Insert or replace chunks given as {"id", "metadata"} with the text in metadata['page_content']"""
+        rows = []
+        for record in records:
+            metadata = dict(record["metadata"])
+            page_content = metadata.pop("page_content")
+            rows.append((record["id"], metadata.get("topic", ""), page_content, json.dumps(metadata, ensure_ascii=False)))
+        with self._connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", rows)
+
+    def delete_stale(self, topic: str, keep_ids: Iterable[str]) -> int:
+        """Drop the chunks of `topic` that are not in `keep_ids`, after a rebuild went live"""
+        keep_ids = set(keep_ids)
+        connection = self._connection()
+        stale = [(row[0],) for row in connection.execute("SELECT id FROM chunks WHERE topic = ?", (topic,))
+                 if row[0] not in keep_ids]
+        with connection:
+            connection.executemany("DELETE FROM chunks WHERE id = ?", stale)
+        return len(stale)
+
+    def get_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """{id: metadata with 'page_content'} for the ids that are stored"""
+        connection = self._connection()
+        found = {}
+        for i in range(0, len(ids), _LOOKUP_BATCH_SIZE):
+            batch = ids[i:i + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            for chunk_id, page_content, metadata in connection.execute(
+                f"SELECT id, page_content, metadata FROM chunks WHERE id IN ({placeholders})", batch
+            ):
+                found[chunk_id] = {**json.loads(metadata), "page_content": page_content}
+        return found
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
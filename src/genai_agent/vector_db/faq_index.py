@@ -0,0 +1,171 @@
+import os
+import re
+import unicodedata
+from typing import List, Dict, Any, Optional
+
+import joblib
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FAQ_SAVE_DIR = os.path.join(SCRIPT_DIR, "faq_models")
+
+# Documents that are written as explicit question/answer sheets
+FAQ_SOURCE_PATTERNS = [
+    "Các câu hỏi",
+    "Các thông tin cần biết",
+    "câu hỏi thường gặp",
+]
+
+MIN_ANSWER_LENGTH = 20
+
+_HEADING_NUMBERING = re.compile(r"^\s*(?:[IVX]+|\d+|[a-zA-Z])\s*[\.\)\-–]\s+")
+
+
+def _nfc(text: str) -> str:
+    return unicodedata.normalize("NFC", text or "")
+
+
+def is_faq_source(source: str) -> bool:
+    """Check if a KB file is one of the curated Q&A documents"""
+    source = _nfc(os.path.basename(source)).lower()
+    return any(_nfc(pattern).lower() in source for pattern in FAQ_SOURCE_PATTERNS)
+
+
+def _is_bold(paragraph) -> bool:
+    """Every run with text is bold, directly or through the paragraph style"""
+    runs = [run for run in paragraph.runs if run.text.strip()]
+    style_bold = bool(paragraph.style is not None and paragraph.style.font.bold)
+    return bool(runs) and all(run.bold or (run.bold is None and style_bold) for run in runs)
+
+
+def _clean_question(line: str) -> str:
+    line = _HEADING_NUMBERING.sub("", line)
+    return line.rstrip(":").strip()
+
+
+def question_text(pair: Dict[str, str]) -> str:
+    """
+    What is embedded for a pair: the headings are short ("Quy định", "Tư vấn"),
+    the document title and the section say what they are about
+    """
+    return ": ".join(part for part in (pair["title"], pair["section"], pair["question"]) if part)
+
+
+def extract_qa_pairs(docx_path: str) -> List[Dict[str, str]]:
+    """
+    Split a Q&A document into (question, answer) pairs.
+    The documents write every question as a bold paragraph ("2. Nguyên tắc xét:",
+    "Học phí:") or end it with a question mark, the answer is every following
+    paragraph until the next question. A bold first paragraph is the document title,
+    a question directly followed by other questions ("B. CÁC THÔNG TIN CẦN BIẾT:")
+    is the section of the pairs below it.
+    """
+    import docx
+
+    document = docx.Document(docx_path)
+    source = _nfc(os.path.basename(docx_path))
+    paragraphs = [(paragraph, _nfc(paragraph.text).replace("\xa0", " ").strip()) for paragraph in document.paragraphs]
+    paragraphs = [(paragraph, line) for paragraph, line in paragraphs if line]
+
+    title = os.path.splitext(source)[0]
+    if paragraphs and _is_bold(paragraphs[0][0]):
+        title = _clean_question(paragraphs[0][1])
+        paragraphs = paragraphs[1:]
+
+    pairs = []
+    section, question, answer_lines = "", None, []
+
+    def flush():
+        nonlocal section
+        answer = "\n".join(answer_lines).strip()
+        if question is None:
+            return
+        if len(answer) >= MIN_ANSWER_LENGTH:
+            pairs.append({
+                "question": question,
+                "section": section,
+                "title": title,
+                "answer": answer,
+                "source": source,
+            })
+        elif not answer:
+            section = question
+
+    for paragraph, line in paragraphs:
+        if _is_bold(paragraph) or line.endswith("?"):
+            flush()
+            question, answer_lines = _clean_question(line), []
+        else:
+            answer_lines.append(line)
+    flush()
+
+    return pairs
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def build_faq_index(topic: str, doc_path: str, embedding_model) -> Optional[str]:
+    """
+    Extract Q&A pairs from the FAQ documents of a topic folder, embed their
+    questions and save them as a dedicated index. Returns the saved path.
+    """
+    pairs = []
+    for name in sorted(os.listdir(doc_path)):
+        if name.lower().endswith(".docx") and is_faq_source(name):
+            pairs.extend(extract_qa_pairs(os.path.join(doc_path, name)))
+
+    path = os.path.join(FAQ_SAVE_DIR, f"{topic}_faq.joblib")
+    if not pairs:
+        # An index left by a previous build must not outlive its pairs
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    embeddings = embedding_model.embed_documents([question_text(pair) for pair in pairs])
+    embeddings = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+
+    os.makedirs(FAQ_SAVE_DIR, exist_ok=True)
+    joblib.dump({"pairs": pairs, "embeddings": embeddings}, path)
+    return path
+
+
+class FAQIndex:
+    def __init__(self, topic: str, pairs: List[Dict[str, str]], embeddings: np.ndarray):
+        self.topic = topic
+        self.pairs = pairs
+        self.embeddings = embeddings
+
+    @classmethod
+    def load(cls, topic: str) -> Optional["FAQIndex"]:
+        """Load the FAQ index of a topic, None if it was never built"""
+        path = os.path.join(FAQ_SAVE_DIR, f"{topic}_faq.joblib")
+        if not os.path.exists(path):
+            return None
+        data = joblib.load(path)
+        return cls(topic, data["pairs"], data["embeddings"])
+
+    def match(self,
+              query_text: str,
+              embedding_model,
+              threshold: float) -> Optional[Dict[str, Any]]:
+        """Return the curated pair closest to the query if it is similar enough"""
+        if not self.pairs:
+            return None
+
+        query_vector = np.asarray(embedding_model.embed_query(query_text), dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return None
+
+        similarities = self.embeddings @ (query_vector / norm)
+        best = int(np.argmax(similarities))
+        score = float(similarities[best])
+        if score < threshold:
+            return None
+
+        return {**self.pairs[best], "score": score}
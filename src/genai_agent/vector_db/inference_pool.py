@@ -0,0 +1,242 @@
+import os
+import itertools
+import threading
+import multiprocessing
+from multiprocessing.managers import BaseManager
+from typing import Any, List, Optional, Tuple, Union
+
+import numpy as np
+from logger import logger
+
+
+class _InferenceManager(BaseManager):
+    pass
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """"host:port" for TCP, anything else is a unix socket path"""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit() and not address.startswith("/"):
+        return host, int(port)
+    return address
+
+
+def require_authkey(authkey: Optional[bytes]) -> bytes:
+    """
+    The manager protocol unpickles what it receives, whoever knows the key can run
+    code in the server: there is no default key, server and clients refuse to start
+    """
+    if not authkey:
+        raise RuntimeError("INFERENCE_AUTHKEY is not set, generate one with: "
+                           "python -c 'import secrets; print(secrets.token_hex(32))'")
+    return authkey
+
+
+def _load_worker_models(backend: str):
+    from .model_registry import load_embedding_model, load_reranker
+    return load_embedding_model(backend=backend), load_reranker(backend=backend)
+
+
+def _worker_main(backend: str, task_queue, result_queue, threads: int, load_models=_load_worker_models):
+    """
+    Inference loop of a spawned worker. It loads its own copy of the models after
+    sizing the torch thread pool, then reports (None, ok, detail) once.
+    """
+    try:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+        embedding_model, reranker = load_models(backend)
+    except Exception as e:
+        result_queue.put((None, False, repr(e)))
+        return
+    result_queue.put((None, True, multiprocessing.current_process().name))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        task_id, kind, payload = task
+        try:
+            if kind == "embed_query":
+                result = embedding_model.embed_query(payload)
+            elif kind == "embed_documents":
+                result = embedding_model.embed_documents(payload)
+            elif kind == "rerank":
+                pairs, batch_size = payload
+                result = [float(score) for score in reranker.predict(pairs, batch_size=batch_size)]
+            else:
+                raise ValueError(f"Unknown inference task: {kind}")
+            result_queue.put((task_id, True, result))
+        except Exception as e:
+            result_queue.put((task_id, False, repr(e)))
+
+
+class InferenceService:
+    """
+    Lives in the server process. The manager serves every client connection in
+    its own thread, calls are handed to the worker pool and wait for their result.
+    """
+    def __init__(self, task_queue, result_queue, workers: int, timeout: float):
+        self._task_queue = task_queue
+        self._result_queue = result_queue
+        self._workers = workers
+        self._timeout = timeout
+        self._ids = itertools.count()
+        self._waiting = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._dispatch_results, name="inference-results", daemon=True).start()
+
+    def _dispatch_results(self):
+        while True:
+            task_id, ok, result = self._result_queue.get()
+            with self._lock:
+                slot = self._waiting.get(task_id)
+            if slot is not None:
+                slot["result"] = (ok, result)
+                slot["done"].set()
+
+    def _call(self, kind: str, payload: Any):
+        slot = {"done": threading.Event(), "result": None}
+        task_id = next(self._ids)
+        with self._lock:
+            self._waiting[task_id] = slot
+        try:
+            self._task_queue.put((task_id, kind, payload))
+            if not slot["done"].wait(self._timeout):
+                raise TimeoutError(f"Inference task '{kind}' timed out")
+            ok, result = slot["result"]
+            if not ok:
+                raise RuntimeError(result)
+            return result
+        finally:
+            with self._lock:
+                self._waiting.pop(task_id, None)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call("embed_query", text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call("embed_documents", texts)
+
+    def rerank(self, pairs: List[Tuple[str, str]], batch_size: int = 32) -> List[float]:
+        return self._call("rerank", (pairs, batch_size))
+
+    def ping(self) -> int:
+        return self._workers
+
+
+def start_workers(backend: str, workers: int, threads_per_worker: int, load_timeout: float = 600.0,
+                  load_models=_load_worker_models):
+    """
+    Spawn `workers` inference processes and wait until each one has loaded its models.
+    Spawned, not forked: a child forked after torch has started its OpenMP / intra-op
+    thread pools can deadlock on their locks, so the parent never loads a model.
+    Returns (processes, task_queue, result_queue).
+    """
+    context = multiprocessing.get_context("spawn")
+    task_queue, result_queue = context.Queue(), context.Queue()
+    processes = [
+        context.Process(
+            target=_worker_main,
+            args=(backend, task_queue, result_queue, threads_per_worker, load_models),
+            name=f"inference-worker-{i}",
+            daemon=True
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        for _ in processes:
+            _, ok, detail = result_queue.get(timeout=load_timeout)
+            if not ok:
+                raise RuntimeError(f"An inference worker could not load the models: {detail}")
+    except BaseException:
+        for process in processes:
+            process.terminate()
+        raise
+    return processes, task_queue, result_queue
+
+
+def serve(address: str, authkey: bytes, workers: int, threads_per_worker: int, timeout: float, backend: str):
+    """
+    Start `workers` inference processes running the `backend` models, then serve
+    web processes over local IPC until interrupted.
+    """
+    authkey = require_authkey(authkey)
+    processes, task_queue, result_queue = start_workers(backend, workers, threads_per_worker)
+
+    service = InferenceService(task_queue, result_queue, workers, timeout)
+    _InferenceManager.register("inference", callable=lambda: service)
+    address = parse_address(address)
+    manager = _InferenceManager(address=address, authkey=authkey)
+    if isinstance(address, str):
+        os.makedirs(os.path.dirname(address) or ".", mode=0o700, exist_ok=True)
+        if os.path.exists(address):
+            os.remove(address)
+        # Only this user can connect to the socket, it is created 0600 rather than chmod-ed after bind
+        umask = os.umask(0o177)
+        try:
+            server = manager.get_server()
+        finally:
+            os.umask(umask)
+    else:
+        server = manager.get_server()
+    logger.info(f"✅ Inference server with {workers} workers listening on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        for _ in processes:
+            task_queue.put(None)
+        for process in processes:
+            process.join(timeout=5)
+
+
+class _RemoteClient:
+    """One connection per thread, manager proxies are not thread-safe"""
+    def __init__(self, address: str, authkey: bytes):
+        self.address = parse_address(address)
+        self.authkey = require_authkey(authkey)
+        self._local = threading.local()
+
+    def _service(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            _InferenceManager.register("inference")
+            manager = _InferenceManager(address=self.address, authkey=self.authkey)
+            manager.connect()
+            service = self._local.service = manager.inference()
+        return service
+
+    def call(self, method: str, *args):
+        try:
+            return getattr(self._service(), method)(*args)
+        except (EOFError, ConnectionError, BrokenPipeError):
+            # Server restarted: reconnect once
+            self._local.service = None
+            return getattr(self._service(), method)(*args)
+
+
+class RemoteEmbeddings:
+    """HuggingFaceEmbeddings interface backed by the inference server"""
+    def __init__(self, address: str, authkey: bytes):
+        self._client = _RemoteClient(address, authkey)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._client.call("embed_query", text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._client.call("embed_documents", list(texts))
+
+
+class RemoteReranker:
+    """CrossEncoder.predict interface backed by the inference server"""
+    def __init__(self, address: str, authkey: bytes):
+        self._client = _RemoteClient(address, authkey)
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self._client.call("rerank", [tuple(pair) for pair in pairs], batch_size))
@@ -0,0 +1,106 @@
+import os
+import shutil
+from typing import List, Dict, Any, Optional
+
+import joblib
+import numpy as np
+import scipy.sparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOCAL_INDEX_DIR = os.path.join(SCRIPT_DIR, "local_index")
+
+DENSE_FILE = "dense.npy"
+SPARSE_FILE = "sparse.npz"
+CHUNKS_FILE = "chunks.joblib"
+
+
+def save_partition(topic: str,
+                   ids: List[str],
+                   dense_vectors,
+                   sparse_matrix: scipy.sparse.csr_matrix,
+                   metadatas: List[Dict[str, Any]],
+                   index_dir: str = LOCAL_INDEX_DIR) -> str:
+    """
+    Save the chunks of one topic: dense vectors as a .npy matrix (memory-mapped
+    at query time), TF-IDF rows as a CSR matrix and the metadata in row order.
+    The partition is written next to the old one and swapped in at the end.
+    Returns the partition directory.
+    """
+    dense = np.asarray(dense_vectors, dtype=np.float32)
+    if not (len(ids) == dense.shape[0] == sparse_matrix.shape[0] == len(metadatas)):
+        raise ValueError(f"Partition '{topic}' has mismatched row counts")
+
+    path = os.path.join(index_dir, topic)
+    tmp_path, old_path = f"{path}.tmp", f"{path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, DENSE_FILE), dense)
+    scipy.sparse.save_npz(os.path.join(tmp_path, SPARSE_FILE), scipy.sparse.csr_matrix(sparse_matrix, dtype=np.float32))
+    joblib.dump({"ids": list(ids), "metadatas": list(metadatas)}, os.path.join(tmp_path, CHUNKS_FILE))
+
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+class LocalPartition:
+    """Chunks of one topic, the local equivalent of a Pinecone `topic` filter"""
+    def __init__(self,
+                 topic: str,
+                 ids: List[str],
+                 dense: np.ndarray,
+                 sparse: scipy.sparse.csr_matrix,
+                 metadatas: List[Dict[str, Any]]):
+        self.topic = topic
+        self.ids = ids
+        self.dense = dense
+        self.sparse = sparse
+        self.metadatas = metadatas
+
+    @classmethod
+    def load(cls, topic: str, index_dir: str = LOCAL_INDEX_DIR) -> Optional["LocalPartition"]:
+        """Load the partition of a topic, None if it was never built"""
+        path = os.path.join(index_dir, topic)
+        if not os.path.exists(os.path.join(path, DENSE_FILE)):
+            return None
+        chunks = joblib.load(os.path.join(path, CHUNKS_FILE))
+        return cls(
+            topic,
+            chunks["ids"],
+            # Read-only memory map: pages are shared by every process on the host
+            np.load(os.path.join(path, DENSE_FILE), mmap_mode="r"),
+            scipy.sparse.load_npz(os.path.join(path, SPARSE_FILE)).tocsr(),
+            chunks["metadatas"]
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self,
+               dense_vector,
+               sparse_vector: Optional[scipy.sparse.csr_matrix],
+               top_k: int) -> List[Dict[str, Any]]:
+        """
+        Hybrid top-k with the same scoring as the Pinecone dotproduct index:
+        dense dot product plus sparse TF-IDF dot product.
+        """
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        scores = self.dense @ np.asarray(dense_vector, dtype=np.float32)
+        if sparse_vector is not None and sparse_vector.nnz:
+            # CSR matrix times a dense query row stays a single sparse pass
+            scores = scores + self.sparse @ sparse_vector.toarray().ravel().astype(np.float32)
+
+        top_k = min(top_k, len(self))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": self.ids[i], "score": float(scores[i]), "metadata": dict(self.metadatas[i])}
+            for i in top
+        ]
@@ -0,0 +1,151 @@
+import os
+import threading
+from typing import List, Dict, Any, Optional
+from logger import logger
+from .base_vector_store import BaseVectorStore
+from .local_index import LocalPartition, LOCAL_INDEX_DIR
+from .retrieval_trace import RetrievalTrace
+
+
+def _load_partition(topic: str, index_dir: str) -> LocalPartition:
+    partition = LocalPartition.load(topic, index_dir)
+    if partition is None:
+        raise FileNotFoundError(os.path.join(index_dir, topic))
+    return partition
+
+
+class LocalVectorStore(BaseVectorStore):
+    """
+    In-process replacement for PineconeStore, built by upload_pinecone.py --backend local.
+    Same 2-stage HYBRID + RERANK contract, without the network round trip.
+    """
+    TOPICS = ["tuition_fee", "graduate", "regulation_info"]
+
+    def __init__(self, index_dir: str = LOCAL_INDEX_DIR):
+        super().__init__()
+        self.index_dir = index_dir
+        self.partitions: Dict[str, LocalPartition] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """Load the models and memory-map the topic partitions, failed parts are retried"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                super().load()
+            except Exception as e:
+                logger.error(f"❌ Error loading embedding model: {e}")
+
+            for topic in self.TOPICS:
+                if topic in self.partitions:
+                    continue
+                try:
+                    # Shared by every store of the process like the models
+                    partition = self._acquire(
+                        f"local-index:{self.index_dir}:{topic}",
+                        lambda: _load_partition(topic, self.index_dir)
+                    )
+                    self.partitions[topic] = partition
+                    logger.info(f"Loaded local index partition '{topic}' ({len(partition)} chunks)")
+                except FileNotFoundError:
+                    logger.warning(f"No local index partition for topic: {topic}")
+                except Exception as e:
+                    logger.error(f"❌ Error loading local index partition '{topic}': {e}")
+
+            self._load_vectorizers()
+            self._load_reranker()
+
+            self._loaded = all([self._embedding_model, self.partitions, self.reranker])
+
+    def _hybrid_retrieve(self,
+                         query_text: str,
+                         dense_vector: List[float],
+                         topic: str,
+                         retrieve_k: int,
+                         trace: Optional[RetrievalTrace] = None) -> List[Dict[str, Any]]:
+        """STAGE 1: HYBRID RETRIEVAL (Broad Search) in the partition of one topic"""
+        trace = trace or RetrievalTrace(query_text, topic)
+        partition = self.partitions.get(topic)
+        if partition is None:
+            logger.warning(f"No local index partition for topic: {topic}")
+            return []
+
+        vectorizer = self.vectorizers.get(topic)
+        if not vectorizer:
+            logger.warning(f"No sparse vectorizer for topic '{topic}', falling back to dense-only search.")
+            sparse_vector = None
+        else:
+            with trace.stage("sparse_transform"):
+                sparse_vector = vectorizer.transform([query_text])
+            trace.note(sparse_terms=int(sparse_vector.nnz))
+
+        with trace.stage("local_search"):
+            matches = partition.search(dense_vector, sparse_vector, retrieve_k)
+        if not matches:
+            logger.warning(f"No documents found in retrieval phase for topic: {topic}")
+        return matches
+
+    def query(self,
+              query_text: str,
+              topic: str,
+              k: int = 3,
+              retrieve_k: int = 25
+             ) -> List[Dict[str, Any]]:
+        """
+        Query the local index with a 2-stage HYBRID + RERANK process.
+        1. Retrieve 'retrieve_k' docs using hybrid search (dense + sparse).
+        2. Rerank those docs to get the final 'k' best results.
+        An empty list means nothing was found, a failure raises.
+        """
+        try:
+            if not self.is_healthy():
+                raise ConnectionError("Local index not loaded")
+
+            dense_vector = self._embedding_model.embed_query(query_text)
+
+            original_matches = self._hybrid_retrieve(query_text, dense_vector, topic, retrieve_k)
+            if not original_matches:
+                return []
+
+            return self._rerank(query_text, original_matches, k, self.rerank_policy)
+
+        except Exception as e:
+            logger.error(f"❌ Error querying local index with hybrid rerank: {e}")
+            raise
+
+    def query_multi(self,
+                    query_text: str,
+                    topics: List[str],
+                    k: int = 3,
+                    retrieve_k: int = 25
+                   ) -> List[Dict[str, Any]]:
+        """Hybrid retrieval in several partitions, then ONE rerank over the merged candidates"""
+        try:
+            if not self.is_healthy():
+                raise ConnectionError("Local index not loaded")
+
+            dense_vector = self._embedding_model.embed_query(query_text)
+
+            # In-process search is sub-millisecond, no need for threads
+            merged = {}
+            for topic in topics:
+                for match in self._hybrid_retrieve(query_text, dense_vector, topic, retrieve_k):
+                    merged.setdefault(match['id'], match)
+            if not merged:
+                return []
+
+            logger.info(f"Merged {len(merged)} candidates from topics: {', '.join(topics)}")
+            return self._rerank(query_text, list(merged.values()), k, self.rerank_policy)
+
+        except Exception as e:
+            logger.error(f"❌ Error querying local index across topics {topics}: {e}")
+            raise
+
+    def is_healthy(self) -> bool:
+        """Check if the store is usable, loading it on first call"""
+        self.load()
+        return bool(self.partitions) and self._embedding_model is not None
@@ -0,0 +1,223 @@
+import os
+import sys
+import time
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from logger import logger
+from config import INFERENCE_BACKEND, INFERENCE_WORKERS, RERANK_BATCHING
+from .onnx_backend import is_onnx_available, find_quantized_model, onnx_model_kwargs
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class _Entry:
+    def __init__(self, name: str):
+        self.name = name
+        self.instance: Any = None
+        self.refs = 0
+        self.load_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+def _torch_bytes(module) -> int:
+    return sum(t.numel() * t.element_size() for t in list(module.parameters()) + list(module.buffers()))
+
+
+def _attribute_bytes(instance: Any, depth: int = 1) -> int:
+    """Arrays and lookup tables held in the attributes, `depth` levels down (TfidfVectorizer keeps the IDF in `_tfidf`)"""
+    try:
+        attributes = vars(instance)
+    except TypeError:
+        return 0
+    total = 0
+    for value in attributes.values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+        elif isinstance(value, dict):
+            total += sys.getsizeof(value) + sum(sys.getsizeof(key) for key in value)
+        elif depth and hasattr(value, "__dict__"):
+            total += _attribute_bytes(value, depth - 1)
+    return total
+
+
+def estimate_bytes(instance: Any) -> Optional[int]:
+    """
+    Approximate memory held by a model, vectorizer or client, None when unknown.
+    Cheap enough for every /models/memory call: nothing is serialized.
+    """
+    # torch modules (SentenceTransformer) and wrappers around them (HuggingFaceEmbeddings keeps it in `_client`, CrossEncoder in `model`)
+    for attribute in (None, "_client", "client", "model"):
+        candidate = instance if attribute is None else getattr(instance, attribute, None)
+        if candidate is not None and hasattr(candidate, "parameters") and hasattr(candidate, "buffers"):
+            try:
+                return _torch_bytes(candidate)
+            except Exception:
+                pass
+    return _attribute_bytes(instance) or None
+
+
+def _process_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide owner of heavy objects (embedder, reranker, TF-IDF vectorizers, Pinecone client).
+    Every object is created on first acquire and shared afterwards. References are
+    counted and an object is dropped when its last user releases it.
+    """
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name: str) -> _Entry:
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(name)
+            return self._entries[name]
+
+    def acquire(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the shared instance, creating it with `factory` the first time"""
+        entry = self._entry(name)
+        # Per entry lock: loading one model does not block the others
+        with entry.lock:
+            if entry.instance is None:
+                start = time.perf_counter()
+                entry.instance = factory()
+                entry.load_seconds = time.perf_counter() - start
+                logger.info(f"✅ Loaded shared model '{name}' in {entry.load_seconds:.2f}s")
+            entry.refs += 1
+            return entry.instance
+
+    def release(self, name: str):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            return
+        with entry.lock:
+            entry.refs = max(0, entry.refs - 1)
+            if entry.refs == 0 and entry.instance is not None:
+                instance, entry.instance = entry.instance, None
+                if hasattr(instance, "close"):
+                    instance.close()
+                logger.info(f"Released shared model '{name}'")
+
+    def get(self, name: str) -> Any:
+        """The instance if it is loaded, None otherwise. Does not take a reference."""
+        with self._lock:
+            entry = self._entries.get(name)
+        return entry.instance if entry else None
+
+    def memory_report(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries.values())
+        models: List[Dict[str, Any]] = []
+        for entry in entries:
+            instance = entry.instance
+            if instance is None:
+                continue
+            models.append({
+                "name": entry.name,
+                "refs": entry.refs,
+                "load_seconds": entry.load_seconds,
+                "bytes": estimate_bytes(instance),
+            })
+        return {
+            "models": models,
+            "total_model_bytes": sum(m["bytes"] or 0 for m in models),
+            "process_rss_bytes": _process_rss_bytes(),
+        }
+
+
+model_registry = ModelRegistry()
+
+
+@lru_cache(maxsize=None)
+def _onnx_model_dir(model_name: str, backend: Optional[str]) -> Optional[str]:
+    """Exported int8 model to use, None for the PyTorch path"""
+    if (backend or INFERENCE_BACKEND['backend']) != "onnx":
+        return None
+    if not is_onnx_available():
+        logger.warning("ONNX backend requested but optimum[onnxruntime] is not installed, using PyTorch")
+        return None
+    model_dir = find_quantized_model(model_name, INFERENCE_BACKEND['quantization'])
+    if model_dir is None:
+        logger.warning(f"No int8 ONNX export for '{model_name}', using PyTorch "
+                       f"(run benchmark_inference_backends.py --export)")
+    return model_dir
+
+
+def _is_remote(backend: Optional[str]) -> bool:
+    """Inference goes to the worker pool unless a backend is asked for explicitly"""
+    return backend is None and INFERENCE_WORKERS['mode'] == "remote"
+
+
+def _backend_suffix(model_name: str, backend: Optional[str]) -> str:
+    if _is_remote(backend):
+        return "@remote"
+    return "@onnx-int8" if _onnx_model_dir(model_name, backend) else ""
+
+
+def embedding_model_key(model_name: str = EMBEDDING_MODEL_NAME, backend: Optional[str] = None) -> str:
+    return f"embedding:{model_name}{_backend_suffix(model_name, backend)}"
+
+
+def load_embedding_model(model_name: str = EMBEDDING_MODEL_NAME, backend: Optional[str] = None):
+    if _is_remote(backend):
+        from .inference_pool import RemoteEmbeddings
+        return RemoteEmbeddings(INFERENCE_WORKERS['address'], INFERENCE_WORKERS['authkey'])
+    from langchain_huggingface import HuggingFaceEmbeddings
+    model_dir = _onnx_model_dir(model_name, backend)
+    if model_dir:
+        # Same HuggingFaceEmbeddings interface, SentenceTransformer runs the int8 graph
+        return HuggingFaceEmbeddings(model_name=model_dir, model_kwargs=onnx_model_kwargs(INFERENCE_BACKEND['quantization']))
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def acquire_embedding_model(model_name: str = EMBEDDING_MODEL_NAME):
+    return model_registry.acquire(embedding_model_key(model_name), lambda: load_embedding_model(model_name))
+
+
+def reranker_key(model_name: str = RERANKER_MODEL_NAME, backend: Optional[str] = None) -> str:
+    return f"reranker:{model_name}{_backend_suffix(model_name, backend)}"
+
+
+def load_reranker(model_name: str = RERANKER_MODEL_NAME, backend: Optional[str] = None):
+    if _is_remote(backend):
+        from .inference_pool import RemoteReranker
+        return RemoteReranker(INFERENCE_WORKERS['address'], INFERENCE_WORKERS['authkey'])
+    from sentence_transformers import CrossEncoder
+    model_dir = _onnx_model_dir(model_name, backend)
+    if model_dir:
+        return CrossEncoder(model_dir, **onnx_model_kwargs(INFERENCE_BACKEND['quantization']))
+    return CrossEncoder(model_name)
+
+
+def acquire_reranker(model_name: str = RERANKER_MODEL_NAME):
+    return model_registry.acquire(reranker_key(model_name), lambda: load_reranker(model_name))
+
+
+def batching_reranker_key(model_name: str = RERANKER_MODEL_NAME) -> str:
+    return f"batching-{reranker_key(model_name)}"
+
+
+def load_batching_reranker(model_name: str = RERANKER_MODEL_NAME):
+    """One micro-batcher per process in front of the shared cross-encoder"""
+    from .batching_reranker import BatchingReranker
+    key = reranker_key(model_name)
+    model = model_registry.acquire(key, lambda: load_reranker(model_name))
+    return BatchingReranker(
+        model,
+        max_batch_size=RERANK_BATCHING['max_batch_size'],
+        max_wait_ms=RERANK_BATCHING['max_wait_ms'],
+        forward_batch_size=RERANK_BATCHING['forward_batch_size'],
+        timeout_seconds=RERANK_BATCHING['timeout_seconds'],
+        on_close=lambda: model_registry.release(key)
+    )
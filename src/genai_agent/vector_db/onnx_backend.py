@@ -0,0 +1,61 @@
+import os
+import re
+from typing import Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ONNX_MODELS_DIR = os.path.join(SCRIPT_DIR, "onnx_models")
+
+# Instruction sets supported by sentence-transformers' dynamic quantization presets
+QUANTIZATION_CONFIGS = ("avx2", "avx512", "avx512_vnni", "arm64")
+
+
+def is_onnx_available() -> bool:
+    """The ONNX backend is optional: it needs `optimum[onnxruntime]`"""
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def local_model_dir(model_name: str) -> str:
+    return os.path.join(ONNX_MODELS_DIR, re.sub(r"[^\w\-\.]+", "__", model_name))
+
+
+def quantized_file_name(quantization: str) -> str:
+    """Path of the int8 model inside the exported model directory"""
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def find_quantized_model(model_name: str, quantization: str) -> Optional[str]:
+    """Local directory of the exported int8 model, None if it was never exported"""
+    model_dir = local_model_dir(model_name)
+    if os.path.exists(os.path.join(model_dir, quantized_file_name(quantization))):
+        return model_dir
+    return None
+
+
+def onnx_model_kwargs(quantization: str) -> dict:
+    """Keyword arguments for SentenceTransformer / CrossEncoder to run the int8 ONNX file"""
+    return {"backend": "onnx", "model_kwargs": {"file_name": quantized_file_name(quantization)}}
+
+
+def export_quantized_model(model_name: str, kind: str, quantization: str) -> str:
+    """
+    Export a model to ONNX, quantize it to int8 and save both next to the
+    application. `kind` is "embedding" or "reranker". Returns the model directory.
+    """
+    from sentence_transformers import SentenceTransformer, CrossEncoder, export_dynamic_quantized_onnx_model
+
+    if quantization not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_CONFIGS}")
+
+    model_dir = local_model_dir(model_name)
+    # backend="onnx" exports the fp32 ONNX graph when the hub has none
+    model_class = SentenceTransformer if kind == "embedding" else CrossEncoder
+    model = model_class(model_name, backend="onnx")
+    model.save_pretrained(model_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, model_dir)
+    return model_dir
@@ -0,0 +1,120 @@
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Namespace holding the single record that maps every topic to its live namespace
+ALIAS_NAMESPACE = "__aliases__"
+ALIAS_RECORD_ID = "topic-namespaces"
+# Record of the last swap time of every topic, retired namespaces are deleted long after it
+SWAPPED_AT_RECORD_ID = "topic-swapped-at"
+
+
+def versioned_namespace(topic: str) -> str:
+    """A fresh namespace for one ingestion run of a topic"""
+    return f"{topic}__{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+
+def _read_record(index, record_id: str) -> dict:
+    response = index.fetch(ids=[record_id], namespace=ALIAS_NAMESPACE)
+    record = response.vectors.get(record_id)
+    return dict(record.metadata or {}) if record else {}
+
+
+def read_aliases(index) -> Dict[str, str]:
+    """{topic: namespace} as last published, empty when no topic was migrated yet"""
+    return _read_record(index, ALIAS_RECORD_ID)
+
+
+def wait_for_namespace(index, namespace: str, vector_count: int, timeout: float = 120.0) -> bool:
+    """Writes are eventually consistent: wait until the namespace holds every upserted vector"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = index.describe_index_stats()
+        summary = stats.namespaces.get(namespace)
+        if summary is not None and summary.vector_count >= vector_count:
+            return True
+        time.sleep(2)
+    return False
+
+
+def swap_alias(index, topic: str, namespace: str, dimension: int) -> Optional[str]:
+    """
+    Point `topic` to `namespace` with one upsert, so queries switch from the old
+    data to the new one at once. Returns the previous namespace of the topic.
+    """
+    aliases = read_aliases(index)
+    swapped_at = _read_record(index, SWAPPED_AT_RECORD_ID)
+    previous = aliases.get(topic)
+    aliases[topic] = namespace
+    swapped_at[topic] = time.time()
+    # Pinecone rejects all-zero dense vectors, the records are never queried
+    placeholder = [1.0] + [0.0] * (dimension - 1)
+    index.upsert(vectors=[{"id": ALIAS_RECORD_ID, "values": placeholder, "metadata": aliases},
+                          {"id": SWAPPED_AT_RECORD_ID, "values": placeholder, "metadata": swapped_at}],
+                 namespace=ALIAS_NAMESPACE)
+    return previous
+
+
+def delete_retired_namespaces(index, topic: str, alias_ttl_seconds: float) -> Optional[List[str]]:
+    """
+    Delete the versioned namespaces of `topic` the alias no longer points to.
+    Web processes cache the alias for `alias_ttl_seconds` and may have refreshed it right
+    before the swap: nothing is deleted until the last swap is twice that old.
+    Returns the deleted namespaces, None when it is too early.
+    """
+    current = read_aliases(index).get(topic)
+    swapped_at = _read_record(index, SWAPPED_AT_RECORD_ID).get(topic, 0.0)
+    if current is None or time.time() - swapped_at < 2 * alias_ttl_seconds:
+        return None
+    retired = [name for name in index.describe_index_stats().namespaces
+               if name.startswith(f"{topic}__") and name != current]
+    for name in retired:
+        index.delete(delete_all=True, namespace=name)
+    return retired
+
+
+class MetadataFilterPartitioning:
+    """Every topic in the default namespace, queries filter on the `topic` metadata field"""
+    name = "metadata"
+
+    def query_kwargs(self, index, topic: str) -> dict:
+        return {"filter": {"topic": topic}}
+
+
+class NamespacePartitioning:
+    """
+    One namespace per topic, queries only scan their own partition.
+    The namespace of a topic is resolved through the alias record, cached for `ttl_seconds`.
+    """
+    name = "namespace"
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._aliases: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def namespace(self, index, topic: str) -> str:
+        with self._lock:
+            if time.monotonic() - self._fetched_at > self.ttl_seconds:
+                try:
+                    self._aliases = read_aliases(index)
+                except Exception:
+                    # Keep serving the last known aliases while Pinecone is unreachable
+                    if not self._fetched_at:
+                        raise
+                self._fetched_at = time.monotonic()
+            # A topic never swapped in lives in the namespace named after it
+            return self._aliases.get(topic, topic)
+
+    def query_kwargs(self, index, topic: str) -> dict:
+        return {"namespace": self.namespace(index, topic)}
+
+
+def create_partitioning(strategy: str, ttl_seconds: float = 60.0):
+    if strategy == "namespace":
+        return NamespacePartitioning(ttl_seconds)
+    if strategy == "metadata":
+        return MetadataFilterPartitioning()
+    raise ValueError(f"Unknown partitioning strategy '{strategy}', expected 'namespace' or 'metadata'")
@@ -1,14 +1,17 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone
 from dotenv import load_dotenv
 from logger import logger
-from .base_vector_store import BaseVectorStore
-from sentence_transformers import CrossEncoder
+from .base_vector_store import BaseVectorStore, ALL_TOPICS
+from .partitioning import create_partitioning
+from .docstore import ChunkDocstore, DOCSTORE_PATH
+from .retrieval_trace import RetrievalTrace
+from config import PINECONE_PARTITIONING, CHUNK_DOCSTORE, QUERY_BATCH
 
 # --- Imports for Hybrid Search ---
-import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
 from .hybrid_helpers import convert_to_pinecone_sparse_vector # The helper file we created
 
 class PineconeStore(BaseVectorStore):
@@ -21,35 +24,142 @@ class PineconeStore(BaseVectorStore):
         
         if not self.api_key or not self.index_name:
             raise ValueError("PINECONE_API_KEY or PINECONE_INDEX_NAME not set")
-            
-        try:
-            self.pc = Pinecone(api_key=self.api_key)
-            self.index = self.pc.Index(self.index_name)
-            logger.info(f"✅ Connected to Pinecone index: {self.index_name}")
-        except Exception as e:
-            logger.error(f"❌ Error connecting to Pinecone: {e}")
-            self.index = None
-        
-        #  Load all TF-IDF vectorizer models 
-        self.vectorizers = {}
-        all_topics = ["tuition_fee", "graduate", "regulation_info"] 
-        
-        for topic in all_topics:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            path = os.path.join(base_dir, "tfidf_models", f"{topic}_tfidf.joblib") 
+
+        self.index = None
+        # Where each topic lives in the index (metadata filter or its own namespace)
+        self.partitioning = create_partitioning(
+            PINECONE_PARTITIONING['strategy'],
+            PINECONE_PARTITIONING['alias_ttl_seconds']
+        )
+        # Chunk text lives in the local docstore when enabled, not in Pinecone metadata
+        self.docstore = None
+        self.docstore_path = CHUNK_DOCSTORE['path'] or DOCSTORE_PATH
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # Name of the sparse encoder in use for each topic, it follows the topic's alias
+        self._sparse_names: Dict[str, str] = {}
+        self._sparse_lock = threading.Lock()
+
+    def load(self):
+        """
+        Connect to Pinecone and load the embedder, the reranker and the TF-IDF models.
+        Runs on first use or from the warm-up, failed parts are retried on the next call.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
             try:
-                self.vectorizers[topic] = joblib.load(path)
-                logger.info(f"Loaded TF-IDF model for topic: {topic}")
-            except FileNotFoundError:
-                logger.warning(f"No TF-IDF model found at {path} for topic: {topic}")
+                super().load()
             except Exception as e:
-                logger.error(f"Error loading {path}: {e}")
-        try:
-            self.reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-            logger.info("✅ Loaded cross-encoder reranking model.")
-        except Exception as e:
-            logger.error(f"❌ Error loading cross-encoder model: {e}")
-            self.reranker = None
+                logger.error(f"❌ Error loading embedding model: {e}")
+
+            # One Pinecone client per index for the whole process
+            if self.index is None:
+                try:
+                    self.index = self._acquire(
+                        f"pinecone:{self.index_name}",
+                        lambda: Pinecone(api_key=self.api_key).Index(self.index_name)
+                    )
+                    logger.info(f"✅ Connected to Pinecone index: {self.index_name}")
+                except Exception as e:
+                    logger.error(f"❌ Error connecting to Pinecone: {e}")
+
+            if CHUNK_DOCSTORE['enabled'] and self.docstore is None:
+                try:
+                    self.docstore = self._acquire(
+                        f"docstore:{self.docstore_path}",
+                        lambda: ChunkDocstore(self.docstore_path)
+                    )
+                    logger.info(f"✅ Opened chunk docstore ({len(self.docstore)} chunks)")
+                except Exception as e:
+                    logger.error(f"❌ Error opening chunk docstore: {e}")
+
+            self._load_vectorizers()
+            self._load_reranker()
+
+            self._loaded = all([self._embedding_model, self.index, self.reranker]) and (
+                self.docstore is not None or not CHUNK_DOCSTORE['enabled']
+            )
+
+    def _load_vectorizers(self):
+        """Sparse encoder of the namespace every topic is served from"""
+        if self.partitioning.name != "namespace" or self.index is None:
+            return super()._load_vectorizers()
+        for topic in ALL_TOPICS:
+            try:
+                self._topic_vectorizer(topic, self.partitioning.namespace(self.index, topic))
+            except Exception as e:
+                logger.error(f"❌ Error resolving the namespace of topic '{topic}': {e}")
+
+    def _topic_vectorizer(self, topic: str, name: str):
+        """
+        The sparse encoder saved under `name`: the topic, or the namespace it is served from.
+        Every ingestion run fits its own encoder, so it switches together with the alias
+        and the one of the previous namespace is released.
+        """
+        with self._sparse_lock:
+            vectorizer = self._load_vectorizer(name)
+            previous = self._sparse_names.get(topic)
+            if previous is not None and previous != name:
+                self.vectorizers.pop(previous, None)
+                self._release(self._sparse_encoder_key(previous))
+            self._sparse_names[topic] = name
+            return vectorizer
+
+    def _hybrid_retrieve(self,
+                         query_text: str,
+                         dense_vector: List[float],
+                         topic: str,
+                         retrieve_k: int,
+                         trace: Optional[RetrievalTrace] = None) -> List[Dict[str, Any]]:
+        """STAGE 1: HYBRID RETRIEVAL (Broad Search) for one topic"""
+        trace = trace or RetrievalTrace(query_text, topic)
+        logger.info(f"Retrieving top {retrieve_k} hybrid docs for topic '{topic}'...")
+
+        partition_kwargs = self.partitioning.query_kwargs(self.index, topic)
+
+        # 1b. Create Sparse Vector (each topic, or each namespace of a topic, has its own vocabulary)
+        vectorizer = self._topic_vectorizer(topic, partition_kwargs.get("namespace", topic))
+        if not vectorizer:
+            logger.warning(f"No sparse vectorizer for topic '{topic}', falling back to dense-only search.")
+            sparse_vector = {"indices": [], "values": []}
+        else:
+            with trace.stage("sparse_transform"):
+                query_sparse_matrix = vectorizer.transform([query_text])
+                sparse_vector = convert_to_pinecone_sparse_vector(query_sparse_matrix)
+        trace.note(sparse_terms=len(sparse_vector['indices']) if sparse_vector else 0)
+
+        # 1c. Query Pinecone with *both* vectors
+        with trace.stage("pinecone_query"):
+            response = self.index.query(
+                vector=dense_vector,
+                sparse_vector=sparse_vector,
+                top_k=retrieve_k, # Retrieve 25 docs
+                # Ids and scores only when the text comes from the docstore
+                include_metadata=self.docstore is None,
+                **partition_kwargs
+            )
+
+        matches = response['matches']
+        if self.docstore is not None:
+            with trace.stage("docstore_hydrate"):
+                matches = self._hydrate(matches)
+        if not matches:
+            logger.warning(f"No documents found in retrieval phase for topic: {topic}")
+        return matches
+
+    def _hydrate(self, matches) -> List[Dict[str, Any]]:
+        """Attach the chunk text and metadata from the docstore to id-only matches"""
+        documents = self.docstore.get_many([match['id'] for match in matches])
+        missing = sum(1 for match in matches if match['id'] not in documents)
+        if missing:
+            logger.warning(f"{missing} matches are missing from the chunk docstore")
+        return [
+            {"id": match['id'], "score": match['score'], "metadata": documents[match['id']]}
+            for match in matches if match['id'] in documents
+        ]
 
     def query(self, 
               query_text: str, 
@@ -61,84 +171,109 @@ class PineconeStore(BaseVectorStore):
         Query Pinecone with a 2-stage HYBRID + RERANK process.
         1. Retrieve 'retrieve_k' docs using hybrid search (dense + sparse).
         2. Rerank those docs to get the final 'k' best results.
+        An empty list means nothing was found, a failure raises.
         """
         try:
             if not self.is_healthy():
                 raise ConnectionError("Pinecone connection not healthy")
-            
-            # STAGE 1: HYBRID RETRIEVAL (Broad Search) 
-            logger.info(f"Retrieving top {retrieve_k} hybrid docs for topic '{topic}'...")
 
             # 1a. Create Dense Vector
-            dense_vector = self.embedding_model.embed_query(query_text)
-            
-            # 1b. Create Sparse Vector
-            vectorizer = self.vectorizers.get(topic)
-            if not vectorizer:
-                logger.warning(f"No sparse vectorizer for topic '{topic}', falling back to dense-only search.")
-                sparse_vector = {"indices": [], "values": []}
-            else:
-                query_sparse_matrix = vectorizer.transform([query_text])
-                sparse_vector = convert_to_pinecone_sparse_vector(query_sparse_matrix)
+            dense_vector = self._embedding_model.embed_query(query_text)
 
-            # 1c. Query Pinecone with *both* vectors
-            response = self.index.query(
-                vector=dense_vector,
-                sparse_vector=sparse_vector,
-                top_k=retrieve_k, # Retrieve 25 docs
-                filter={"topic": topic},
-                include_metadata=True
-            )
-            
-            original_matches = response['matches']
+            original_matches = self._hybrid_retrieve(query_text, dense_vector, topic, retrieve_k)
             if not original_matches:
-                logger.warning(f"No documents found in retrieval phase for topic: {topic}")
                 return []
-            documents_to_rerank = [match['metadata']['page_content'] for match in original_matches]
 
-            if not documents_to_rerank:
-                logger.warning(f"No documents found in retrieval phase for topic: {topic}")
+            return self._rerank(query_text, original_matches, k, self.rerank_policy)
+            
+        except Exception as e:
+            logger.error(f"❌ Error querying Pinecone with hybrid rerank: {e}")
+            raise
+
+    def query_multi(self,
+                    query_text: str,
+                    topics: List[str],
+                    k: int = 3,
+                    retrieve_k: int = 25
+                   ) -> List[Dict[str, Any]]:
+        """
+        Hybrid retrieval over several topics at once, then ONE rerank over the merged
+        candidates so the best chunks win whichever topic they come from.
+        Topics are queried concurrently since their sparse vectors differ.
+        """
+        try:
+            if not self.is_healthy():
+                raise ConnectionError("Pinecone connection not healthy")
+
+            dense_vector = self._embedding_model.embed_query(query_text)
+
+            with ThreadPoolExecutor(max_workers=len(topics)) as executor:
+                futures = [
+                    executor.submit(self._hybrid_retrieve, query_text, dense_vector, topic, retrieve_k)
+                    for topic in topics
+                ]
+                results, errors = [], []
+                for topic, future in zip(topics, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"❌ Error retrieving topic '{topic}': {e}")
+                        errors.append(e)
+
+            # Merge, the same chunk may be tagged with several topics
+            merged = {}
+            for matches in results:
+                for match in matches:
+                    merged.setdefault(match['id'], match)
+            if not merged:
+                # Nothing found only means something when every topic was searched
+                if errors:
+                    raise errors[0]
                 return []
 
-            # STAGE 2: RERANKING (Precise Re-ordering) 
-            logger.info(f"Reranking {len(original_matches)} documents...")
-            
-            # 2a. Create pairs of [query, document_text]
-            pairs = []
-            for match in original_matches:
-                pairs.append( (query_text, match['metadata']['page_content']) )
+            logger.info(f"Merged {len(merged)} candidates from topics: {', '.join(topics)}")
+            return self._rerank(query_text, list(merged.values()), k, self.rerank_policy)
 
-            # 2b. Run all pairs through the reranker model
-            scores = self.reranker.predict(pairs)
-            
-            # 2c. Add the new (better) scores back to the original matches
-            for i, match in enumerate(original_matches):
-                match['rerank_score'] = scores[i]
-            
-            # 2d. Sort all 25 matches by the new rerank_score
-            sorted_matches = sorted(original_matches, key=lambda x: x['rerank_score'], reverse=True)
-            
-            # 2e. Get the final top 'k' (e.g., 3)
-            final_top_k = sorted_matches[:k]
-
-            # STAGE 3: Format Output (Same as before) 
-            final_matches = []
-            for match in final_top_k:
-                final_matches.append({
-                    'content': match['metadata']['page_content'],
-                    'score': match['rerank_score'], 
-                    'metadata': match['metadata']
-                })
-                    
-            return final_matches
-            
         except Exception as e:
-            logger.error(f"❌ Error querying Pinecone with hybrid rerank: {e}")
-            return []
+            logger.error(f"❌ Error querying Pinecone across topics {topics}: {e}")
+            raise
+
+    def _retrieve_batch(self,
+                        query_texts: List[str],
+                        dense_vectors: List[List[float]],
+                        topics: List[str],
+                        retrieve_k: int) -> List[List[Dict[str, Any]]]:
+        """Hybrid retrieval of a batch of queries, with at most QUERY_BATCH['max_concurrency'] Pinecone calls in flight"""
+        workers = max(1, min(len(query_texts), QUERY_BATCH['max_concurrency']))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._hybrid_retrieve, query_text, dense_vector, topic, retrieve_k)
+                for query_text, dense_vector, topic in zip(query_texts, dense_vectors, topics)
+            ]
+            results = []
+            for query_text, future in zip(query_texts, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"❌ Error retrieving '{query_text}': {e}")
+                    raise
+        return results
             
 
             
             
     def is_healthy(self) -> bool:
-        """Check if Pinecone connection is working"""
-        return self.index is not None
\ No newline at end of file
+        """Check if the store is usable, loading it on first call"""
+        self.load()
+        return self.index is not None and self._embedding_model is not None
+
+    def check_connection(self) -> bool:
+        """Round trip to Pinecone, for readiness probes"""
+        if not self.is_healthy():
+            return False
+        try:
+            self.index.describe_index_stats()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Pinecone is not reachable: {e}")
+            return False
\ No newline at end of file
@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+PREVIEW_LENGTH = 160
+
+
+def _source(match: Dict[str, Any]) -> Optional[str]:
+    return match.get('metadata', {}).get('source')
+
+
+class RetrievalTrace:
+    """
+    Per-stage wall times and candidate lists of one retrieval, filled by the stores
+    when `explain` is asked for. Stages are recorded in the order they run.
+    """
+    def __init__(self, query_text: str, topic: str):
+        self.query_text = query_text
+        self.topic = topic
+        self.stages: Dict[str, float] = {}
+        self.details: Dict[str, Any] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def note(self, **details):
+        """Stage facts worth keeping next to the timings (sparse terms, missing chunks...)"""
+        self.details.update(details)
+
+    def report(self, candidates: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Hybrid candidates in retrieval order with their rerank rank and rank change,
+        and the final results. `candidates` are the matches after `_rerank` wrote
+        their 'rerank_score' (absent for candidates the adaptive policy did not score).
+        """
+        reranked = sorted(
+            (match for match in candidates if 'rerank_score' in match),
+            key=lambda match: match['rerank_score'], reverse=True
+        )
+        rerank_ranks = {match['id']: rank for rank, match in enumerate(reranked, 1)}
+        final_contents = {result['content'] for result in results}
+
+        hybrid, hybrid_ranks = [], {}
+        for rank, match in enumerate(sorted(candidates, key=lambda m: m['score'], reverse=True), 1):
+            rerank_rank = rerank_ranks.get(match['id'])
+            content = match['metadata'].get('page_content', '')
+            hybrid_ranks.setdefault(content, rank)
+            hybrid.append({
+                "id": match['id'],
+                "source": _source(match),
+                "hybrid_rank": rank,
+                "hybrid_score": float(match['score']),
+                "rerank_rank": rerank_rank,
+                "rerank_score": float(match['rerank_score']) if 'rerank_score' in match else None,
+                # Positive: moved up the list after reranking
+                "rank_change": rank - rerank_rank if rerank_rank is not None else None,
+                "selected": content in final_contents,
+                "preview": content[:PREVIEW_LENGTH],
+            })
+
+        final = [
+            {
+                "rank": rank,
+                "source": result['metadata'].get('source'),
+                "score": float(result['score']),
+                "reranked": result.get('reranked', True),
+                "hybrid_rank": hybrid_ranks.get(result['content']),
+                "preview": result['content'][:PREVIEW_LENGTH],
+            }
+            for rank, result in enumerate(results, 1)
+        ]
+
+        return {
+            "query": self.query_text,
+            "topic": self.topic,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            "stages_ms": self.stages,
+            "details": self.details,
+            "candidates": hybrid,
+            "results": final,
+        }
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+import scipy.sparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SPARSE_MODELS_DIR = os.path.join(SCRIPT_DIR, "sparse_models")
+TFIDF_MODELS_DIR = os.path.join(SCRIPT_DIR, "tfidf_models")
+
+TERM_HASHES_FILE = "term_hashes.npy"
+IDF_FILE = "idf.npy"
+PARAMS_FILE = "params.json"
+
+_SYLLABLE = re.compile(r"\w+")
+
+
+# `name` is the topic, or with namespace partitioning the namespace the encoder was fitted for:
+# the sparse vocabulary must match the vectors of the namespace being queried
+def bm25_model_path(name: str) -> str:
+    return os.path.join(SPARSE_MODELS_DIR, f"{name}_bm25")
+
+
+def tfidf_model_path(name: str) -> str:
+    return os.path.join(TFIDF_MODELS_DIR, f"{name}_tfidf.joblib")
+
+
+def delete_sparse_encoders(name: str):
+    """Remove the TF-IDF and BM25 encoders saved under `name`, e.g. of a retired namespace"""
+    if os.path.exists(tfidf_model_path(name)):
+        os.remove(tfidf_model_path(name))
+    if os.path.isdir(bm25_model_path(name)):
+        shutil.rmtree(bm25_model_path(name))
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit id of a term, the vocabulary only stores these"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def normalize_vietnamese(text: str, fold_diacritics: bool = False) -> str:
+    """NFC and lowercase, optionally without tone marks and diacritics ("Học phí" -> "hoc phi")"""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    if fold_diacritics:
+        text = text.replace("đ", "d")
+        text = "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+    return text
+
+
+def syllable_ngrams(text: str, ngram: int = 2, fold_diacritics: bool = False) -> List[str]:
+    """
+    Vietnamese words are made of space separated syllables ("học phí", "sau đại học"),
+    so syllable n-grams stand in for word segmentation.
+    """
+    syllables = _SYLLABLE.findall(normalize_vietnamese(text, fold_diacritics))
+    terms = list(syllables)
+    for n in range(2, ngram + 1):
+        terms.extend(" ".join(syllables[i:i + n]) for i in range(len(syllables) - n + 1))
+    return terms
+
+
+class BM25Encoder:
+    """
+    BM25 sparse vectors whose dot product is the BM25 score of a chunk for a query.
+    Documents carry the saturated term frequency, queries the IDF weights normalized
+    to sum to 1, which keeps the sparse score on the scale of the dense one.
+
+    Same `fit_transform` (chunks) / `transform` (queries) interface as the
+    TfidfVectorizer it replaces. The vocabulary is the sorted array of 64-bit term
+    hashes with their IDF, saved as .npy and memory-mapped at load time instead of
+    unpickled.
+    """
+    def __init__(self,
+                 k1: float = 1.2,
+                 b: float = 0.75,
+                 ngram: int = 2,
+                 fold_diacritics: bool = False,
+                 term_hashes: Optional[np.ndarray] = None,
+                 idf: Optional[np.ndarray] = None,
+                 avgdl: float = 1.0):
+        self.k1 = k1
+        self.b = b
+        self.ngram = ngram
+        self.fold_diacritics = fold_diacritics
+        self.term_hashes = term_hashes if term_hashes is not None else np.array([], dtype=np.uint64)
+        self.idf = idf if idf is not None else np.array([], dtype=np.float32)
+        self.avgdl = avgdl
+
+    def analyze(self, text: str) -> List[str]:
+        return syllable_ngrams(text, self.ngram, self.fold_diacritics)
+
+    def fit(self, texts: List[str]) -> "BM25Encoder":
+        self._fit([self.analyze(text) for text in texts])
+        return self
+
+    def _fit(self, documents: List[List[str]]):
+        document_frequency = Counter()
+        for terms in documents:
+            document_frequency.update(set(terms))
+        hashed = Counter()
+        for term, count in document_frequency.items():
+            hashed[term_hash(term)] += count
+        self.term_hashes = np.array(sorted(hashed), dtype=np.uint64)
+        df = np.array([hashed[int(h)] for h in self.term_hashes], dtype=np.float64)
+        df = np.minimum(df, len(documents))
+        n = len(documents)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.avgdl = float(np.mean([len(terms) for terms in documents])) if documents else 1.0
+
+    def _lookup(self, terms: List[str]) -> np.ndarray:
+        """Vocabulary index of every term, -1 when unknown"""
+        if not terms or len(self.term_hashes) == 0:
+            return np.full(len(terms), -1)
+        terms = np.array([term_hash(term) for term in terms], dtype=np.uint64)
+        positions = np.searchsorted(self.term_hashes, terms)
+        clipped = np.minimum(positions, len(self.term_hashes) - 1)
+        return np.where(self.term_hashes[clipped] == terms, clipped, -1)
+
+    def _encode(self, documents: List[List[str]], query: bool) -> scipy.sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for terms in documents:
+            counts = Counter(terms)
+            unique = list(counts)
+            term_ids = self._lookup(unique)
+            known = term_ids >= 0
+            term_ids = term_ids[known]
+            if query:
+                weights = np.asarray(self.idf[term_ids], dtype=np.float32)
+                total = weights.sum()
+                weights = weights / total if total > 0 else weights
+            else:
+                tf = np.array([counts[term] for term in unique], dtype=np.float32)[known]
+                length_norm = 1 - self.b + self.b * len(terms) / self.avgdl
+                weights = tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            order = np.argsort(term_ids)
+            indices.extend(term_ids[order].tolist())
+            data.extend(weights[order].tolist())
+            indptr.append(len(indices))
+        return scipy.sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(documents), len(self.term_hashes))
+        )
+
+    def fit_transform(self, texts: List[str]) -> scipy.sparse.csr_matrix:
+        """Fit on the chunks of a topic and return their document vectors"""
+        documents = [self.analyze(text) for text in texts]
+        self._fit(documents)
+        return self._encode(documents, query=False)
+
+    def encode_documents(self, texts: List[str]) -> scipy.sparse.csr_matrix:
+        return self._encode([self.analyze(text) for text in texts], query=False)
+
+    def transform(self, texts: List[str]) -> scipy.sparse.csr_matrix:
+        """Query vectors, like TfidfVectorizer.transform in the stores"""
+        return self._encode([self.analyze(text) for text in texts], query=True)
+
+    def save(self, path: str) -> str:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, TERM_HASHES_FILE), self.term_hashes)
+        np.save(os.path.join(path, IDF_FILE), self.idf)
+        with open(os.path.join(path, PARAMS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "ngram": self.ngram,
+                       "fold_diacritics": self.fold_diacritics, "avgdl": self.avgdl}, f)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Encoder":
+        with open(os.path.join(path, PARAMS_FILE), encoding="utf-8") as f:
+            params = json.load(f)
+        return cls(
+            term_hashes=np.load(os.path.join(path, TERM_HASHES_FILE), mmap_mode="r"),
+            idf=np.load(os.path.join(path, IDF_FILE), mmap_mode="r"),
+            **params
+        )
@@ -0,0 +1,14 @@
+from config import VECTOR_BACKEND
+from .base_vector_store import BaseVectorStore
+
+
+def create_vector_store() -> BaseVectorStore:
+    """Vector store selected by VECTOR_BACKEND, every backend has the same query() contract"""
+    backend = VECTOR_BACKEND['backend']
+    if backend == "local":
+        from .local_store import LocalVectorStore
+        return LocalVectorStore()
+    if backend == "pinecone":
+        from .pinecone_store import PineconeStore
+        return PineconeStore()
+    raise ValueError(f"Unknown vector backend '{backend}', expected 'pinecone' or 'local'")
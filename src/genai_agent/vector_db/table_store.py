@@ -0,0 +1,325 @@
+import os
+import re
+import math
+import sqlite3
+import unicodedata
+from contextlib import closing
+from typing import List, Dict, Any, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TABLE_STORE_PATH = os.path.join(SCRIPT_DIR, "table_store", "kb_tables.sqlite")
+
+# Documents whose content is a table of fees / dates rather than prose
+TABLE_SOURCE_PATTERNS = [
+    "học phí",
+    "lịch học vụ",
+]
+
+_ROMAN_HEADING = re.compile(r"^[IVX]+\s*[\.\-–]\s*")
+_NUMBER_HEADING = re.compile(r"^\d+\s*[\.\-–]\s*")
+_LETTER_HEADING = re.compile(r"^[a-h]\s*[\.\)]\s+")
+_BULLET = re.compile(r"^[\+\-•]\s*")
+
+_MONEY = re.compile(r"\d[\d\.,]*\s*(?:đồng|VND|VNĐ)", re.IGNORECASE)
+# A day/month needs its year or a "ngày" before it: "số TC/ĐVHT = 10/20" is a ratio, not a date
+_DATE = re.compile(r"(?<![\d/])(?:0?[1-9]|[12]\d|3[01])/(?:0?[1-9]|1[0-2])/(?:\d{4}|\d{2})(?![\d/])"
+                   r"|\bngày\s+(?:0?[1-9]|[12]\d|3[01])/(?:0?[1-9]|1[0-2])(?![\d/])", re.IGNORECASE)
+
+_MONEY_QUESTION = re.compile(r"học phí|lệ phí|đơn giá|bao nhiêu tiền|mức thu|\bphí\b|fee|cost|price", re.IGNORECASE)
+_DATE_QUESTION = re.compile(r"khi nào|ngày nào|thời gian|thời hạn|hạn chót|lúc nào|bao giờ|when|deadline|date", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kb_rows (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    source TEXT NOT NULL,
+    section TEXT NOT NULL,
+    label TEXT NOT NULL,
+    value TEXT NOT NULL,
+    kind TEXT NOT NULL
+)
+"""
+
+
+# Rows scoring within this margin of the best one are equally good answers
+AMBIGUITY_MARGIN = 0.05
+# A phrase found in more labels than this share of the rows is too common to identify one
+COMMON_BIGRAM_RATIO = 0.1
+
+# Abbreviations the documents and the students use interchangeably with the full words
+_ABBREVIATIONS = {
+    "hk": "hoc ky",
+    "dkmh": "dang ky mon hoc",
+    "tkb": "thoi khoa bieu",
+    "ncs": "nghien cuu sinh",
+}
+
+# Question fillers that never identify a row
+_STOPWORDS = {
+    "cho", "em", "minh", "toi", "hoi", "la", "bao", "nhieu", "vay", "a", "oi", "nhe", "the", "nao",
+    "khi", "gi", "co", "khong", "duoc", "cua", "thi", "what", "is", "how", "much", "of", "for",
+}
+
+
+def _nfc(text: str) -> str:
+    return unicodedata.normalize("NFC", text or "").replace("\xa0", " ").strip()
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics ("Khoá" and "khóa" become "khoa")"""
+    text = unicodedata.normalize("NFD", text.lower().replace("đ", "d").replace("Đ", "d"))
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+
+def _tokens(text: str) -> List[str]:
+    # "HK242" and "Lộ trình1" also match "học kỳ 242" and "lộ trình 1"
+    tokens = re.findall(r"[^\W\d_]+|\d+", _fold(text))
+    return [word for token in tokens for word in _ABBREVIATIONS.get(token, token).split()]
+
+
+def _bigrams(text: str) -> set:
+    """Adjacent syllables of one heading or label: Vietnamese words are mostly two syllables long"""
+    tokens = [t for t in _tokens(text) if t not in _STOPWORDS]
+    return set(zip(tokens, tokens[1:]))
+
+
+def is_table_source(source: str) -> bool:
+    source = _nfc(os.path.basename(source)).lower()
+    return any(_nfc(pattern).lower() in source for pattern in TABLE_SOURCE_PATTERNS)
+
+
+def _value_kind(value: str) -> str:
+    if _MONEY.search(value):
+        return "money"
+    if _DATE.search(value):
+        return "date"
+    return "number"
+
+
+def _heading_level(line: str) -> Optional[int]:
+    if not line:
+        return None
+    if _ROMAN_HEADING.match(line):
+        return 0
+    if _NUMBER_HEADING.match(line):
+        return 1
+    if _LETTER_HEADING.match(line):
+        return 2
+    # "Sinh viên:" or "Khoá 2022 về sau: Học phí trọn gói theo học kỳ"
+    if line.endswith(":") or ":" in line:
+        return 3
+    return None
+
+
+def _split_row(line: str) -> Optional[tuple]:
+    """Split "label: value" lines whose value carries a number"""
+    if ":" not in line:
+        return None
+    label, value = line.split(":", 1)
+    label, value = _BULLET.sub("", label).strip(), value.strip().rstrip(".").strip()
+    if not label or not value or not re.search(r"\d", value):
+        return None
+    return label, value
+
+
+def extract_table_rows(docx_path: str) -> List[Dict[str, str]]:
+    """
+    Extract structured rows from a docx file, keeping the heading path
+    of every row so that "Khoá 2022 > Học phí học kỳ chính" stays intact.
+    Handles both real docx tables and "label: value" lines.
+    """
+    import docx
+    from docx.table import Table
+
+    document = docx.Document(docx_path)
+    source = _nfc(os.path.basename(docx_path))
+    sections: List[str] = []
+    rows = []
+
+    def add_row(label: str, value: str):
+        rows.append({
+            "source": source,
+            "section": " > ".join(s for s in sections if s),
+            "label": label,
+            "value": value,
+            "kind": _value_kind(value),
+        })
+
+    for block in document.iter_inner_content():
+        if isinstance(block, Table):
+            table = [[_nfc(cell.text) for cell in row.cells] for row in block.rows]
+            if len(table) < 2:
+                continue
+            header = table[0]
+            for cells in table[1:]:
+                for column, cell in zip(header[1:], cells[1:]):
+                    if cell and re.search(r"\d", cell):
+                        add_row(f"{cells[0]} - {column}" if column else cells[0], cell)
+            continue
+
+        for line in block.text.splitlines():
+            line = _nfc(line)
+            row = _split_row(line)
+            if row:
+                add_row(*row)
+                continue
+
+            level = _heading_level(line)
+            if level is not None:
+                sections = (sections + [""] * level)[:level] + [line.rstrip(":").strip()]
+
+    return rows
+
+
+def build_table_store(topic: str, doc_path: str, store_path: str = TABLE_STORE_PATH) -> int:
+    """Rebuild the rows of a topic from its tabular documents. Returns the row count."""
+    rows = []
+    for name in sorted(os.listdir(doc_path)):
+        if name.lower().endswith(".docx") and is_table_source(name):
+            rows.extend(extract_table_rows(os.path.join(doc_path, name)))
+
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    # The connection's own context manager only commits, closing() releases it
+    with closing(sqlite3.connect(store_path)) as conn, conn:
+        conn.execute(_SCHEMA)
+        conn.execute("DELETE FROM kb_rows WHERE topic = ?", (topic,))
+        conn.executemany(
+            "INSERT INTO kb_rows (topic, source, section, label, value, kind) VALUES (?, ?, ?, ?, ?, ?)",
+            [(topic, r["source"], r["section"], r["label"], r["value"], r["kind"]) for r in rows]
+        )
+    return len(rows)
+
+
+def _features(row: Dict[str, Any]) -> set:
+    """Syllables of the section path and label, and the bigrams within each heading"""
+    segments = row["section"].split(" > ") + [row["label"]]
+    return set(_tokens(" ".join(segments))).union(*map(_bigrams, segments))
+
+
+def _nested(sections: List[str]) -> bool:
+    """All the sections are the shortest one or its sub-headings ("… > Sinh viên")"""
+    shortest = min(sections, key=len)
+    return all(section == shortest or section.startswith(shortest + " > ") for section in sections)
+
+
+def _heading(row: Dict[str, Any]) -> str:
+    """The heading right above the row, it names the program, cohort or step the row applies to"""
+    return row["section"].split(" > ")[-1]
+
+
+def _phrases(text: str) -> set:
+    """Bigrams and numbers, what can tell two rows or headings apart"""
+    return _bigrams(text) | {t for t in _tokens(text) if t.isdigit()}
+
+
+class TableStore:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.row_features = [_features(r) for r in rows]
+        # What identifies a row within its section: the label, and the heading right above
+        # it for generic labels ("2- Đăng ký môn học (Đợt 1) > Thời gian bắt đầu")
+        self.row_bigrams = [_bigrams(_heading(r)) | _bigrams(r["label"]) for r in rows]
+        self.heading_phrases = [_phrases(_heading(r)) for r in rows]
+
+        # IDF over rows so that "2022" or "tiêu chuẩn" outweigh "học phí"
+        doc_freq = {}
+        for features in self.row_features:
+            for feature in features:
+                doc_freq[feature] = doc_freq.get(feature, 0) + 1
+        n_rows = max(len(rows), 1)
+        self.idf = {feature: math.log(1 + n_rows / df) for feature, df in doc_freq.items()}
+
+        # Phrases shared by many labels ("học phí", "thời gian") do not identify a row
+        bigram_freq = {}
+        for bigrams in self.row_bigrams:
+            for bigram in bigrams:
+                bigram_freq[bigram] = bigram_freq.get(bigram, 0) + 1
+        self.common_bigrams = {b for b, df in bigram_freq.items() if df > COMMON_BIGRAM_RATIO * n_rows}
+
+    @classmethod
+    def load(cls, topics: Optional[List[str]] = None, store_path: str = TABLE_STORE_PATH) -> Optional["TableStore"]:
+        """Load rows into memory, None if the store was never built"""
+        if not os.path.exists(store_path):
+            return None
+        with closing(sqlite3.connect(store_path)) as conn:
+            conn.row_factory = sqlite3.Row
+            if topics:
+                placeholders = ", ".join("?" for _ in topics)
+                cursor = conn.execute(f"SELECT * FROM kb_rows WHERE topic IN ({placeholders}) ORDER BY id", topics)
+            else:
+                cursor = conn.execute("SELECT * FROM kb_rows ORDER BY id")
+            rows = [dict(row) for row in cursor.fetchall()]
+        return cls(rows) if rows else None
+
+    def lookup(self, query_text: str, min_score: float, max_rows: int = 6) -> List[Dict[str, Any]]:
+        """
+        Return the best matching rows, or [] when the question is not a precise
+        fee or date lookup. All numbers in the question (cohort year, semester...)
+        must appear in the row, every returned row must share an uncommon phrase
+        with the question, and all of them must come from the same section:
+        rows of several programs or cohorts are left to the RAG path.
+        """
+        if _DATE_QUESTION.search(query_text):
+            wanted_kind = "date"
+        elif _MONEY_QUESTION.search(query_text):
+            wanted_kind = "money"
+        else:
+            return []
+
+        query_tokens = {t for t in _tokens(query_text) if t not in _STOPWORDS}
+        if not query_tokens:
+            return []
+        numbers = {t for t in query_tokens if t.isdigit()}
+
+        # Words never seen in any row weigh as much as the rarest one, phrases
+        # never seen (across two words of the question) are ignored
+        unknown_weight = max(self.idf.values(), default=1.0)
+        weights = {t: self.idf.get(t, unknown_weight) for t in query_tokens}
+        weights.update({b: self.idf[b] for b in _bigrams(query_text) if b in self.idf})
+        total = sum(weights.values())
+
+        scored = []
+        for row, features, bigrams, heading in zip(self.rows, self.row_features, self.row_bigrams,
+                                                   self.heading_phrases):
+            if row["kind"] != wanted_kind:
+                continue
+            if not numbers.issubset(features):
+                continue
+            score = sum(w for f, w in weights.items() if f in features) / total
+            if score >= min_score:
+                scored.append((score, row, bigrams, heading))
+
+        if not scored:
+            return []
+
+        scored.sort(key=lambda match: match[0], reverse=True)
+        best_score = scored[0][0]
+        best = [match for match in scored if match[0] >= best_score - AMBIGUITY_MARGIN]
+        # Too many equally good rows means the question is not precise enough
+        if len(best) > max_rows:
+            return []
+        # "Học phí khóa 2022" matches the same labels in every program of that cohort
+        if not _nested([row["section"] for _, row, _, _ in best]):
+            return []
+
+        # A shared "học phí" or "lại" is not enough: the label must name what was asked,
+        # and the question must name the program or step of the row ("luận văn tốt
+        # nghiệp" alone is not the fee of "VLVH từ Khoá 2021 > Với sĩ số dưới 5")
+        query_bigrams = _bigrams(query_text) - self.common_bigrams
+        best = [match for match in best if query_bigrams & match[2] and (query_bigrams | numbers) & match[3]]
+        # The same label with two values: the heading that tells them apart was not extracted
+        values = {}
+        for _, row, _, _ in best:
+            if values.setdefault(row["label"], row["value"]) != row["value"]:
+                return []
+        return [{**row, "score": score} for score, row, _, _ in best]
+
+
+def format_rows_answer(rows: List[Dict[str, Any]]) -> str:
+    lines = ["Dạ, theo thông tin từ " + rows[0]["source"] + ":"]
+    for row in rows:
+        section = f"{row['section']} > " if row["section"] else ""
+        lines.append(f"- {section}{row['label']}: {row['value']}")
+    return "\n".join(lines)
+
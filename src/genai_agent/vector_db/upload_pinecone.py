@@ -1,5 +1,6 @@
 import os
 import uuid
+import argparse
 from datetime import datetime
 from typing import Dict, List, Optional
 from tqdm import tqdm
@@ -13,6 +14,12 @@ from dotenv import load_dotenv, find_dotenv
 from sklearn.feature_extraction.text import TfidfVectorizer
 import joblib
 from hybrid_helpers import convert_to_pinecone_sparse_vector
+from faq_index import build_faq_index
+from table_store import build_table_store
+from local_index import save_partition
+from partitioning import versioned_namespace, wait_for_namespace, swap_alias, delete_retired_namespaces, read_aliases
+from docstore import ChunkDocstore, DOCSTORE_PATH
+from sparse_encoder import BM25Encoder, bm25_model_path, tfidf_model_path, delete_sparse_encoders
 
 # Configuration
 CHUNK_SIZE = 512
@@ -20,6 +27,8 @@ CHUNK_OVERLAP = 50
 EMBEDDING_BATCH_SIZE = 50
 UPLOAD_BATCH_SIZE = 100
 VECTOR_DIMENSION = 384  # for all-MiniLM-L6-v2
+# Web processes cache the topic aliases this long, see PINECONE_PARTITIONING in config.py
+ALIAS_TTL_SECONDS = float(os.getenv("PINECONE_ALIAS_TTL_SECONDS", "60"))
 
 load_dotenv(find_dotenv())
 
@@ -44,34 +53,60 @@ TOPIC_PATHS = {
 
 
 # Pinecone Client 
-try:
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    index_name = os.getenv("PINECONE_INDEX_NAME")
+def connect_pinecone():
+    try:
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        index_name = os.getenv("PINECONE_INDEX_NAME")
     
-    # Check if index exists, if not create it
-    if index_name not in [index.name for index in pc.list_indexes()]:
-        print(f"Index '{index_name}' not found. Creating a new serverless index...")
-        pc.create_index(
-            name=index_name,
-            dimension=384,  # dimension for all-MiniLM-L6-v2
-            metric="dotproduct",
+        # Check if index exists, if not create it
+        if index_name not in [index.name for index in pc.list_indexes()]:
+            print(f"Index '{index_name}' not found. Creating a new serverless index...")
+            pc.create_index(
+                name=index_name,
+                dimension=384,  # dimension for all-MiniLM-L6-v2
+                metric="dotproduct",
             
-            # --- THIS IS THE FIX ---
-            spec=ServerlessSpec(
-                cloud="aws",
-                region="us-east-1"
+                # --- THIS IS THE FIX ---
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1"
+                )
             )
-        )
-        print(f"Created new Pinecone index: {index_name}")
-    else:
-        print(f"Index '{index_name}' already exists. Connecting.")
+            print(f"Created new Pinecone index: {index_name}")
+        else:
+            print(f"Index '{index_name}' already exists. Connecting.")
     
-    pinecone_index = pc.Index(index_name)
-except Exception as e:
-    raise Exception(f"Failed to initialize Pinecone: {str(e)}")
+        return pc.Index(index_name)
+    except Exception as e:
+        raise Exception(f"Failed to initialize Pinecone: {str(e)}")
+
+def collect_retired_namespaces(pinecone_index, topic_tag: str, docstore: Optional[ChunkDocstore] = None):
+    """Delete the namespaces of previous runs once no web process can still query them"""
+    retired = delete_retired_namespaces(pinecone_index, topic_tag, ALIAS_TTL_SECONDS)
+    if retired is None:
+        print(f"Previous namespaces of '{topic_tag}' kept, swapped less than {2 * ALIAS_TTL_SECONDS:.0f}s ago")
+        return
+    for name in retired:
+        delete_sparse_encoders(name)
+        print(f"Deleted retired namespace '{name}'")
+    if docstore is not None:
+        # Only the chunks of the live namespace are still referenced
+        current = read_aliases(pinecone_index)[topic_tag]
+        live_ids = [vector_id for page in pinecone_index.list(prefix=f"{topic_tag}-", namespace=current)
+                    for vector_id in page]
+        stale = docstore.delete_stale(topic_tag, live_ids)
+        print(f"Deleted {stale} chunks of retired namespaces from the docstore")
+
 
 # --- 4. A Reusable Upload Function (with metadata) ---
-def upload_topic(topic_tag: str, doc_path: str):
+def upload_topic(topic_tag: str,
+                 doc_path: str,
+                 backends: List[str],
+                 pinecone_index=None,
+                 partitioning: str = "metadata",
+                 docstore: Optional[ChunkDocstore] = None,
+                 sparse_encoder: str = "tfidf",
+                 fold_diacritics: bool = False):
     try:
         print(f"\n--- Processing topic: {topic_tag} ---")
         
@@ -107,6 +142,25 @@ def upload_topic(topic_tag: str, doc_path: str):
                 "created_at": str(datetime.now()),
             })
         
+        # 2b. Extract curated Q&A pairs into the FAQ index
+        try:
+            faq_path = build_faq_index(topic_tag, doc_path, EMBEDDING_MODEL)
+            if faq_path:
+                print(f"Saved FAQ index to {faq_path}")
+        except Exception as e:
+            print(f"Warning: Error building FAQ index: {str(e)}")
+
+        # 2c. Extract fee / calendar tables into the structured store
+        try:
+            row_count = build_table_store(topic_tag, doc_path)
+            if row_count:
+                print(f"Saved {row_count} structured rows for topic: {topic_tag}")
+        except Exception as e:
+            print(f"Warning: Error building structured table store: {str(e)}")
+
+        # Namespace partitioning: rebuild the topic in a fresh namespace, then swap it in
+        namespace = versioned_namespace(topic_tag) if "pinecone" in backends and partitioning == "namespace" else None
+
         # 3. Split docs with error handling
         try:
             text_splitter = RecursiveCharacterTextSplitter(
@@ -117,18 +171,31 @@ def upload_topic(topic_tag: str, doc_path: str):
             )
             chunks = text_splitter.split_documents(documents)
             print(f"Found {len(documents)} docs, split into {len(chunks)} chunks.")
-            print(f"Fitting TF-IDF model for topic: {topic_tag}...")
             texts = [chunk.page_content for chunk in chunks]
-            vectorizer = TfidfVectorizer()
-            tfidf_matrix = vectorizer.fit_transform(texts)
-            
-            vectorizer_path = os.path.join(TFIDF_SAVE_DIR, f"{topic_tag}_tfidf.joblib")
-            
-            # Create the directory if it doesn't exist
-            os.makedirs(TFIDF_SAVE_DIR, exist_ok=True)
+            # Namespace partitioning: the encoder is saved under the new namespace and only
+            # picked up by the web processes once the alias points to it
+            encoder_names = [namespace] if namespace else []
+            if not namespace or "local" in backends:
+                encoder_names.append(topic_tag)
+            if sparse_encoder == "bm25":
+                print(f"Fitting BM25 encoder for topic: {topic_tag}...")
+                vectorizer = BM25Encoder(fold_diacritics=fold_diacritics)
+                sparse_matrix = vectorizer.fit_transform(texts)
+                for name in encoder_names:
+                    vectorizer_path = vectorizer.save(bm25_model_path(name))
+                    print(f"Saved BM25 encoder to {vectorizer_path}")
+            else:
+                print(f"Fitting TF-IDF model for topic: {topic_tag}...")
+                vectorizer = TfidfVectorizer()
+                sparse_matrix = vectorizer.fit_transform(texts)
+
+                # Create the directory if it doesn't exist
+                os.makedirs(TFIDF_SAVE_DIR, exist_ok=True)
 
-            joblib.dump(vectorizer, vectorizer_path)
-            print(f"Saved TF-IDF model to {vectorizer_path}")
+                for name in encoder_names:
+                    vectorizer_path = tfidf_model_path(name)
+                    joblib.dump(vectorizer, vectorizer_path)
+                    print(f"Saved TF-IDF model to {vectorizer_path}")
         
         except Exception as e:
             print(f"Error splitting documents: {str(e)}")
@@ -174,7 +241,7 @@ def upload_topic(topic_tag: str, doc_path: str):
             "metadata": metadata
         }
         # Sparse vector for the chunk   
-            sparse_row = tfidf_matrix.getrow(i)
+            sparse_row = sparse_matrix.getrow(i)
             pinecone_sparse = convert_to_pinecone_sparse_vector(sparse_row)
             if pinecone_sparse:
                 vector_to_upload["sparse_values"] = pinecone_sparse
@@ -182,18 +249,80 @@ def upload_topic(topic_tag: str, doc_path: str):
             vectors_to_upsert.append(vector_to_upload)
 
     # 6. Upload to Pinecone in batches
-        print(f"Uploading {len(vectors_to_upsert)} hybrid vectors to Pinecone...")
-        batch_size = 100
-        for i in range(0, len(vectors_to_upsert), batch_size):
-            batch = vectors_to_upsert[i:i + batch_size]
-            pinecone_index.upsert(vectors=batch)
-        
-        print(f"✅ Successfully uploaded '{topic_tag}' chunks.")
+        if "pinecone" in backends:
+            if namespace:
+                try:
+                    collect_retired_namespaces(pinecone_index, topic_tag, docstore)
+                except Exception as e:
+                    print(f"Warning: Error deleting retired namespaces: {str(e)}")
+            pinecone_vectors = vectors_to_upsert
+            if docstore is not None:
+                # Slim payloads: the text goes to the docstore first, Pinecone only keeps the topic
+                docstore.put_many(vectors_to_upsert)
+                pinecone_vectors = [{**v, "metadata": {"topic": topic_tag}} for v in vectors_to_upsert]
+                print(f"Saved {len(vectors_to_upsert)} chunks to the docstore {docstore.path}")
+            print(f"Uploading {len(pinecone_vectors)} hybrid vectors to Pinecone...")
+            batch_size = 100
+            for i in range(0, len(pinecone_vectors), batch_size):
+                batch = pinecone_vectors[i:i + batch_size]
+                pinecone_index.upsert(vectors=batch, **({"namespace": namespace} if namespace else {}))
+
+            if namespace and not wait_for_namespace(pinecone_index, namespace, len(vectors_to_upsert)):
+                print(f"❌ Namespace '{namespace}' is incomplete, '{topic_tag}' still serves the previous data.")
+            else:
+                if namespace:
+                    previous = swap_alias(pinecone_index, topic_tag, namespace, VECTOR_DIMENSION)
+                    print(f"Topic '{topic_tag}' now served from namespace '{namespace}'")
+                    if previous and previous != namespace:
+                        # Still queried until the cached aliases expire, deleted by the next run or --gc
+                        print(f"Kept previous namespace '{previous}' until the next run")
+
+                print(f"✅ Successfully uploaded '{topic_tag}' chunks.")
+
+    # 7. Save the same chunks as a local index partition
+        if "local" in backends:
+            rows = len(vectors_to_upsert)
+            partition_path = save_partition(
+                topic_tag,
+                ids=[v["id"] for v in vectors_to_upsert],
+                dense_vectors=vectors[:rows],
+                sparse_matrix=sparse_matrix[:rows],
+                metadatas=[v["metadata"] for v in vectors_to_upsert]
+            )
+            print(f"✅ Saved {rows} chunks of '{topic_tag}' to local index {partition_path}")
     except Exception as e:
         print(f"❌ An unexpected error occurred while processing topic '{topic_tag}': {str(e)}")
 # --- 5. Main function to run all uploads ---
 if __name__ == "__main__":
-    for topic_tag, doc_path in TOPIC_PATHS.items():
-        upload_topic(topic_tag, doc_path)
-    
-    print("\nAll data uploads to master index complete.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index the knowledge base")
+    parser.add_argument("--backend", choices=["pinecone", "local", "both"],
+                        default=os.getenv("VECTOR_BACKEND", "pinecone"),
+                        help="Upload to Pinecone, build the local index, or both")
+    parser.add_argument("--partitioning", choices=["metadata", "namespace"],
+                        default=os.getenv("PINECONE_PARTITIONING", "metadata"),
+                        help="One namespace per topic (atomic rebuild) or a topic metadata filter")
+    parser.add_argument("--sparse-encoder", choices=["tfidf", "bm25"],
+                        default=os.getenv("SPARSE_ENCODER", "tfidf"),
+                        help="Sparse vectors of the hybrid search, the app must use the same SPARSE_ENCODER")
+    parser.add_argument("--bm25-fold-diacritics", action="store_true",
+                        default=os.getenv("SPARSE_ENCODER_FOLD_DIACRITICS", "false").lower() == "true",
+                        help="BM25 ignores diacritics, for questions typed without them (saved with the encoder)")
+    parser.add_argument("--slim", action="store_true",
+                        default=os.getenv("CHUNK_DOCSTORE_ENABLED", "false").lower() == "true",
+                        help="Keep the chunk text in the local docstore instead of the Pinecone metadata")
+    parser.add_argument("--gc", action="store_true",
+                        help="Only delete the namespaces of previous runs that are no longer served")
+    args = parser.parse_args()
+    backends = ["pinecone", "local"] if args.backend == "both" else [args.backend]
+
+    pinecone_index = connect_pinecone() if "pinecone" in backends or args.gc else None
+    docstore = ChunkDocstore(os.getenv("CHUNK_DOCSTORE_PATH") or DOCSTORE_PATH) if args.slim else None
+    if args.gc:
+        for topic_tag in TOPIC_PATHS:
+            collect_retired_namespaces(pinecone_index, topic_tag, docstore)
+    else:
+        for topic_tag, doc_path in TOPIC_PATHS.items():
+            upload_topic(topic_tag, doc_path, backends, pinecone_index, args.partitioning, docstore,
+                         args.sparse_encoder, args.bm25_fold_diacritics)
+
+        print("\nAll data uploads to master index complete.")
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+from typing import Dict, Any, Optional
+from litellm import completion
+from logger import logger
+from config import LLM_MODELS, HEALTH_CHECK
+from .vector_db.base_vector_store import BaseVectorStore
+from .vector_db.store_factory import create_vector_store
+
+PENDING, LOADING, READY, ERROR = "pending", "loading", "ready", "error"
+
+
+class WarmupState:
+    """
+    Status of every component the first real query depends on.
+    "models" is loaded once, "pinecone" and "llm" are re-checked when stale.
+    """
+    COMPONENTS = ("models", "pinecone", "llm")
+
+    def __init__(self):
+        self.components: Dict[str, Dict[str, Any]] = {
+            name: {"status": PENDING, "error": None, "seconds": None, "checked_at": None}
+            for name in self.COMPONENTS
+        }
+        self.store: Optional[BaseVectorStore] = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    def _set(self, name: str, status: str, error: Optional[str] = None, seconds: Optional[float] = None):
+        with self._lock:
+            self.components[name].update(status=status, error=error, seconds=seconds, checked_at=time.time())
+
+    def _run_step(self, name: str, step, recheck: bool = False) -> bool:
+        # A re-check keeps the previous status until it completes, so probes do not flap
+        if not recheck:
+            self._set(name, LOADING)
+        start = time.perf_counter()
+        try:
+            ok = step()
+            error = None if ok else "check failed"
+        except Exception as e:
+            ok, error = False, str(e)
+        seconds = time.perf_counter() - start
+        self._set(name, READY if ok else ERROR, error, seconds)
+        if ok:
+            logger.info(f"✅ Warm-up '{name}' ready in {seconds:.2f}s")
+        else:
+            logger.error(f"❌ Warm-up '{name}' failed: {error}")
+        return ok
+
+    def _warm_models(self) -> bool:
+        """Load the shared models and run one dummy inference through each of them"""
+        # The models live in the shared registry, the RAG node stores reuse them on first use
+        self.store = create_vector_store()
+        self.store.load()
+        if self.store._embedding_model is None or self.store.reranker is None:
+            return False
+
+        self.store.embedding_model.embed_query("Học phí ngành Khoa học máy tính")
+        self.store.reranker.predict([("Học phí", "Học phí học kỳ chính")])
+        for vectorizer in self.store.vectorizers.values():
+            vectorizer.transform(["Học phí"])
+
+        from .nodes.router import intent_classifier
+        if intent_classifier is not None:
+            intent_classifier.predict("Xin chào")
+        return True
+
+    def _check_pinecone(self) -> bool:
+        return self.store is not None and self.store.check_connection()
+
+    def _check_llm(self) -> bool:
+        if not HEALTH_CHECK['llm_check']:
+            return True
+        completion(
+            api_key=os.getenv("GROQ_API_KEY"),
+            model=LLM_MODELS['router']['router_node'],
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1,
+            timeout=HEALTH_CHECK['timeout_seconds']
+        )
+        return True
+
+    def run(self):
+        """Background warm-up started by the FastAPI lifespan"""
+        logger.info("Starting warm-up...")
+        try:
+            if self._run_step("models", self._warm_models):
+                self._run_step("pinecone", self._check_pinecone)
+            self._run_step("llm", self._check_llm)
+        except Exception as e:
+            logger.error(f"❌ Warm-up crashed: {e}")
+
+    def start(self):
+        threading.Thread(target=self.run, name="warmup", daemon=True).start()
+
+    def refresh_dependencies(self):
+        """Re-check Pinecone and the LLM provider when their last check is stale"""
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            for name, check in (("pinecone", self._check_pinecone), ("llm", self._check_llm)):
+                component = self.snapshot()[name]
+                if component["status"] in (READY, ERROR) and now - component["checked_at"] > HEALTH_CHECK['recheck_seconds']:
+                    self._run_step(name, check, recheck=True)
+        finally:
+            self._refreshing.release()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(component) for name, component in self.components.items()}
+
+    def is_alive(self) -> bool:
+        """Still loading is alive, models that failed to load are not"""
+        return self.snapshot()["models"]["status"] != ERROR
+
+
+warmup_state = WarmupState()
@@ -0,0 +1,50 @@
+"""
+Run embedding and cross-encoder inference in a pool of worker processes.
+
+Every worker is a spawned process that loads its own copy of the models, the
+server process never loads one: forking after torch has started its thread
+pools can deadlock the workers. Web processes started with INFERENCE_MODE=remote
+send their requests over the local socket, so the number of uvicorn workers and
+the number of inference workers can be sized independently.
+
+INFERENCE_AUTHKEY must be set to the same secret for the server and the web
+processes, the server refuses to start without it.
+
+Usage (from src/):
+    python inference_server.py
+    python inference_server.py --workers 4 --threads-per-worker 2
+"""
+import sys
+import argparse
+
+from genai_agent.vector_db.inference_pool import serve
+from config import INFERENCE_BACKEND, INFERENCE_WORKERS
+from logger import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference worker pool for the embedder and the cross-encoder")
+    parser.add_argument("--address", default=INFERENCE_WORKERS['address'], help="Unix socket path or host:port")
+    parser.add_argument("--workers", type=int, default=INFERENCE_WORKERS['workers'])
+    parser.add_argument("--threads-per-worker", type=int, default=INFERENCE_WORKERS['threads_per_worker'])
+    args = parser.parse_args()
+
+    if not INFERENCE_WORKERS['authkey']:
+        logger.error("❌ INFERENCE_AUTHKEY is not set, refusing to start the inference server")
+        sys.exit(1)
+
+    # Explicit backend: the workers run the models themselves, never the remote proxies
+    backend = INFERENCE_BACKEND['backend']
+    logger.info(f"Starting {args.workers} inference workers ({backend})...")
+    serve(
+        args.address,
+        INFERENCE_WORKERS['authkey'],
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        timeout=INFERENCE_WORKERS['timeout_seconds'],
+        backend=backend
+    )
+
+
+if __name__ == "__main__":
+    main()
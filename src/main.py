@@ -1,19 +1,32 @@
 import uvicorn
+import asyncio
+import secrets
 import traceback
-import io
-from fastapi import FastAPI, Response, Depends, Request, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Response, Depends, Request, HTTPException, Header, BackgroundTasks
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 from datetime import datetime
 from contextlib import asynccontextmanager
 from fastapi.encoders import jsonable_encoder
 from genai_agent.agent import build_graph
-from genai_agent.mongo_db import connect_to_mongo, close_mongo_connection, get_collection
+from genai_agent.mongo_db import connect_to_mongo, close_mongo_connection, get_collection, db as mongo
+from genai_agent.warmup import warmup_state, READY
+from genai_agent.speech.audio_cache import AudioCache
+from genai_agent.speech.tts import OpenAITTSProvider, FakeTTSProvider, TTSService, prime_stream
+from genai_agent.speech.pipeline import synthesize_pipelined
+from genai_agent.utils.speculative_retrieval import speculative_retriever
+from genai_agent.utils.history_manager import conversation_summarizer, thread_lock
+from genai_agent.vector_db.model_registry import model_registry, batching_reranker_key
+from genai_agent.vector_db.adaptive_rerank import adaptive_rerank_policy
+from genai_agent.vector_db.store_factory import create_vector_store
+from genai_agent.nodes.router import RAG_STORE_TOPICS
 from motor.motor_asyncio import AsyncIOMotorCollection
 from langchain_core.messages import HumanMessage
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from config import TTS, HEALTH_CHECK, ADAPTIVE_RERANK, ADMIN_API
 
 load_dotenv()
 
@@ -26,22 +39,40 @@ class ChatRequest(BaseModel):
 
 class SpeakRequest(BaseModel):
     text: str
+    pipelined: Optional[bool] = None
+
+class ExplainRequest(BaseModel):
+    query: str
+    topic: str
+    k: int = 3
+    retrieve_k: int = 25
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Running startup procedures...")
     await connect_to_mongo()
     app.state.openai_client = AsyncOpenAI()
+    if TTS['provider'] == 'fake':
+        tts_provider = FakeTTSProvider()
+    else:
+        tts_provider = OpenAITTSProvider(app.state.openai_client, model=TTS['model'], voice=TTS['voice'])
+    app.state.tts_service = TTSService(tts_provider, AudioCache(TTS['cache_dir'], TTS['cache_max_bytes']))
+    # Store của /admin/retrieval/explain, tạo khi gọi lần đầu (model dùng chung qua model_registry)
+    app.state.explain_store = None
     try:
         app.state.agent_graph = build_graph()
         print("✅ LangGraph agent compiled successfully!")
     except Exception as e:
         print(f"❌ Error compiling agent graph: {e}")
         app.state.agent_graph = None
+    # Load models in the background, /readyz reports when the first query will be fast
+    warmup_state.start()
     yield
     print("Running shutdown procedures...")
     await close_mongo_connection()
     await app.state.openai_client.close()
+    if app.state.explain_store is not None:
+        app.state.explain_store.close()
 
 app = FastAPI(
     title="HCMUT Chatbot Server",
@@ -134,6 +165,7 @@ async def delete_conversation(
 async def chat(
     fastapi_request: Request,
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     collection: AsyncIOMotorCollection = Depends(lambda: get_collection("conversations"))
 ):
     agent_graph = fastapi_request.app.state.agent_graph
@@ -151,7 +183,13 @@ async def chat(
     config = {"configurable": {"thread_id": request.thread_id}}
 
     try:
-        response_state = agent_graph.invoke(inputs, config=config)
+        # ainvoke: concurrent requests run side by side (and share reranker batches) instead of blocking the event loop
+        # Các lượt của cùng một thread chạy lần lượt để không ghi đè checkpoint của nhau (xem history_manager)
+        async with thread_lock(request.thread_id):
+            response_state = await agent_graph.ainvoke(inputs, config=config)
+        # Tóm tắt các lượt cũ sau khi đã trả lời, không làm chậm response
+        if conversation_summarizer is not None:
+            background_tasks.add_task(conversation_summarizer.refresh, agent_graph, config)
         ai_reply = response_state.get('ai_reply', None)
         ai_content = ai_reply.content if ai_reply else "Dạ, có vẻ đã xảy ra lỗi. Xin Anh/Chị thử lại."
 
@@ -191,27 +229,96 @@ async def speak(
     request: SpeakRequest
 ):
     """
-    Nhận văn bản và trả về file âm thanh MP3 từ OpenAI.
+    Nhận văn bản và stream file âm thanh MP3 về trình duyệt.
+    Audio đã tạo được cache trên đĩa, lần phát lại không cần gọi OpenAI.
     """
     try:
-        client = fastapi_request.app.state.openai_client
-        
-        # Gọi API OpenAI TTS
-        # Model 'tts-1' tự động nhận diện ngôn ngữ
-        response = await client.audio.speech.create(
-            model="tts-1",
-            voice="alloy", # (alloy, echo, fable, onyx, nova, shimmer)
-            input=request.text,
-            response_format="mp3"
-        )
+        tts_service = fastapi_request.app.state.tts_service
 
-        # Stream file MP3 về trình duyệt
-        return StreamingResponse(io.BytesIO(response.content), media_type="audio/mpeg")
+        # Model 'tts-1' tự động nhận diện ngôn ngữ
+        pipelined = TTS['pipelined'] if request.pipelined is None else request.pipelined
+        if pipelined:
+            # Tách câu và tổng hợp song song, phát ngay sau câu đầu tiên
+            audio_stream = synthesize_pipelined(tts_service, request.text, TTS['pipeline_parallelism'])
+        else:
+            audio_stream = tts_service.stream(request.text)
+        audio_stream = await prime_stream(audio_stream)
+        return StreamingResponse(audio_stream, media_type="audio/mpeg")
 
     except Exception as e:
         print(f"Lỗi khi tạo audio: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="Không thể tạo file âm thanh.")
 
+async def _mongo_ready() -> bool:
+    if mongo.client is None:
+        return False
+    try:
+        await asyncio.wait_for(mongo.client.admin.command('ping'), HEALTH_CHECK['timeout_seconds'])
+        return True
+    except Exception:
+        return False
+
+# GET /healthz - liveness: tiến trình còn sống (đang tải model vẫn tính là sống)
+@app.get("/healthz")
+async def healthz():
+    alive = warmup_state.is_alive()
+    body = {"status": "alive" if alive else "broken", "components": warmup_state.snapshot()}
+    return JSONResponse(body, status_code=200 if alive else 503)
+
+# GET /readyz - readiness: chỉ nhận traffic khi model đã warm-up và các dịch vụ phụ thuộc sẵn sàng
+@app.get("/readyz")
+async def readyz(fastapi_request: Request):
+    await asyncio.to_thread(warmup_state.refresh_dependencies)
+    components = warmup_state.snapshot()
+    checks = {name: component["status"] == READY for name, component in components.items()}
+    checks["mongo"] = await _mongo_ready()
+    checks["agent_graph"] = fastapi_request.app.state.agent_graph is not None
+    ready = all(checks.values())
+    body = {"status": "ready" if ready else "not_ready", "checks": checks, "components": components}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+# GET /speak/metrics - thống kê cache audio (hit rate, dung lượng)
+@app.get("/speak/metrics")
+async def speak_metrics(fastapi_request: Request):
+    return fastapi_request.app.state.tts_service.cache.stats()
+
+# Chỉ admin: header X-Admin-Token phải khớp ADMIN_API_TOKEN, endpoint bị tắt khi chưa đặt token
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_API['token']:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_API['token']):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+# GET /chat/metrics (chỉ admin) - thống kê truy xuất song song với router (hit rate, thời gian tiết kiệm / lãng phí), gom batch và rerank thích ứng
+@app.get("/chat/metrics", dependencies=[Depends(require_admin)])
+async def chat_metrics():
+    rerank_batcher = model_registry.get(batching_reranker_key())
+    return {
+        "speculative_retrieval": speculative_retriever.stats(),
+        "rerank_batching": rerank_batcher.stats() if rerank_batcher else None,
+        "adaptive_rerank": adaptive_rerank_policy.stats() if ADAPTIVE_RERANK['enabled'] else None,
+    }
+
+# GET /models/memory (chỉ admin) - bộ nhớ của từng model dùng chung (embedder, reranker, TF-IDF, Pinecone client)
+@app.get("/models/memory", dependencies=[Depends(require_admin)])
+async def models_memory():
+    return model_registry.memory_report()
+
+# POST /admin/retrieval/explain - thời gian từng bước truy xuất, danh sách ứng viên hybrid / rerank và thay đổi thứ hạng
+@app.post("/admin/retrieval/explain", dependencies=[Depends(require_admin)])
+async def explain_retrieval(fastapi_request: Request, request: ExplainRequest):
+    topics = set(RAG_STORE_TOPICS.values())
+    if request.topic not in topics:
+        raise HTTPException(status_code=400, detail=f"topic phải là một trong: {', '.join(sorted(topics))}")
+    try:
+        if fastapi_request.app.state.explain_store is None:
+            fastapi_request.app.state.explain_store = create_vector_store()
+        store = fastapi_request.app.state.explain_store
+        return await asyncio.to_thread(store.explain, request.query, request.topic, request.k, request.retrieve_k)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=503, detail=f"Không thể truy xuất: {e}")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,112 @@
+"""
+Move an existing index from the topic metadata filter to one namespace per topic.
+
+Every topic is copied from the default namespace into a fresh versioned namespace
+(ids are "<topic>-<uuid>", values, sparse values and metadata are kept), then the
+topic alias is swapped to it in one write. Queries keep working during the
+migration: with PINECONE_PARTITIONING=metadata they read the default namespace,
+with PINECONE_PARTITIONING=namespace they follow the alias. Web processes cache the
+alias for PINECONE_ALIAS_TTL_SECONDS, so a replaced namespace is only deleted by a
+later --gc run.
+
+Usage (from src/):
+    python migrate_pinecone_namespaces.py --dry-run
+    python migrate_pinecone_namespaces.py
+    python migrate_pinecone_namespaces.py --topics tuition_fee --delete-source
+    python migrate_pinecone_namespaces.py --gc
+"""
+import os
+import argparse
+from typing import List
+
+from pinecone import Pinecone
+from dotenv import load_dotenv, find_dotenv
+
+from genai_agent.vector_db.partitioning import (
+    versioned_namespace, wait_for_namespace, swap_alias, read_aliases, delete_retired_namespaces
+)
+
+TOPICS = ["tuition_fee", "graduate", "regulation_info"]
+SOURCE_NAMESPACE = ""
+FETCH_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 1000
+
+
+def list_topic_ids(index, topic: str, namespace: str = SOURCE_NAMESPACE) -> List[str]:
+    """Chunk ids are "<topic>-<uuid>", see upload_pinecone.py"""
+    return [vector_id for page in index.list(prefix=f"{topic}-", namespace=namespace) for vector_id in page]
+
+
+def to_record(vector) -> dict:
+    """Fetched vector as an upsert record"""
+    record = {"id": vector.id, "values": vector.values, "metadata": vector.metadata}
+    if vector.sparse_values:
+        record["sparse_values"] = {"indices": vector.sparse_values.indices, "values": vector.sparse_values.values}
+    return record
+
+
+def migrate_topic(index, topic: str, dimension: int, delete_source: bool, dry_run: bool):
+    ids = list_topic_ids(index, topic)
+    print(f"\n--- {topic}: {len(ids)} vectors in the default namespace ---")
+    if not ids or dry_run:
+        return
+
+    namespace = versioned_namespace(topic)
+    for i in range(0, len(ids), FETCH_BATCH_SIZE):
+        batch = ids[i:i + FETCH_BATCH_SIZE]
+        vectors = index.fetch(ids=batch, namespace=SOURCE_NAMESPACE).vectors
+        index.upsert(vectors=[to_record(vectors[vector_id]) for vector_id in batch if vector_id in vectors],
+                     namespace=namespace)
+        print(f"Copied {min(i + FETCH_BATCH_SIZE, len(ids))}/{len(ids)}")
+
+    if not wait_for_namespace(index, namespace, len(ids)):
+        print(f"❌ Namespace '{namespace}' is incomplete, alias of '{topic}' left unchanged")
+        return
+
+    previous = swap_alias(index, topic, namespace, dimension)
+    print(f"✅ '{topic}' now served from namespace '{namespace}'")
+    if previous and previous != namespace:
+        print(f"Kept previous namespace '{previous}', delete it with --gc once the cached aliases expired")
+
+    if delete_source:
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            index.delete(ids=ids[i:i + DELETE_BATCH_SIZE], namespace=SOURCE_NAMESPACE)
+        print(f"Deleted {len(ids)} source vectors from the default namespace")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate topics from metadata filtering to namespaces")
+    parser.add_argument("--topics", nargs="+", default=TOPICS, choices=TOPICS)
+    parser.add_argument("--delete-source", action="store_true",
+                        help="Delete the migrated vectors from the default namespace (metadata mode stops working)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the vectors of every topic")
+    parser.add_argument("--gc", action="store_true",
+                        help="Only delete the namespaces the aliases no longer point to")
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv())
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    index_name = os.getenv("PINECONE_INDEX_NAME")
+    dimension = pc.describe_index(index_name).dimension
+    index = pc.Index(index_name)
+
+    if args.gc:
+        alias_ttl_seconds = float(os.getenv("PINECONE_ALIAS_TTL_SECONDS", "60"))
+        for topic in args.topics:
+            retired = delete_retired_namespaces(index, topic, alias_ttl_seconds)
+            if retired is None:
+                print(f"'{topic}' swapped less than {2 * alias_ttl_seconds:.0f}s ago, nothing deleted")
+            else:
+                print(f"'{topic}': deleted {retired or 'no'} retired namespaces")
+        return
+
+    for topic in args.topics:
+        migrate_topic(index, topic, dimension, args.delete_source, args.dry_run)
+
+    print(f"\nTopic aliases: {read_aliases(index)}")
+    if not args.dry_run:
+        print("Set PINECONE_PARTITIONING=namespace to query the namespaces.")
+
+
+if __name__ == "__main__":
+    main()
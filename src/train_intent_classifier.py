@@ -0,0 +1,241 @@
+"""
+Train the local intent classifier used in front of router_node and report
+its accuracy / latency against the LLM router.
+
+Training data:
+    - TOPIC_EXAMPLES, the labeled examples of the router prompt
+    - "New Topic: ..." lines of the application logs (topics decided by the LLM router)
+
+Usage (from src/):
+    python train_intent_classifier.py
+    python train_intent_classifier.py --target-precision 0.97 --compare-llm 30 --report report.json
+    python train_intent_classifier.py --dry-run
+"""
+import os
+import ast
+import re
+import json
+import time
+import random
+import argparse
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config import APP_ROOT_PATH
+from genai_agent.nodes.router import TOPIC, TOPIC_EXAMPLES, classify_with_llm
+from genai_agent.utils.intent_classifier import IntentClassifier, INTENT_MODEL_PATH
+from genai_agent.vector_db.model_registry import acquire_embedding_model, EMBEDDING_MODEL_NAME
+
+_NEW_TOPIC_LINE = re.compile(
+    r"New Topic: name=(?P<name>'[^']*') confidence=(?P<confidence>[\d\.eE\-]+) "
+    r"context=(?P<context>'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")"
+)
+
+
+def load_log_examples(logs_dir: str, min_confidence: float) -> List[Tuple[str, str]]:
+    """Collect (text, topic) pairs routed by the LLM, majority label per distinct text"""
+    votes: Dict[str, Counter] = defaultdict(Counter)
+    if not os.path.isdir(logs_dir):
+        return []
+
+    for name in sorted(os.listdir(logs_dir)):
+        if not name.endswith(".log"):
+            continue
+        with open(os.path.join(logs_dir, name), encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                found = _NEW_TOPIC_LINE.search(line.rstrip("\n"))
+                if not found:
+                    continue
+                try:
+                    topic = ast.literal_eval(found.group("name"))
+                    text = ast.literal_eval(found.group("context"))
+                    confidence = float(found.group("confidence"))
+                except (ValueError, SyntaxError):
+                    continue
+                text = unicodedata.normalize("NFC", text).strip()
+                if topic in TOPIC and text and confidence >= min_confidence:
+                    votes[text][topic] += 1
+
+    return [(text, counter.most_common(1)[0][0]) for text, counter in votes.items()]
+
+
+def cross_validate(topics: List[str], vectors: np.ndarray, folds: int, seed: int) -> List[Tuple[str, str, float]]:
+    """Out-of-fold (expected, predicted, confidence) for every example"""
+    order = list(range(len(topics)))
+    random.Random(seed).shuffle(order)
+    results = [None] * len(topics)
+    for fold in range(folds):
+        test = set(order[fold::folds])
+        train = [i for i in order if i not in test]
+        labels, centroids = IntentClassifier.centroids_from_vectors([topics[i] for i in train], vectors[train])
+        classifier = IntentClassifier(labels, centroids, min_confidence=1.0)
+        test = sorted(test)
+        probs = classifier.probabilities(vectors[test])
+        for i, row in zip(test, probs):
+            best = int(np.argmax(row))
+            results[i] = (topics[i], labels[best], float(row[best]))
+    return results
+
+
+def calibrate_threshold(results: List[Tuple[str, str, float]], target_precision: float) -> float:
+    """Lowest confidence threshold whose accepted predictions still reach the target precision"""
+    ranked = sorted(results, key=lambda r: r[2], reverse=True)
+    threshold, correct = 1.01, 0
+    for count, (expected, predicted, confidence) in enumerate(ranked, start=1):
+        correct += expected == predicted
+        if correct / count >= target_precision:
+            threshold = confidence
+    return threshold
+
+
+def summarize(results: List[Tuple[str, str, float]], threshold: float) -> dict:
+    accepted = [r for r in results if r[2] >= threshold]
+    per_topic = {}
+    for topic in sorted(set(r[0] for r in results)):
+        support = [r for r in results if r[0] == topic]
+        predicted = [r for r in accepted if r[1] == topic]
+        per_topic[topic] = {
+            "support": len(support),
+            "accuracy": sum(r[1] == topic for r in support) / len(support),
+            "local_precision": sum(r[0] == topic for r in predicted) / len(predicted) if predicted else None,
+        }
+    return {
+        "examples": len(results),
+        "accuracy": sum(r[0] == r[1] for r in results) / len(results),
+        "threshold": threshold,
+        "local_coverage": len(accepted) / len(results),
+        "local_accuracy": sum(r[0] == r[1] for r in accepted) / len(accepted) if accepted else None,
+        "per_topic": per_topic,
+    }
+
+
+def _percentiles(latencies_ms: List[float]) -> dict:
+    return {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def measure_local_latency(classifier: IntentClassifier, texts: List[str]) -> dict:
+    classifier.predict(texts[0])  # warm up
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        classifier.predict(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return _percentiles(latencies)
+
+
+def compare_with_llm(classifier: IntentClassifier, samples: List[Tuple[str, str, str]]) -> dict:
+    """
+    Run both routers on the same (text, expected, out-of-fold prediction) inputs.
+    Local accuracy uses the out-of-fold prediction so the examples stay unseen.
+    """
+    local_ms, llm_ms, agree, llm_correct, local_correct = [], [], 0, 0, 0
+    for text, expected, local_topic in samples:
+        start = time.perf_counter()
+        classifier.predict(text)
+        local_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        llm = classify_with_llm(text, "")
+        llm_ms.append((time.perf_counter() - start) * 1000)
+
+        agree += local_topic == llm.name
+        llm_correct += llm.name == expected
+        local_correct += local_topic == expected
+    return {
+        "samples": len(samples),
+        "agreement": agree / len(samples),
+        "local_accuracy": local_correct / len(samples),
+        "llm_accuracy": llm_correct / len(samples),
+        "local_latency": _percentiles(local_ms),
+        "llm_latency": _percentiles(llm_ms),
+    }
+
+
+def print_report(report: dict):
+    cv = report["cross_validation"]
+    print(f"\nExamples: {report['data']['prompt_examples']} from the router prompt, "
+          f"{report['data']['log_examples']} from logs")
+    print(f"Cross-validated accuracy: {cv['accuracy']:.1%}")
+    print(f"Threshold {cv['threshold']:.3f}: {cv['local_coverage']:.1%} of inputs routed locally, "
+          f"{cv['local_accuracy'] or 0:.1%} accurate")
+    for topic, stats in cv["per_topic"].items():
+        precision = "-" if stats["local_precision"] is None else f"{stats['local_precision']:.1%}"
+        print(f"  {topic:<20} support={stats['support']:<4} accuracy={stats['accuracy']:.1%} local_precision={precision}")
+    latency = report["local_latency"]
+    print(f"Local latency: p50={latency['p50_ms']:.1f} ms, p95={latency['p95_ms']:.1f} ms")
+    if "llm_comparison" in report:
+        llm = report["llm_comparison"]
+        print(f"LLM router on {llm['samples']} samples: agreement={llm['agreement']:.1%}, "
+              f"local accuracy={llm['local_accuracy']:.1%}, LLM accuracy={llm['llm_accuracy']:.1%}")
+        print(f"  latency local p50={llm['local_latency']['p50_ms']:.1f} ms / "
+              f"LLM p50={llm['llm_latency']['p50_ms']:.1f} ms, p95={llm['llm_latency']['p95_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local intent classifier of the router")
+    parser.add_argument("--logs-dir", default=os.path.join(APP_ROOT_PATH, "logs"))
+    parser.add_argument("--min-log-confidence", type=float, default=0.8,
+                        help="Only learn from log lines the LLM router was confident about")
+    parser.add_argument("--target-precision", type=float, default=0.95,
+                        help="Precision required from inputs routed without the LLM")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare-llm", type=int, default=0, metavar="N",
+                        help="Also run the LLM router on N held-out examples")
+    parser.add_argument("--output", default=INTENT_MODEL_PATH)
+    parser.add_argument("--report", help="Write the report as JSON to this path")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not save the model")
+    args = parser.parse_args()
+
+    embedding_model = acquire_embedding_model(EMBEDDING_MODEL_NAME)
+
+    # 1. Training data
+    examples = [(text, topic) for topic, texts in TOPIC_EXAMPLES.items() for text in texts]
+    log_examples = load_log_examples(args.logs_dir, args.min_log_confidence)
+    known = {unicodedata.normalize("NFC", text) for text, _ in examples}
+    log_examples = [(text, topic) for text, topic in log_examples if text not in known]
+    examples += log_examples
+    print(f"✅ Loaded {len(examples)} examples ({len(log_examples)} from logs)")
+
+    texts = [text for text, _ in examples]
+    topics = [topic for _, topic in examples]
+    vectors = IntentClassifier.embed_examples(texts, embedding_model)
+
+    # 2. Cross-validation and threshold calibration
+    results = cross_validate(topics, vectors, args.folds, args.seed)
+    threshold = calibrate_threshold(results, args.target_precision)
+    if threshold > 1.0:
+        print(f"❌ Target precision {args.target_precision:.0%} is never reached, every input will go to the LLM")
+
+    # 3. Final model on all examples
+    labels, centroids = IntentClassifier.centroids_from_vectors(topics, vectors)
+    classifier = IntentClassifier(labels, centroids, threshold, EMBEDDING_MODEL_NAME, embedding_model)
+
+    report = {
+        "data": {"prompt_examples": len(examples) - len(log_examples), "log_examples": len(log_examples)},
+        "cross_validation": summarize(results, threshold),
+        "local_latency": measure_local_latency(classifier, texts[:200]),
+    }
+    if args.compare_llm:
+        picked = random.Random(args.seed).sample(range(len(examples)), min(args.compare_llm, len(examples)))
+        samples = [(texts[i], topics[i], results[i][1]) for i in picked]
+        report["llm_comparison"] = compare_with_llm(classifier, samples)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if not args.dry_run:
+        classifier.save(args.output)
+        print(f"✅ Saved intent classifier to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
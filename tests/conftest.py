@@ -0,0 +1,4 @@
+import os
+
+# Some node modules read their API keys at import time
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
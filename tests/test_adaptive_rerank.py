@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+from genai_agent.vector_db.adaptive_rerank import AdaptiveRerankPolicy
+from genai_agent.vector_db.base_vector_store import BaseVectorStore
+
+LONG_QUERY = "Điều kiện để được xét tốt nghiệp của chương trình tiêu chuẩn là gì"
+
+
+def policy(**kwargs):
+    return AdaptiveRerankPolicy(**{"skip_margin": 0.15, "score_window": 0.2, "min_candidates": 4,
+                                   "short_query_tokens": 3, "short_query_candidates": 5,
+                                   "cascade_stage_size": 2, **kwargs})
+
+
+def test_plan():
+    rerank = policy()
+
+    assert rerank.plan(LONG_QUERY, [0.9, 0.5], k=2).reason == "all"
+    assert rerank.plan(LONG_QUERY, [0.9, 0.85, 0.5, 0.45], k=2).skip
+    # Everything within the window of the best score, at least `min_candidates`
+    plan = rerank.plan(LONG_QUERY, [0.9, 0.85, 0.8, 0.75, 0.72, 0.3, 0.2], k=2)
+    assert (plan.skip, plan.candidates, plan.reason) == (False, 5, "score window")
+    assert rerank.plan(LONG_QUERY, [0.9, 0.6, 0.5, 0.4, 0.3, 0.2], k=2).candidates == 4
+    # Short keyword queries rerank fewer
+    scores = [0.9 - i * 0.01 for i in range(12)]
+    plan = rerank.plan("học phí", scores, k=2)
+    assert (plan.candidates, plan.reason) == (5, "short query")
+    assert rerank.plan(LONG_QUERY, scores, k=2).candidates == 12
+
+
+def test_stages():
+    assert policy(cascade_stage_size=8).stages(20) == [8, 16, 20]
+    assert policy(cascade_stage_size=8).stages(8) == [8]
+    assert policy(cascade_stage_size=0).stages(20) == [20]
+
+
+class FakeReranker:
+    def __init__(self, scores):
+        self.scores = scores
+        self.calls = []
+
+    def predict(self, pairs):
+        self.calls.append([text for _, text in pairs])
+        return [self.scores[text] for _, text in pairs]
+
+
+def matches(*ids):
+    # Hybrid scores in the order given, all within the score window
+    return [{"id": id_, "score": 0.9 - i * 0.02, "metadata": {"page_content": id_}} for i, id_ in enumerate(ids)]
+
+
+def rerank(scores, k=2):
+    store = SimpleNamespace(reranker=FakeReranker(scores))
+    rerank_policy = policy()
+    reranked, ran = BaseVectorStore._adaptive_rerank(store, LONG_QUERY, matches(*"abcdef"), k, rerank_policy)
+    return reranked, ran, store.reranker.calls, rerank_policy.stats()
+
+
+def test_cascade_stops_when_a_stage_changes_nothing():
+    reranked, ran, calls, stats = rerank({"a": 0.9, "b": 0.8, "c": 0.1, "d": 0.2, "e": 0.95, "f": 0.0})
+
+    assert ran and calls == [["a", "b"], ["c", "d"]]
+    assert [m["id"] for m in reranked] == ["a", "b", "c", "d"]
+    assert (stats["reranked"], stats["early_exits"], stats["rerank_fraction"]) == (4, 1, 4 / 6)
+
+
+def test_cascade_continues_while_stages_reach_the_top():
+    reranked, ran, calls, stats = rerank({"a": 0.9, "b": 0.8, "c": 0.95, "d": 0.2, "e": 0.1, "f": 0.0})
+
+    assert calls == [["a", "b"], ["c", "d"], ["e", "f"]]
+    assert len(reranked) == 6 and stats["early_exits"] == 0
+
+
+def test_decisive_margin_skips_the_cross_encoder():
+    store = SimpleNamespace(reranker=FakeReranker({}))
+    candidates = matches("a", "b", "c")
+    candidates[2]["score"] = 0.2
+
+    reranked, ran = BaseVectorStore._adaptive_rerank(store, LONG_QUERY, candidates, 2, policy())
+
+    assert not ran and store.reranker.calls == []
+    assert [(m["id"], m["rerank_score"]) for m in reranked] == [("a", 0.9), ("b", 0.88)]
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from config import QUERY_BATCH
+from genai_agent.vector_db.batching_reranker import BatchingReranker
+from genai_agent.vector_db.local_store import LocalVectorStore
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the length of its passage and records the forward calls"""
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append((len(pairs), batch_size))
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return np.asarray([float(len(passage)) for _, passage in pairs])
+
+
+def test_scores_are_scattered_back_to_each_caller():
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = BatchingReranker(model, max_wait_ms=50)
+    results = {}
+
+    def call(name, passages):
+        results[name] = reranker.predict([(name, passage) for passage in passages])
+
+    threads = [threading.Thread(target=call, args=(f"q{i}", ["x" * (i + 1), "y" * (10 + i)])) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reranker.close()
+
+    for i in range(4):
+        assert results[f"q{i}"].tolist() == [i + 1, 10 + i]
+    # At least two callers shared a forward pass
+    assert len(model.calls) < 4
+
+
+def test_forward_batch_size():
+    model = FakeCrossEncoder()
+    reranker = BatchingReranker(model, forward_batch_size=16)
+    pairs = [("q", "p")] * 40
+
+    reranker.predict(pairs)
+    reranker.predict(pairs, batch_size=8)
+    reranker.close()
+
+    assert model.calls == [(40, 16), (40, 8)]
+
+
+def test_model_errors_reach_the_caller():
+    reranker = BatchingReranker(FakeCrossEncoder(error=RuntimeError("CUDA out of memory")))
+
+    with pytest.raises(RuntimeError, match="out of memory"):
+        reranker.predict([("q", "p")])
+    reranker.close()
+
+
+def test_slow_batches_time_out():
+    reranker = BatchingReranker(FakeCrossEncoder(delay=1.0), timeout_seconds=0.1)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        reranker.predict([("q", "p")])
+    assert time.monotonic() - started < 0.9
+    reranker.close()
+
+
+def test_stopped_worker_fails_fast():
+    reranker = BatchingReranker(FakeCrossEncoder())
+    reranker.close()
+
+    with pytest.raises(RuntimeError, match="not running"):
+        reranker.predict([("q", "p")])
+
+
+def test_query_batch_rerank_batch_size_reaches_the_model():
+    model = FakeCrossEncoder()
+    store = LocalVectorStore()
+    store.rerank_policy = None
+    store.reranker = BatchingReranker(model, forward_batch_size=16)
+    candidates = [[{"metadata": {"page_content": "p" * n}} for n in (1, 3, 2)]] * 30
+
+    results = store._rerank_batch(["q"] * 30, candidates, k=2)
+    store.reranker.close()
+
+    assert model.calls == [(90, QUERY_BATCH["rerank_batch_size"])]
+    assert [m["content"] for m in results[0]] == ["ppp", "pp"]
@@ -0,0 +1,97 @@
+import pytest
+
+from config import CONTEXT_PACKING
+from genai_agent.utils import context_packer
+from genai_agent.utils.context_packer import (
+    context_budget,
+    fit_sentences,
+    merge_blocks,
+    merge_text,
+    pack_context,
+    split_sentences,
+)
+
+FIRST = "Sinh viên đóng học phí theo học kỳ. Học phí học kỳ chính được thông báo trên trang của Phòng Đào tạo."
+# Starts with the last 38 characters of FIRST, like the splitter's chunk_overlap
+SECOND = FIRST[-38:] + " Hạn chót đóng học phí là cuối tuần thứ tám."
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """One token per word, independent of the tokenizer litellm can load here"""
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text, model=None: len(text.split()))
+
+
+def match(content, source="học phí.docx"):
+    return {"content": content, "metadata": {"source": source}}
+
+
+def test_merge_text():
+    assert merge_text(FIRST, SECOND, 20) == FIRST + " Hạn chót đóng học phí là cuối tuần thứ tám."
+    # Either order, and a chunk contained in the other
+    assert merge_text(SECOND, FIRST, 20) == merge_text(FIRST, SECOND, 20)
+    assert merge_text(FIRST, FIRST[10:50], 20) == FIRST
+    # Shared text shorter than the minimum is a coincidence
+    assert merge_text("Học phí là 10 triệu đồng.", "đồng. Sinh viên đóng trước hạn.", 20) is None
+
+
+def test_merge_blocks():
+    third = "Ký túc xá có 2 khu: khu A ở Thủ Đức và khu B ở Dĩ An, đăng ký qua trang của trung tâm."
+    blocks = merge_blocks([match(SECOND), match(third, "ktx.docx"), match(FIRST)], 20)
+
+    assert [(b.source, b.rank, b.chunks) for b in blocks] == [("học phí.docx", 0, 2), ("ktx.docx", 1, 1)]
+    assert blocks[0].text == merge_text(FIRST, SECOND, 20)
+    # Same text from another source is not merged
+    assert len(merge_blocks([match(FIRST), match(FIRST, "khác.docx")], 20)) == 2
+
+
+def test_split_sentences():
+    text = "1. Tình hình học Anh văn\nLiên hệ PGS. TS. Trần Thiên Phúc tại Tp. Thủ Đức vào thứ hai. Hạn chót: 15/08."
+
+    assert split_sentences(text) == [
+        "1. Tình hình học Anh văn",
+        "Liên hệ PGS. TS. Trần Thiên Phúc tại Tp. Thủ Đức vào thứ hai.",
+        "Hạn chót:",
+        "15/08.",
+    ]
+
+
+def test_fit_sentences_keeps_whole_sentences():
+    # 8 and 14 words, plus one separator token each
+    assert fit_sentences(FIRST, 10, None) == "Sinh viên đóng học phí theo học kỳ."
+    assert fit_sentences(FIRST, 5, None) == ""
+
+
+def test_pack_context_cuts_and_drops_blocks(monkeypatch):
+    monkeypatch.setattr(context_packer, "MIN_FRAGMENT_TOKENS", 5)
+    long_block = " ".join(f"Câu số {i} về quy chế đào tạo." for i in range(10))
+    matches = [match(FIRST), match(long_block, "quy chế.docx"), match("Ngắn gọn thôi.", "khác.docx")]
+
+    # 22 words, then room for two of the 8-word sentences
+    packed = pack_context(matches, budget=41)
+
+    assert packed.tokens <= 41
+    assert packed.text.startswith(FIRST + "\n\n" + "Câu số 0 về quy chế đào tạo.")
+    assert packed.text.endswith(".")
+    assert (packed.chunks, packed.blocks, packed.truncated, packed.dropped) == (3, 3, 1, 0)
+    assert packed.sources == ["học phí.docx", "quy chế.docx", "khác.docx"]
+
+    # No whole sentence of the second block fits, the third one still does
+    packed = pack_context(matches, budget=30)
+    assert (packed.blocks, packed.truncated, packed.dropped) == (2, 0, 1)
+    assert packed.sources == ["học phí.docx", "khác.docx"]
+
+
+def test_context_budget(monkeypatch):
+    monkeypatch.setitem(CONTEXT_PACKING, "context_tokens", 800)
+    monkeypatch.setitem(CONTEXT_PACKING, "model_context_tokens", {"small-model": 300})
+    monkeypatch.setitem(CONTEXT_PACKING, "max_prompt_tokens", 6000)
+    monkeypatch.setitem(CONTEXT_PACKING, "reserved_output_tokens", 1000)
+    context_packer.max_input_tokens.cache_clear()
+
+    assert context_budget(None, other_tokens=500) == 800
+    assert context_budget("small-model", other_tokens=500) == 300
+    # A long history leaves less room than the budget
+    assert context_budget(None, other_tokens=4500) == 500
+    assert context_budget(None, other_tokens=9000) == 0
+    context_packer.max_input_tokens.cache_clear()
@@ -0,0 +1,65 @@
+import threading
+
+from genai_agent.vector_db import docstore
+from genai_agent.vector_db.docstore import ChunkDocstore
+
+
+def record(id_, topic, text):
+    return {"id": id_, "metadata": {"topic": topic, "source": f"{topic}.docx", "page_content": text}}
+
+
+def test_put_and_get(tmp_path):
+    store = ChunkDocstore(str(tmp_path / "chunks.sqlite3"))
+    store.put_many([record("tuition#0", "tuition", "Học phí học kỳ chính"), record("graduate#0", "graduate", "Sau đại học")])
+
+    found = store.get_many(["tuition#0", "missing"])
+
+    assert found == {"tuition#0": {"topic": "tuition", "source": "tuition.docx", "page_content": "Học phí học kỳ chính"}}
+    # Replaced on a rebuild
+    store.put_many([record("tuition#0", "tuition", "Học phí mới")])
+    assert store.get_many(["tuition#0"])["tuition#0"]["page_content"] == "Học phí mới"
+    assert len(store) == 2
+    store.close()
+
+
+def test_lookups_are_batched(tmp_path, monkeypatch):
+    monkeypatch.setattr(docstore, "_LOOKUP_BATCH_SIZE", 3)
+    store = ChunkDocstore(str(tmp_path / "chunks.sqlite3"))
+    store.put_many([record(f"tuition#{i}", "tuition", f"Đoạn {i}") for i in range(10)])
+
+    found = store.get_many([f"tuition#{i}" for i in range(10)])
+
+    assert sorted(found) == sorted(f"tuition#{i}" for i in range(10))
+    store.close()
+
+
+def test_delete_stale_keeps_other_topics(tmp_path):
+    store = ChunkDocstore(str(tmp_path / "chunks.sqlite3"))
+    store.put_many([record(f"tuition#{i}", "tuition", f"Đoạn {i}") for i in range(3)]
+                   + [record("graduate#0", "graduate", "Sau đại học")])
+
+    assert store.delete_stale("tuition", ["tuition#1"]) == 2
+    assert sorted(store.get_many(["tuition#0", "tuition#1", "tuition#2", "graduate#0"])) == ["graduate#0", "tuition#1"]
+    store.close()
+
+
+def test_one_connection_per_thread(tmp_path):
+    store = ChunkDocstore(str(tmp_path / "chunks.sqlite3"))
+    store.put_many([record("tuition#0", "tuition", "Học phí")])
+    results = []
+
+    def read():
+        results.append(store.get_many(["tuition#0"])["tuition#0"]["page_content"])
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["Học phí"] * 3
+    assert len(store._connections) == 4
+    store.close()
+    assert store._connections == []
+    # Reopens after close
+    assert len(store) == 1
+    store.close()
@@ -0,0 +1,126 @@
+import os
+import unicodedata
+
+import docx
+import numpy as np
+
+from config import FAQ_INDEX
+from genai_agent.utils.faq_responder import faq_reply
+from genai_agent.vector_db import faq_index
+from genai_agent.vector_db.faq_index import FAQIndex, build_faq_index, extract_qa_pairs, question_text
+
+KB_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "BKU_KB", "BKU_KB", "regulation_info")
+
+
+def kb_document(name: str) -> str:
+    """KB file names are NFD on disk"""
+    for candidate in os.listdir(KB_FOLDER):
+        if unicodedata.normalize("NFC", candidate) == name:
+            return os.path.join(KB_FOLDER, candidate)
+    raise FileNotFoundError(name)
+
+
+def write_docx(path, paragraphs) -> str:
+    """(text, bold) paragraphs"""
+    document = docx.Document()
+    for text, bold in paragraphs:
+        document.add_paragraph().add_run(text).bold = bold
+    document.save(path)
+    return str(path)
+
+
+# Excerpt of "Các thông tin cần biết cho tân sinh viên.docx"
+NEW_STUDENTS = [
+    ("Các thông tin cần biết cho tân sinh viên", True),
+    ("Thân gửi các bạn Tân Sinh viên Khóa 2024:", False),
+    ("Học phí:", True),
+    ("Về thông tin học phí bạn vui lòng xem chi tiết tại hcmut.edu.vn >> Đào tạo >> Học phí", False),
+    ("B. CÁC THÔNG TIN CẦN BIẾT: ", True),
+    ("III. Tư vấn:", True),
+    ("1. Tham vấn về môn tự chọn tự do, Chương trình đào tạo: tại Cố vấn học tập/ Ban chủ nhiệm Khoa.", False),
+    ("2. Tư vấn khác về học vụ tại trang mybk.hcmut.edu.vn >> BKSI.", False),
+    ("Làm sao để đăng ký in bảng điểm?", False),
+    ("Tại trang mybk.hcmut.edu.vn >> Đăng ký in bảng điểm.", False),
+]
+
+
+def test_pairs_follow_the_bold_headings(tmp_path):
+    path = write_docx(tmp_path / "Các thông tin cần biết cho tân sinh viên.docx", NEW_STUDENTS)
+
+    pairs = extract_qa_pairs(path)
+
+    assert [(p["section"], p["question"]) for p in pairs] == [
+        ("", "Học phí"),
+        ("CÁC THÔNG TIN CẦN BIẾT", "Tư vấn"),
+        ("CÁC THÔNG TIN CẦN BIẾT", "Làm sao để đăng ký in bảng điểm?"),
+    ]
+    assert pairs[1]["answer"].splitlines()[1].startswith("2. Tư vấn khác")
+    # The greeting under the title is not an answer
+    assert all("Thân gửi" not in p["answer"] for p in pairs)
+    assert question_text(pairs[1]) == "Các thông tin cần biết cho tân sinh viên: CÁC THÔNG TIN CẦN BIẾT: Tư vấn"
+
+
+def test_real_kb_document():
+    pairs = extract_qa_pairs(kb_document("Các câu hỏi liên quan đến tín chỉ tự do.docx"))
+
+    assert [p["question"] for p in pairs] == ["Quy định", "Nguyên tắc xét", "Đặc cách", "Danh mục", "Kênh tư vấn"]
+    assert pairs[0]["title"] == "Các câu hỏi liên quan đến tín chỉ tự do (TCTD)"
+    assert pairs[1]["answer"].startswith("- Đại cương (Toán, Khoa học tự nhiên")
+    assert all("\xa0" not in p["answer"] for p in pairs)
+
+
+class KeywordEmbedder:
+    """One dimension per keyword, enough to tell the pairs apart"""
+    KEYWORDS = ["học phí", "tư vấn", "bảng điểm"]
+
+    def _embed(self, text):
+        text = text.lower()
+        return [float(keyword in text) for keyword in self.KEYWORDS]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def test_build_and_match(tmp_path, monkeypatch):
+    monkeypatch.setattr(faq_index, "FAQ_SAVE_DIR", str(tmp_path / "faq_models"))
+    folder = tmp_path / "regulation_info"
+    folder.mkdir()
+    write_docx(folder / "Các thông tin cần biết cho tân sinh viên.docx", NEW_STUDENTS)
+    write_docx(folder / "Rút môn học.docx", [("Rút môn học?", True), ("Không phải tài liệu hỏi đáp.", False)])
+
+    assert build_faq_index("regulation_info", str(folder), KeywordEmbedder())
+    index = FAQIndex.load("regulation_info")
+
+    assert len(index.pairs) == 3
+    assert index.match("Ai tư vấn cho em?", KeywordEmbedder(), 0.9)["question"] == "Tư vấn"
+    assert index.match("Ký túc xá ở đâu?", KeywordEmbedder(), 0.9) is None
+
+
+def test_stale_index_is_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(faq_index, "FAQ_SAVE_DIR", str(tmp_path))
+    (tmp_path / "graduate_faq.joblib").write_bytes(b"old")
+    folder = tmp_path / "graduate"
+    folder.mkdir()
+
+    assert build_faq_index("graduate", str(folder), KeywordEmbedder()) is None
+    assert not (tmp_path / "graduate_faq.joblib").exists()
+
+
+def test_faq_reply(tmp_path, monkeypatch):
+    pairs = extract_qa_pairs(write_docx(tmp_path / "Các thông tin cần biết cho tân sinh viên.docx", NEW_STUDENTS))
+    embeddings = np.asarray(KeywordEmbedder().embed_documents([question_text(p) for p in pairs]), dtype=np.float32)
+    index = FAQIndex("regulation_info", pairs, embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True))
+
+    # Off by default
+    assert faq_reply("Học phí đóng ở đâu?", index, KeywordEmbedder(), "model") is None
+
+    monkeypatch.setitem(FAQ_INDEX, "enabled", True)
+    monkeypatch.setitem(FAQ_INDEX, "rephrase_with_llm", False)
+    update = faq_reply("Học phí đóng ở đâu?", index, KeywordEmbedder(), "model")
+
+    assert update["ai_reply"].content == f"Dạ, {pairs[0]['answer']}"
+    assert "Các thông tin cần biết cho tân sinh viên.docx" in update["ai_reply"].additional_kwargs["sources"]
+    assert faq_reply("Ký túc xá ở đâu?", index, KeywordEmbedder(), "model") is None
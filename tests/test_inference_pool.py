@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from genai_agent.vector_db.inference_pool import InferenceService, start_workers
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [float(len(text)), float(os.getpid())]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class FakeCrossEncoder:
+    def predict(self, pairs, batch_size=32):
+        import torch
+        return [float(batch_size), float(torch.get_num_threads())] + [0.0] * (len(pairs) - 2)
+
+
+# Module level: the spawned workers import them by name
+def load_fake_models(backend):
+    return FakeEmbeddings(), FakeCrossEncoder()
+
+
+def load_broken_models(backend):
+    raise OSError(f"no {backend} model files")
+
+
+@pytest.fixture
+def pool():
+    started = []
+
+    def start(*args, **kwargs):
+        processes, task_queue, result_queue = start_workers(*args, **kwargs)
+        started.append((processes, task_queue))
+        return InferenceService(task_queue, result_queue, len(processes), timeout=30)
+    yield start
+    for processes, task_queue in started:
+        for _ in processes:
+            task_queue.put(None)
+        for process in processes:
+            process.join(timeout=5)
+
+
+def test_workers_load_their_own_models(pool):
+    service = pool("torch", workers=2, threads_per_worker=1, load_models=load_fake_models)
+
+    length, worker_pid = service.embed_query("Học phí")
+    assert length == len("Học phí") and worker_pid != os.getpid()
+    # The thread pool is sized before the models are loaded, the batch size is passed through
+    assert service.rerank([("q", "a"), ("q", "b")], batch_size=8) == [8.0, 1.0]
+
+
+def test_a_worker_that_cannot_load_stops_the_server(pool):
+    with pytest.raises(RuntimeError, match="no onnx model files"):
+        pool("onnx", workers=2, threads_per_worker=1, load_models=load_broken_models)
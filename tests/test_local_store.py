@@ -0,0 +1,19 @@
+import pytest
+
+from genai_agent.vector_db.local_store import LocalVectorStore
+
+
+class BrokenEmbedder:
+    def embed_query(self, text):
+        raise ConnectionError("inference server unreachable")
+
+
+def test_query_failure_raises_instead_of_returning_no_matches(monkeypatch):
+    store = LocalVectorStore()
+    monkeypatch.setattr(store, "is_healthy", lambda: True)
+    store._embedding_model = BrokenEmbedder()
+
+    with pytest.raises(ConnectionError):
+        store.query("Học phí là bao nhiêu?", "tuition_fee")
+    with pytest.raises(ConnectionError):
+        store.query_multi("Học phí là bao nhiêu?", ["tuition_fee", "graduate"])
@@ -0,0 +1,35 @@
+import threading
+
+import numpy as np
+import torch
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from genai_agent.vector_db.model_registry import estimate_bytes
+from genai_agent.vector_db.sparse_encoder import BM25Encoder
+
+
+class EmbeddingsWrapper:
+    """Like HuggingFaceEmbeddings: the SentenceTransformer is in the private `_client`"""
+    def __init__(self, module):
+        self._client = module
+        self._lock = threading.Lock()
+
+
+def test_torch_models_are_measured_through_private_clients():
+    module = torch.nn.Linear(64, 32)
+
+    assert estimate_bytes(EmbeddingsWrapper(module)) == (64 * 32 + 32) * 4
+
+
+def test_vectorizers_are_measured_from_their_arrays():
+    vectorizer = TfidfVectorizer().fit(["học phí ngành điện tử", "điều kiện tốt nghiệp", "quy chế đào tạo"])
+    encoder = BM25Encoder(term_hashes=np.arange(100, dtype=np.uint64), idf=np.ones(100, dtype=np.float32))
+
+    assert estimate_bytes(vectorizer) > vectorizer.idf_.nbytes
+    assert estimate_bytes(encoder) >= 100 * 8 + 100 * 4
+
+
+def test_unknown_objects_are_not_serialized():
+    # A lock cannot be pickled, the estimate must not try
+    assert estimate_bytes(threading.Lock()) is None
+    assert estimate_bytes(object()) is None
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+
+from genai_agent.vector_db import partitioning, sparse_encoder
+from genai_agent.vector_db.partitioning import (
+    NamespacePartitioning,
+    delete_retired_namespaces,
+    read_aliases,
+    swap_alias,
+)
+from genai_agent.vector_db.sparse_encoder import BM25Encoder, bm25_model_path, delete_sparse_encoders
+
+
+class FakeIndex:
+    """The parts of a Pinecone index the alias records and the queries use"""
+    def __init__(self, *namespaces):
+        self.namespaces = {name: {} for name in namespaces}
+        self.deleted = []
+        self.queries = []
+
+    def fetch(self, ids, namespace):
+        records = self.namespaces.get(namespace, {})
+        return SimpleNamespace(vectors={i: SimpleNamespace(metadata=records[i]) for i in ids if i in records})
+
+    def upsert(self, vectors, namespace=""):
+        for vector in vectors:
+            self.namespaces.setdefault(namespace, {})[vector["id"]] = vector["metadata"]
+
+    def describe_index_stats(self):
+        return SimpleNamespace(namespaces=dict.fromkeys(self.namespaces))
+
+    def delete(self, delete_all, namespace):
+        self.deleted.append(namespace)
+        self.namespaces.pop(namespace)
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        return {"matches": []}
+
+
+def test_swap_alias_returns_the_previous_namespace():
+    index = FakeIndex()
+
+    assert swap_alias(index, "graduate", "graduate__1", 4) is None
+    assert swap_alias(index, "graduate", "graduate__2", 4) == "graduate__1"
+    swap_alias(index, "tuition_fee", "tuition_fee__1", 4)
+
+    assert read_aliases(index) == {"graduate": "graduate__2", "tuition_fee": "tuition_fee__1"}
+
+
+def test_retired_namespaces_wait_for_the_cached_aliases_to_expire():
+    index = FakeIndex("graduate__1", "graduate__2", "graduate__3", "tuition_fee__1")
+    swap_alias(index, "graduate", "graduate__2", 4)
+
+    assert delete_retired_namespaces(index, "graduate", alias_ttl_seconds=60) is None
+    assert delete_retired_namespaces(index, "graduate", alias_ttl_seconds=0) == ["graduate__1", "graduate__3"]
+    assert index.deleted == ["graduate__1", "graduate__3"]
+    # Never swapped in: nothing is deleted
+    assert delete_retired_namespaces(index, "tuition_fee", alias_ttl_seconds=0) is None
+
+
+def test_namespace_partitioning_caches_the_aliases(monkeypatch):
+    index = FakeIndex()
+    swap_alias(index, "graduate", "graduate__1", 4)
+    strategy = NamespacePartitioning(ttl_seconds=60)
+
+    assert strategy.query_kwargs(index, "graduate") == {"namespace": "graduate__1"}
+    assert strategy.query_kwargs(index, "tuition_fee") == {"namespace": "tuition_fee"}
+
+    swap_alias(index, "graduate", "graduate__2", 4)
+    assert strategy.namespace(index, "graduate") == "graduate__1"
+    strategy._fetched_at -= 61
+    assert strategy.namespace(index, "graduate") == "graduate__2"
+
+    # Pinecone unreachable: the last known aliases are kept
+    monkeypatch.setattr(partitioning, "read_aliases", lambda index: (_ for _ in ()).throw(ConnectionError()))
+    strategy._fetched_at -= 61
+    assert strategy.namespace(index, "graduate") == "graduate__2"
+
+
+@pytest.fixture
+def sparse_models(tmp_path, monkeypatch):
+    monkeypatch.setattr(sparse_encoder, "SPARSE_MODELS_DIR", str(tmp_path))
+
+    def save(name, texts):
+        encoder = BM25Encoder()
+        encoder.fit_transform(texts)
+        encoder.save(bm25_model_path(name))
+    return save
+
+
+def test_store_sparse_encoder_follows_the_alias(sparse_models, monkeypatch):
+    monkeypatch.setenv("PINECONE_API_KEY", "test-key")
+    monkeypatch.setenv("PINECONE_INDEX_NAME", "test-index")
+    from config import SPARSE_ENCODER
+    from genai_agent.vector_db.pinecone_store import PineconeStore
+    monkeypatch.setitem(SPARSE_ENCODER, "encoder", "bm25")
+
+    sparse_models("graduate__1", ["điều kiện tốt nghiệp"])
+    sparse_models("graduate__2", ["chuẩn đầu ra ngoại ngữ", "điều kiện tốt nghiệp"])
+    index = FakeIndex()
+    swap_alias(index, "graduate", "graduate__1", 4)
+    store = PineconeStore()
+    store.index = index
+    store.partitioning = NamespacePartitioning(ttl_seconds=0)
+
+    store._hybrid_retrieve("Điều kiện tốt nghiệp?", [0.1] * 4, "graduate", 5)
+    first = store.vectorizers["graduate__1"]
+    # The new namespace and its encoder are switched together
+    swap_alias(index, "graduate", "graduate__2", 4)
+    store._hybrid_retrieve("Điều kiện tốt nghiệp?", [0.1] * 4, "graduate", 5)
+
+    assert [q["namespace"] for q in index.queries] == ["graduate__1", "graduate__2"]
+    assert list(store.vectorizers) == ["graduate__2"]
+    assert len(store.vectorizers["graduate__2"].term_hashes) > len(first.term_hashes)
+    assert index.queries[1]["sparse_vector"]["indices"]
+    store.close()
+
+
+def test_delete_sparse_encoders(sparse_models):
+    sparse_models("graduate__1", ["điều kiện tốt nghiệp"])
+
+    delete_sparse_encoders("graduate__1")
+
+    with pytest.raises(FileNotFoundError):
+        BM25Encoder.load(bm25_model_path("graduate__1"))
+    # Already gone: nothing to do
+    delete_sparse_encoders("graduate__1")
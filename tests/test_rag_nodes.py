@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from genai_agent.nodes.subgraph import graduate_nodes, regulation_info_nodes, tuition_fee_nodes
+from genai_agent.utils.retrieval_gate import RetrievalGate, fallback_answer
+
+NODES = [
+    (graduate_nodes, graduate_nodes.graduate_node, "graduate"),
+    (tuition_fee_nodes, tuition_fee_nodes.tuition_fee_node, "tuition_fee"),
+    (regulation_info_nodes, regulation_info_nodes.regulation_info_node, "regulation_info"),
+]
+
+
+class FakeStore:
+    def __init__(self, error=None):
+        self.error = error
+        self.embedding_model = None
+
+    def is_healthy(self):
+        return True
+
+    def query(self, query_text, topic, k=3):
+        if self.error:
+            raise self.error
+        return []
+
+    query_multi = query
+
+
+def fake_completion(**kwargs):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="LLM answer"))])
+
+
+@pytest.fixture
+def run_node(monkeypatch):
+    def run(module, node, store):
+        monkeypatch.setattr(module, "vector_store", store)
+        monkeypatch.setattr(module, "faq_index", None)
+        monkeypatch.setattr(module, "retrieval_gate", RetrievalGate({}, None))
+        monkeypatch.setattr(module, "context_compressor", None)
+        monkeypatch.setattr(module, "completion", fake_completion)
+        if hasattr(module, "table_store"):
+            monkeypatch.setattr(module, "table_store", None)
+        question = HumanMessage(content="Học phí ngành Điện tử là bao nhiêu?", id="turn-1",
+                                additional_kwargs={"current_time": "2026-10-19 09:00:00"})
+        state = {"messages": [question]}
+        return node(state)["ai_reply"].content
+    return run
+
+
+@pytest.mark.parametrize("module, node, topic", NODES)
+def test_store_outage_is_not_answered_as_not_found(run_node, module, node, topic):
+    reply = run_node(module, node, FakeStore(ConnectionError("Pinecone unreachable")))
+
+    assert reply != fallback_answer(topic)
+
+
+@pytest.mark.parametrize("module, node, topic", NODES)
+def test_empty_retrieval_gets_the_fallback(run_node, module, node, topic):
+    reply = run_node(module, node, FakeStore())
+
+    assert reply == fallback_answer(topic)
@@ -0,0 +1,64 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from config import CONVERSATION_HISTORY
+from genai_agent.utils.helpers import merge_rendered_history, parsing_messages_to_history, render_message
+from genai_agent.utils.history_manager import build_chat_history, render_history_update, rendered_lines
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"Câu hỏi {i}", additional_kwargs={"current_time": f"09:0{i}"}))
+        messages.append(AIMessage(content=f"Trả lời {i}", additional_kwargs={"current_time": f"09:0{i}"}))
+    return messages
+
+
+def test_merge_rendered_history():
+    assert merge_rendered_history(None, (0, ["a", "b"])) == ["a", "b"]
+    # Append
+    assert merge_rendered_history(["a", "b"], (2, ["c"])) == ["a", "b", "c"]
+    # Lines from `start` on are replaced, e.g. after the cache got ahead of the messages
+    assert merge_rendered_history(["a", "b", "stale"], (2, ["c", "d"])) == ["a", "b", "c", "d"]
+    # A full list from a subgraph replaces everything
+    assert merge_rendered_history(["a", "b"], ["x"]) == ["x"]
+    assert merge_rendered_history(["a"], None) == []
+
+
+def test_render_history_update_only_renders_new_messages():
+    messages = conversation(2)
+    cached = [render_message(m) for m in messages[:3]]
+
+    start, lines = render_history_update({"messages": messages, "rendered_history": cached})
+
+    assert (start, lines) == (3, [render_message(messages[3])])
+    assert merge_rendered_history(cached, (start, lines)) == [render_message(m) for m in messages]
+
+
+def test_rendered_lines_match_the_full_rebuild():
+    messages = conversation(3) + [SystemMessage(content="ignored")]
+    full = parsing_messages_to_history(messages)
+
+    assert "".join(rendered_lines({"messages": messages})) == full
+    # A cache longer than the messages is cut to them, a partial one is completed
+    assert rendered_lines({"messages": messages, "rendered_history": ["old"] * 10}) == ["old"] * len(messages)
+    partial = [render_message(m) for m in messages[:2]]
+    assert "".join(rendered_lines({"messages": messages, "rendered_history": partial})) == full
+
+
+def test_chat_history_views(monkeypatch):
+    monkeypatch.setitem(CONVERSATION_HISTORY, "enabled", True)
+    monkeypatch.setitem(CONVERSATION_HISTORY, "summarize_every_turns", 1)
+    monkeypatch.setattr("genai_agent.utils.history_manager.VIEW_TURNS", {"answer": 2, "router": 1})
+    messages = conversation(6)
+    state = {"messages": messages, "rendered_history": [render_message(m) for m in messages],
+             "conversation_summary": "Sinh viên hỏi về học phí.", "summarized_count": 6}
+
+    router = build_chat_history(state, view="router")
+    answer = build_chat_history(state)
+
+    assert router == "Summary of the earlier conversation: Sinh viên hỏi về học phí.\n\n" + parsing_messages_to_history(messages[-2:])
+    # The answer view keeps the turn that left the window but is not summarized yet
+    assert answer == "Summary of the earlier conversation: Sinh viên hỏi về học phí.\n\n" + parsing_messages_to_history(messages[6:])
+
+    monkeypatch.setitem(CONVERSATION_HISTORY, "enabled", False)
+    assert build_chat_history(state) == parsing_messages_to_history(messages)
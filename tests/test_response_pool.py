@@ -0,0 +1,92 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from config import RESPONSE_POOL
+from genai_agent.utils import response_pool as pool_module
+from genai_agent.utils.response_pool import (
+    ResponsePool,
+    carries_real_content,
+    detect_form_of_address,
+    detect_language,
+)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setitem(RESPONSE_POOL, "enabled", True)
+    pool = ResponsePool()
+    # No background refresh: every flow was just refreshed
+    for flow in pool.variants:
+        pool.refreshed_at[flow] = float("inf")
+    return pool
+
+
+def test_templated_inputs():
+    assert not carries_real_content("greeting", "Xin chào bạn ơi!")
+    assert not carries_real_content("wanna_exit", "Cảm ơn em nhiều nha, tạm biệt")
+    assert carries_real_content("greeting", "Chào em, học phí ngành Điện tử năm nay bao nhiêu?")
+    # Everything counts for off-topic remarks
+    assert carries_real_content("off_topic", "Hôm nay trời mưa to quá")
+
+
+def test_language_and_form_of_address():
+    assert detect_language("Xin chào") == "vi"
+    assert detect_language("xin chao") == "vi"
+    assert detect_language("Hello there") == "en"
+
+    assert detect_form_of_address([HumanMessage(content="Chào em")]) == {"user": "Anh/Chị", "Self": "Em", "self": "em"}
+    assert detect_form_of_address([HumanMessage(content="Chị muốn hỏi chút")])["user"] == "Chị"
+    # The latest self-introduction wins, elders are answered as "Con"
+    messages = [HumanMessage(content="Tôi là anh Nam"), AIMessage(content="Dạ"), HumanMessage(content="cho bác hỏi")]
+    assert detect_form_of_address(messages) == {"user": "Bác", "Self": "Con", "self": "con"}
+
+
+def test_pick_renders_a_variant(pool):
+    reply = pool.pick("greeting", [HumanMessage(content="Chị muốn hỏi chút")])
+
+    assert reply.startswith("Dạ, Em") and "Chị" in reply
+    assert "{" not in reply
+
+
+def test_pick_leaves_real_content_to_the_llm(pool, monkeypatch):
+    assert pool.pick("greeting", [HumanMessage(content="Chào em, điều kiện tốt nghiệp là gì vậy?")]) is None
+    assert pool.pick("unknown_flow", [HumanMessage(content="Hi")]) is None
+
+    monkeypatch.setitem(RESPONSE_POOL, "enabled", False)
+    assert pool.pick("greeting", [HumanMessage(content="Hi")]) is None
+
+
+def test_refresh_keeps_the_seeds_and_drops_broken_placeholders(pool, monkeypatch):
+    generated = ["Tạm biệt {user}, hẹn gặp lại!", "Bye {unknown}", "Goodbye {user"]
+
+    def fake_completion(**kwargs):
+        content = "<think>...</think> Here you go: " + json.dumps(generated)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(pool_module, "completion", fake_completion)
+    pool._refreshing.add("wanna_exit")
+    pool._refresh("wanna_exit")
+
+    assert pool.variants["wanna_exit"]["vi"] == pool_module.SEED_VARIANTS["wanna_exit"]["vi"] + [generated[0]]
+    assert "wanna_exit" not in pool._refreshing
+
+
+def test_failed_refresh_keeps_serving_the_seeds(pool, monkeypatch):
+    def failing_completion(**kwargs):
+        raise ConnectionError("Groq unreachable")
+
+    monkeypatch.setattr(pool_module, "completion", failing_completion)
+    pool.refreshed_at["greeting"] = 0.0
+    # The refresh runs inline instead of in a background thread
+    refreshes = []
+    monkeypatch.setattr(pool_module, "threading", SimpleNamespace(
+        Thread=lambda target, args, daemon: SimpleNamespace(start=lambda: refreshes.append(target(*args)))
+    ))
+
+    assert pool.pick("greeting", [HumanMessage(content="Hello")])
+    assert len(refreshes) == 1
+    assert pool.variants["greeting"] == pool_module.SEED_VARIANTS["greeting"]
+    assert pool.refreshed_at["greeting"] > 0
@@ -0,0 +1,63 @@
+import json
+
+from genai_agent.utils.retrieval_gate import RetrievalGate
+
+QUESTION = "Học phí ngành Kỹ thuật Máy tính năm 2024 là bao nhiêu?"
+
+
+def match(score, topic="tuition_fee", reranked=True):
+    return {"score": score, "metadata": {"topic": topic}, "reranked": reranked}
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_decisions():
+    gate = RetrievalGate({"tuition_fee": -2.0})
+
+    assert not gate.check(QUESTION, "tuition_fee", [])
+    assert not gate.check(QUESTION, "tuition_fee", [match(-3.0), match(-4.0)])
+    assert gate.check(QUESTION, "tuition_fee", [match(-3.0), match(-1.5)])
+    # Hybrid scores of a skipped rerank are on another scale
+    assert gate.check(QUESTION, "tuition_fee", [match(0.01, reranked=False)])
+    # No threshold for the topic of the best chunk
+    assert gate.check(QUESTION, "tuition_fee", [match(-9.0, topic="graduate")])
+
+
+def test_no_log_by_default(tmp_path):
+    gate = RetrievalGate({})
+    gate.check(QUESTION, "tuition_fee", [match(1.0)])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_log_keeps_no_question_text_by_default(tmp_path):
+    path = tmp_path / "logs" / "retrieval_gate.jsonl"
+    gate = RetrievalGate({"tuition_fee": -2.0}, str(path))
+    gate.check(QUESTION, "tuition_fee", [match(-3.0)])
+
+    [record] = read_log(path)
+    assert "query" not in record and QUESTION not in path.read_text(encoding="utf-8")
+    assert record["query_chars"] == len(QUESTION)
+    assert (record["passed"], record["reason"]) == (False, "below threshold")
+
+
+def test_log_questions_when_opted_in(tmp_path):
+    path = tmp_path / "retrieval_gate.jsonl"
+    gate = RetrievalGate({}, str(path), log_queries=True)
+    gate.check(QUESTION, "tuition_fee", [match(1.0)])
+
+    assert read_log(path)[0]["query"] == QUESTION
+
+
+def test_log_is_rotated(tmp_path):
+    path = tmp_path / "retrieval_gate.jsonl"
+    gate = RetrievalGate({}, str(path), log_max_bytes=1000, log_backup_count=2)
+    for _ in range(100):
+        gate.check(QUESTION, "tuition_fee", [match(1.0)])
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["retrieval_gate.jsonl", "retrieval_gate.jsonl.1", "retrieval_gate.jsonl.2"]
+    assert all(p.stat().st_size <= 1000 for p in tmp_path.iterdir())
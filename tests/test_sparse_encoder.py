@@ -0,0 +1,67 @@
+import unicodedata
+
+import numpy as np
+import pytest
+
+from genai_agent.vector_db.hybrid_helpers import convert_to_pinecone_sparse_vector
+from genai_agent.vector_db.sparse_encoder import BM25Encoder, normalize_vietnamese, syllable_ngrams
+
+CHUNKS = [
+    "Học phí học kỳ chính của chương trình tiêu chuẩn khóa 2024.",
+    "Điều kiện tốt nghiệp: hoàn thành chương trình đào tạo và chuẩn ngoại ngữ.",
+    "Sinh viên sau đại học đóng học phí theo tín chỉ.",
+    "Lịch đăng ký môn học học kỳ 242 được công bố trên MyBK.",
+]
+
+
+def test_syllable_ngrams():
+    assert syllable_ngrams("Sau đại học", ngram=2) == ["sau", "đại", "học", "sau đại", "đại học"]
+    assert syllable_ngrams("Học phí", ngram=1, fold_diacritics=True) == ["hoc", "phi"]
+    # Composed and decomposed input give the same terms
+    assert normalize_vietnamese(unicodedata.normalize("NFD", "Khoá")) == unicodedata.normalize("NFC", "khoá")
+
+
+def best_chunk(encoder, documents, query):
+    return int(np.argmax((documents @ encoder.transform([query]).T).toarray().ravel()))
+
+
+def test_bm25_ranks_the_chunk_of_the_question():
+    encoder = BM25Encoder()
+    documents = encoder.fit_transform(CHUNKS)
+
+    assert best_chunk(encoder, documents, "Điều kiện để được tốt nghiệp là gì?") == 1
+    assert best_chunk(encoder, documents, "Học phí sau đại học tính thế nào?") == 2
+    # Query weights sum to 1, unknown terms are ignored
+    query = encoder.transform(["học phí thư viện"])
+    assert query.sum() == pytest.approx(1.0)
+    assert encoder.transform(["thư viện mở cửa"]).nnz == 0
+
+
+def test_folded_encoder_matches_unaccented_questions():
+    encoder = BM25Encoder(fold_diacritics=True)
+    documents = encoder.fit_transform(CHUNKS)
+
+    assert best_chunk(encoder, documents, "dieu kien tot nghiep") == 1
+
+
+def test_saved_encoder_gives_the_same_vectors(tmp_path):
+    encoder = BM25Encoder(ngram=3, fold_diacritics=True)
+    documents = encoder.fit_transform(CHUNKS)
+
+    loaded = BM25Encoder.load(encoder.save(str(tmp_path / "graduate_bm25")))
+
+    assert (loaded.ngram, loaded.fold_diacritics, loaded.avgdl) == (3, True, encoder.avgdl)
+    assert isinstance(loaded.term_hashes, np.memmap)
+    assert (loaded.encode_documents(CHUNKS) != documents).nnz == 0
+    assert (loaded.transform(["học phí"]) != encoder.transform(["học phí"])).nnz == 0
+
+
+def test_pinecone_sparse_vector():
+    encoder = BM25Encoder()
+    encoder.fit(CHUNKS)
+
+    sparse = convert_to_pinecone_sparse_vector(encoder.transform(["học phí tín chỉ"]))
+
+    assert sparse["indices"] == sorted(sparse["indices"])
+    assert len(sparse["indices"]) == len(sparse["values"]) > 0
+    assert convert_to_pinecone_sparse_vector(encoder.transform(["xin chào"])) is None
@@ -0,0 +1,112 @@
+import time
+import threading
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from genai_agent.nodes import router
+from genai_agent.schemas.topic import TopicSchema
+from genai_agent.utils.speculative_retrieval import SpeculativeRetriever
+
+
+class FakeStore:
+    def __init__(self, error=None):
+        self.error = error
+        self.queries = []
+        self.called = threading.Event()
+
+    def query(self, query_text, topic, k=3):
+        self.queries.append((query_text, topic))
+        self.called.set()
+        if self.error:
+            raise self.error
+        return [{"content": f"{topic} chunk", "score": 1.0, "metadata": {"topic": topic}}]
+
+
+def make_retriever(**stores):
+    retriever = SpeculativeRetriever(max_workers=2, max_topics=2, max_in_flight=8, ttl_seconds=60)
+    for route, (store_topic, store) in stores.items():
+        retriever.register(route, store_topic, store)
+    return retriever
+
+
+def test_take_returns_the_prefetched_matches():
+    store = FakeStore()
+    retriever = make_retriever(tuition_fee_info=("tuition_fee", store))
+
+    retriever.speculate("m1", "Học phí bao nhiêu?", ["tuition_fee_info", "greeting"])
+    matches = retriever.take("m1", "tuition_fee", "Học phí bao nhiêu?")
+
+    assert matches[0]["content"] == "tuition_fee chunk"
+    assert store.queries == [("Học phí bao nhiêu?", "tuition_fee")]
+    assert retriever.stats()["hits"] == 1
+
+
+def test_take_misses_on_another_query_or_a_failure():
+    retriever = make_retriever(tuition_fee_info=("tuition_fee", FakeStore()),
+                               regulation_info=("regulation_info", FakeStore(ConnectionError("down"))))
+
+    retriever.speculate("m1", "Học phí bao nhiêu?", ["tuition_fee_info", "regulation_info"])
+
+    assert retriever.take("m1", "tuition_fee", "Một câu khác") is None
+    assert retriever.take("m1", "regulation_info", "Học phí bao nhiêu?") is None
+    assert retriever.stats()["misses"] == 2
+
+
+def test_settle_drops_the_other_topics():
+    retriever = make_retriever(tuition_fee_info=("tuition_fee", FakeStore()),
+                               regulation_info=("regulation_info", FakeStore()))
+
+    retriever.speculate("m1", "Rút môn có tính học phí không?", ["regulation_info", "tuition_fee_info"])
+    retriever.settle("m1", "tuition_fee_info")
+
+    stats = retriever.stats()
+    assert stats["in_flight"] == 1
+    assert stats["wasted"] + stats["cancelled"] == 1
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """router_node with the default config: no trained intent classifier, the LLM router decides"""
+    stores = {route: FakeStore() for route in router.RAG_STORE_TOPICS}
+    retriever = make_retriever(**{route: (router.RAG_STORE_TOPICS[route], store) for route, store in stores.items()})
+    monkeypatch.setattr(router, "speculative_retriever", retriever)
+    monkeypatch.setattr(router, "intent_classifier", None)
+
+    def run(user_input, route, previous_flow=None):
+        prefetched_during_llm_call = []
+
+        def classify_with_llm(user_input, chat_history):
+            # Retrieval started before the LLM router was called
+            deadline = time.monotonic() + 2
+            while not any(s.called.is_set() for s in stores.values()) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            prefetched_during_llm_call.extend(r for r, s in stores.items() if s.called.is_set())
+            return TopicSchema(name=route, confidence=0.9, context=user_input)
+
+        monkeypatch.setattr(router, "classify_with_llm", classify_with_llm)
+        message = HumanMessage(content=user_input, id="turn-2", additional_kwargs={"current_time": "2026-10-19 09:00:00"})
+        router.router_node({"messages": [message], "selected_flow": previous_flow})
+        return prefetched_during_llm_call, retriever
+
+    return run
+
+
+def test_router_prefetches_from_keywords(routed):
+    prefetched, retriever = routed("Học phí ngành Điện tử là bao nhiêu?", "tuition_fee_info")
+
+    assert prefetched == ["tuition_fee_info"]
+    assert retriever.take("turn-2", "tuition_fee", "Học phí ngành Điện tử là bao nhiêu?")
+
+
+def test_router_prefetches_the_previous_topic_for_follow_ups(routed):
+    prefetched, retriever = routed("Còn chương trình tiên tiến thì sao?", "graduate_info", previous_flow="graduate_info")
+
+    assert prefetched == ["graduate_info"]
+    assert retriever.take("turn-2", "graduate", "Còn chương trình tiên tiến thì sao?")
+
+
+def test_keyword_routes():
+    assert router._keyword_routes("Điều kiện học thạc sĩ?") == ["graduate_info"]
+    # Whole syllables only: "thiết" is not "thi"
+    assert router._keyword_routes("Thiết kế vi mạch là gì?") == []
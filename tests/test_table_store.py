@@ -0,0 +1,108 @@
+import os
+import sqlite3
+
+import docx
+import pytest
+
+from genai_agent.vector_db import table_store
+from genai_agent.vector_db.table_store import TableStore, build_table_store, format_rows_answer
+
+KB_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "BKU_KB", "BKU_KB")
+MIN_SCORE = 0.6
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    """Rows of the real fee and academic calendar documents"""
+    path = str(tmp_path_factory.mktemp("tables") / "kb_tables.sqlite")
+    assert build_table_store("tuition_fee", os.path.join(KB_ROOT, "tuition_fee"), path) > 0
+    assert build_table_store("regulation_info", os.path.join(KB_ROOT, "regulation_info"), path) > 0
+    return TableStore.load(store_path=path)
+
+
+def answer(store, question):
+    return [(row["label"], row["value"]) for row in store.lookup(question, MIN_SCORE)]
+
+
+def test_precise_questions_get_the_rows_of_one_section(store):
+    assert answer(store, "Học phí cao học CTTA khóa 2021 là bao nhiêu?") == [
+        ("Học phí học kỳ của học viên cao học", "40.000.000 VNĐ/HK"),
+        ("Đơn giá học phí tín chỉ vượt định mức", "2.500.000 VNĐ/TC"),
+    ]
+    assert answer(store, "Thời gian đăng ký môn học đợt 1 lộ trình 1 HK242 là khi nào?") == [
+        ("Thời gian bắt đầu", "29/10/2024"),
+        ("Thời gian kết thúc", "05/11/2024"),
+    ]
+
+
+def test_questions_the_tables_do_not_answer(store):
+    # Not a fee or date question
+    assert answer(store, "Ký túc xá có mấy phòng?") == []
+    # The exam dates are not in the tables
+    assert answer(store, "Khi nào thi cuối kỳ?") == []
+    # No row of that cohort
+    assert answer(store, "Học phí cao học CTTA khóa 2035 là bao nhiêu?") == []
+
+
+def test_ambiguous_questions_are_left_to_rag(store):
+    # Same labels in every program of the cohort
+    assert answer(store, "Học phí khóa 2022 là bao nhiêu?") == []
+    # Two tracks and three registration rounds
+    assert answer(store, "Khi nào đăng ký môn học HK242?") == []
+    # "lại" is shared with "Các ngành còn lại", not a retake fee
+    assert answer(store, "Học phí học lại là bao nhiêu?") == []
+
+
+def fee_row(section, label, value):
+    return {"source": "học phí.docx", "section": section, "label": label, "value": value, "kind": "money"}
+
+
+def test_same_label_with_two_values_is_ambiguous():
+    rows = [fee_row(f"Khoá {2010 + i}", f"Phí dịch vụ số {i}", "100.000 VNĐ") for i in range(10)]
+    rows.append(fee_row("Khoá 2023", "Học phí học kỳ hè", "5.000.000 VNĐ"))
+    question = "Học phí học kỳ hè khoá 2023 bao nhiêu?"
+
+    assert [r["value"] for r in TableStore(rows).lookup(question, MIN_SCORE)] == ["5.000.000 VNĐ"]
+    # The heading telling the two values apart was not extracted
+    rows.append(fee_row("Khoá 2023", "Học phí học kỳ hè", "6.000.000 VNĐ"))
+    assert TableStore(rows).lookup(question, MIN_SCORE) == []
+
+
+def test_rebuild_replaces_the_rows_of_the_topic(tmp_path):
+    folder = tmp_path / "tuition_fee"
+    folder.mkdir()
+    document = docx.Document()
+    document.add_paragraph("Khoá 2023:")
+    document.add_paragraph("Học phí học kỳ hè: 5.000.000 VNĐ")
+    document.save(str(folder / "học phí 2024.docx"))
+    path = str(tmp_path / "kb_tables.sqlite")
+
+    assert build_table_store("tuition_fee", str(folder), path) == 1
+    assert build_table_store("tuition_fee", str(folder), path) == 1
+
+    rows = TableStore.load(["tuition_fee"], path).rows
+    assert [(r["section"], r["label"], r["value"]) for r in rows] == [("Khoá 2023", "Học phí học kỳ hè", "5.000.000 VNĐ")]
+    assert TableStore.load(["graduate"], path) is None
+    assert format_rows_answer(rows) == "Dạ, theo thông tin từ học phí 2024.docx:\n- Khoá 2023 > Học phí học kỳ hè: 5.000.000 VNĐ"
+
+
+def test_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    sqlite_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        connection = sqlite_connect(*args, **kwargs)
+        opened.append(connection)
+        return connection
+
+    monkeypatch.setattr(table_store.sqlite3, "connect", connect)
+    folder = tmp_path / "tuition_fee"
+    folder.mkdir()
+    path = str(tmp_path / "kb_tables.sqlite")
+    build_table_store("tuition_fee", str(folder), path)
+    TableStore.load(store_path=path)
+
+    assert len(opened) == 2
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
@@ -0,0 +1,115 @@
+import os
+import asyncio
+
+from genai_agent.speech.audio_cache import AudioCache
+from genai_agent.speech.tts import FakeTTSProvider, TTSService, prime_stream
+from genai_agent.speech.pipeline import synthesize_pipelined
+
+# Long enough for the fake provider to send many chunks
+LONG_TEXT = "Học phí học kỳ chính được thông báo trên trang của Phòng Đào tạo. " * 20
+
+
+def make_service(cache_dir, chunk_delay: float = 0.0) -> TTSService:
+    provider = FakeTTSProvider(chunk_delay=chunk_delay)
+    return TTSService(provider, AudioCache(str(cache_dir), max_bytes=10 * 1024 * 1024))
+
+
+async def collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+def part_files(cache_dir) -> list:
+    return [name for name in os.listdir(cache_dir) if name.endswith(".part")]
+
+
+def test_cache_miss_then_hit(tmp_path):
+    service = make_service(tmp_path)
+
+    first = asyncio.run(collect(service.stream("Xin chào bạn")))
+    second = asyncio.run(collect(service.stream("Xin chào bạn")))
+
+    assert first and first == second
+    assert service.provider.calls == 1
+    stats = service.cache.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (1, 1, 1)
+
+
+def test_early_close_discards_partial_entry(tmp_path):
+    service = make_service(tmp_path)
+
+    async def disconnect_after_first_chunk():
+        audio = await prime_stream(service.stream(LONG_TEXT))
+        assert await audio.__anext__()
+        # What StreamingResponse does when the client goes away
+        await audio.aclose()
+        # Checked inside the loop: asyncio.run would finalize a leaked stream on exit
+        assert part_files(tmp_path) == []
+
+    asyncio.run(disconnect_after_first_chunk())
+
+    assert service.cache.stats()["entries"] == 0
+    # Nothing partial was published: the next request synthesizes again
+    assert asyncio.run(collect(service.stream(LONG_TEXT)))
+    assert service.provider.calls == 2
+
+
+def test_pipelined_close_discards_partial_entries(tmp_path):
+    service = make_service(tmp_path, chunk_delay=0.01)
+
+    async def disconnect_after_first_chunk():
+        audio = synthesize_pipelined(service, LONG_TEXT, max_parallel=3)
+        assert await audio.__anext__()
+        await audio.aclose()
+        # Let the cancelled sentence tasks unwind
+        await asyncio.sleep(0.1)
+        assert part_files(tmp_path) == []
+
+    asyncio.run(disconnect_after_first_chunk())
+
+
+class CountingService:
+    """Records how many sentence streams run at once"""
+    def __init__(self, chunk_delay: float = 0.01):
+        self.chunk_delay = chunk_delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+
+    async def stream(self, sentence: str):
+        self.started.append(sentence)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            for word in sentence.split()[:3]:
+                await asyncio.sleep(self.chunk_delay)
+                yield word.encode()
+        finally:
+            self.in_flight -= 1
+
+
+def test_pipelined_parallelism_is_bounded_and_ordered():
+    service = CountingService()
+    text = "".join(f"Câu số {i} nói về học phí của học kỳ chính năm nay. " for i in range(8))
+
+    audio = asyncio.run(collect(synthesize_pipelined(service, text, max_parallel=2)))
+
+    assert audio == b"".join(f"Câu số {i}".encode().replace(b" ", b"") for i in range(8))
+    assert len(service.started) == 8
+    assert service.max_in_flight == 2
+
+
+def test_pipelined_close_releases_every_slot():
+    service = CountingService(chunk_delay=0.05)
+    text = "".join(f"Câu số {i} nói về học phí của học kỳ chính năm nay. " for i in range(8))
+
+    async def disconnect_after_first_chunk():
+        audio = synthesize_pipelined(service, text, max_parallel=2)
+        assert await audio.__anext__()
+        # Most sentence tasks are cancelled while still waiting for a slot
+        await audio.aclose()
+        await asyncio.sleep(0.1)
+        assert service.in_flight == 0
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+
+    asyncio.run(disconnect_after_first_chunk())
+    assert len(service.started) <= 3